@@ -1,79 +1,341 @@
 import json
 import asyncio
-import sys
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from nlp_model.interactive import interactive_pool
+from .interactive_runs import RUN_GROUP, SESSION_ID, VIEW_GROUP, InteractiveRun, local_runs
+from .throttling import SocketRateThrottle
+from .validators import PipelineValidator
+
 
 class CodeExecutionConsumer(AsyncWebsocketConsumer):
+    """
+    Interactive terminal: runs a program in a warm interpreter from the
+    interactive pool and relays its stdin/stdout/stderr. Runs are admitted by
+    the run scheduler (global and per-user caps, FIFO queue).
+
+    A run stays in the process that started it; a client that reconnects (to
+    any backend instance) sends 'attach' with the session id to get its output
+    and input back, see api.interactive_runs.
+
+    Client sends:   {'type': 'execute', 'code': '...', 'inputs': ['...']}   (inputs optional, queued ahead)
+                    {'type': 'input', 'input': '...'}  or  {'type': 'input', 'inputs': ['...', ...]}
+                    {'type': 'attach', 'session': '...'}
+    Server sends:   {'type': 'session', 'session': '...'}   (first event of every run)
+                    {'type': 'attached', 'session': '...'}
+                    {'type': 'queued', 'position': int}   (while waiting for a slot, on every move)
+                    {'type': 'started'}   (after having been queued)
+                    {'type': 'output', 'stream': 'stdout' | 'stderr', 'data': '...'}   (coalesced)
+                    {'type': 'output_truncated', 'limit': int}   (once, when the output cap is hit)
+                    {'type': 'waiting_for_input', 'prompt': '...'}   (input() called, nothing queued)
+                    {'type': 'input_consumed', 'input': '...', 'queued': int}   (a queued line went to input())
+                    {'type': 'complete', 'exit_code': int, 'status': ..., 'reason': ..., 'resources': {...}}
+                    {'type': 'error', 'message': '...', 'reason': 'queue_full' | 'user_queue_full' | ...}
+    """
+
+    # Seconds to wait for the owner of a run in another process to answer 'attach'
+    ATTACH_TIMEOUT = 3.0
+
     async def connect(self):
         await self.accept()
-        self.process = None
+        self.run = None       # run owned by this process that this connection shows
+        self.remote = None    # session id of a run in another process that this connection shows
+        self.attaching = None
+        await interactive_pool.warm_up()
 
     async def disconnect(self, close_code):
-        if self.process:
-            try:
-                self.process.terminate()
-            except:
-                pass
+        await self.leave_run('disconnected')
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         message_type = data.get('type')
 
         if message_type == 'execute':
-            code = data.get('code', '')
-            await self.execute_code(code)
+            await self.leave_run('restarted', stop=True)
+            # The run is a task so 'input' messages are handled while it runs
+            inputs = data.get('inputs') if isinstance(data.get('inputs'), list) else []
+            self.run = InteractiveRun(data.get('code', ''), self.scheduling_key(), self, inputs)
+            self.run.start()
         elif message_type == 'input':
-            user_input = data.get('input', '')
-            if self.process and self.process.stdin:
-                try:
-                    self.process.stdin.write((user_input + '\n').encode())
-                    await self.process.stdin.drain()
-                except Exception as e:
-                    await self.send(text_data=json.dumps({
-                        'type': 'error',
-                        'message': f'Input error: {str(e)}'
-                    }))
-
-    async def execute_code(self, code):
+            # Lines may be sent before the program asks; the run queues them
+            lines = data['inputs'] if isinstance(data.get('inputs'), list) else [data.get('input', '')]
+            lines = [str(line) for line in lines]
+            try:
+                if self.run is not None:
+                    await self.run.send_input(lines)
+                elif self.remote is not None:
+                    await self.channel_layer.group_send(RUN_GROUP.format(self.remote),
+                                                        {'type': 'interactive.input', 'lines': lines})
+            except Exception as e:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': f'Input error: {str(e)}'
+                }))
+        elif message_type == 'attach':
+            await self.attach(str(data.get('session', '')))
+
+    async def send_event(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    def scheduling_key(self):
+        """Per-user caps apply to the account, or to the client address when anonymous."""
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        client = self.scope.get('client') or ('unknown',)
+        return f'ip:{client[0]}'
+
+    # --- following a run ---
+
+    async def attach(self, session_id):
+        if not SESSION_ID.match(session_id):
+            await self.send_event({'type': 'error', 'message': 'Invalid session id'})
+            return
+        await self.leave_run('reattached')
+        run = local_runs.get(session_id)
+        if run is not None:
+            # Same process: no channel layer round trips
+            if run.user != self.scheduling_key():
+                await self.send_event({'type': 'error', 'message': 'Session not found'})
+                return
+            self.run = run
+            run.attach_local(self)
+            await self.send_event({'type': 'attached', 'session': session_id})
+            if run.waiting is not None:
+                await self.send_event({'type': 'waiting_for_input', 'prompt': run.waiting})
+            return
+
+        # Owned by another process: ask it, it answers on this consumer's channel
+        self.attaching = session_id
+        await self.channel_layer.group_send(RUN_GROUP.format(session_id), {
+            'type': 'interactive.attach', 'reply_to': self.channel_name, 'user': self.scheduling_key()
+        })
+        # Not awaited here: the answer is dispatched to this consumer like any message
+        asyncio.ensure_future(self.attach_timeout(session_id))
+
+    async def attach_timeout(self, session_id):
+        await asyncio.sleep(self.ATTACH_TIMEOUT)
+        if self.attaching == session_id:
+            self.attaching = None
+            await self.send_event({'type': 'error', 'message': 'Session not found'})
+
+    async def leave_run(self, reason, stop=False):
+        self.attaching = None
+        if self.run is not None:
+            run, self.run = self.run, None
+            run.detach_local(self)
+            if stop:
+                run.stop(reason)
+        if self.remote is not None:
+            session_id, self.remote = self.remote, None
+            await self.channel_layer.group_discard(VIEW_GROUP.format(session_id), self.channel_name)
+            message = {'type': 'interactive.kill', 'user': self.scheduling_key(), 'reason': reason} if stop \
+                else {'type': 'interactive.detach', 'channel': self.channel_name}
+            await self.channel_layer.group_send(RUN_GROUP.format(session_id), message)
+
+    def run_finished(self, session_id):
+        """Called by a local run when it is over."""
+        if self.run is not None and self.run.id == session_id:
+            self.run = None
+
+    # --- channel layer messages from runs in other processes ---
+
+    async def interactive_attached(self, message):
+        if message['session'] != self.attaching:
+            return
+        self.attaching = None
+        self.remote = message['session']
+        await self.channel_layer.group_add(VIEW_GROUP.format(self.remote), self.channel_name)
+        await self.send_event({'type': 'attached', 'session': self.remote})
+        if message.get('waiting') is not None:
+            await self.send_event({'type': 'waiting_for_input', 'prompt': message['waiting']})
+
+    async def interactive_refused(self, message):
+        if message['session'] == self.attaching:
+            self.attaching = None
+            await self.send_event({'type': 'error', 'message': 'Session not found'})
+
+    async def interactive_event(self, message):
+        if message['session'] == self.remote:
+            await self.send_event(message['event'])
+
+    async def interactive_finished(self, message):
+        if message['session'] == self.remote:
+            self.remote = None
+            await self.channel_layer.group_discard(VIEW_GROUP.format(message['session']), self.channel_name)
+
+
+class CodeGenerationConsumer(AsyncWebsocketConsumer):
+    """
+    Streams Kannada -> Python generation so partial code shows up while it is decoded.
+
+    Every 'generate' counts against the same anon/user throttle rates as the
+    REST pipeline and goes through PipelineValidator (length cap, sanitizing).
+
+    Client sends:   {'type': 'generate', 'kannada_description': '...'}
+    Server sends:   {'type': 'status', 'step': 'translating' | 'generating'}
+                    {'type': 'translation', 'english_description': '...'}
+                    {'type': 'token', 'data': '...'}          (zero or more)
+                    {'type': 'complete', 'english_description': '...', 'generated_code': '...', 'source': ...}
+                    {'type': 'error', 'message': '...', 'message_kannada': '...'}
+                    {'type': 'error', 'message': '...', 'reason': 'throttled', 'retry_after': seconds}
+                    {'type': 'error', 'message': 'Invalid input', 'message_kannada': '...', 'details': {...}}
+    """
+
+    async def connect(self):
+        await self.accept()
+        self.task = None
+
+    async def disconnect(self, close_code):
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def receive(self, text_data):
         try:
-            # Start Python process
-            self.process = await asyncio.create_subprocess_exec(
-                sys.executable, '-u', '-c', code,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-
-            # Read output in real-time
-            async def read_stream(stream, stream_type):
-                while True:
-                    line = await stream.readline()
-                    if not line:
-                        break
-                    text = line.decode('utf-8', errors='ignore')
-                    await self.send(text_data=json.dumps({
-                        'type': 'output',
-                        'stream': stream_type,
-                        'data': text
-                    }))
-
-            # Create tasks for stdout and stderr
-            stdout_task = asyncio.create_task(read_stream(self.process.stdout, 'stdout'))
-            stderr_task = asyncio.create_task(read_stream(self.process.stderr, 'stderr'))
-
-            # Wait for process to complete
-            await asyncio.gather(stdout_task, stderr_task)
-            await self.process.wait()
-
-            # Send completion message
-            await self.send(text_data=json.dumps({
-                'type': 'complete',
-                'exit_code': self.process.returncode
-            }))
+            data = json.loads(text_data)
+        except ValueError:
+            await self.send_event({'type': 'error', 'message': 'Invalid JSON'})
+            return
+
+        if data.get('type') == 'generate':
+            throttle = SocketRateThrottle(self.scope)
+            if not await sync_to_async(throttle.allow)():
+                wait = throttle.wait()
+                await self.send_event({
+                    'type': 'error',
+                    'message': f'Request was throttled. Expected available in {int(wait or 0)} seconds.',
+                    'reason': 'throttled',
+                    'retry_after': round(wait or 0, 1)
+                })
+                return
+
+            validator = PipelineValidator(data={'kannada_description': data.get('kannada_description', '')})
+            if not validator.is_valid():
+                await self.send_event({
+                    'type': 'error',
+                    'message': 'Invalid input',
+                    'message_kannada': 'ಅಮಾನ್ಯ ಇನ್‌ಪುಟ್',
+                    'details': validator.errors
+                })
+                return
+
+            if self.task and not self.task.done():
+                self.task.cancel()
+            self.task = asyncio.create_task(self.generate(validator.validated_data['kannada_description']))
+
+    async def send_event(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    async def generate(self, kannada_text):
+        from nlp_model.text_preprocessor import preprocessor
+        from nlp_model.groq_service import groq_service
 
+        try:
+            preprocessing_result = preprocessor.preprocess(kannada_text or '')
+            cleaned_text = preprocessing_result['cleaned_text']
+            validation = preprocessor.validate_input(cleaned_text)
+            if not validation['is_valid']:
+                await self.send_event({
+                    'type': 'error',
+                    'message': validation['message'],
+                    'message_kannada': validation['message_kannada']
+                })
+                return
+
+            # Groq streams translation and code in one completion
+            english_description = None
+            if groq_service.client:
+                done, english_description = await self.relay(
+                    groq_service.stream_kannada_input(cleaned_text), source='groq')
+                if done:
+                    return
+
+            await self.stream_local(cleaned_text, english_description)
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': str(e)
-            }))
+            await self.send_event({'type': 'error', 'message': str(e)})
+
+    async def relay(self, events, source):
+        """
+        Forward events from a blocking event iterator without holding the event loop.
+
+        Returns:
+            tuple: (done, english_description). done is False when the source failed
+            before producing any code, so the caller can fall back; english_description
+            is the translation already forwarded to the client, if any
+        """
+        iterator = iter(events)
+        sent_tokens = False
+        english_description = None
+        while True:
+            event = await asyncio.to_thread(next, iterator, None)
+            if event is None:
+                return sent_tokens, english_description
+            if event['type'] == 'error':
+                if not sent_tokens:
+                    return False, english_description
+                await self.send_event({'type': 'error', 'message': event.get('error', '')})
+                return True, english_description
+            if event['type'] == 'complete':
+                event = dict(event, source=source)
+            elif event['type'] == 'token':
+                sent_tokens = True
+            elif event['type'] == 'translation':
+                english_description = event['english_description']
+            await self.send_event(event)
+            if event['type'] == 'complete':
+                return True, english_description
+
+    async def stream_local(self, kannada_text, english_description=None):
+        """
+        Translate with the local translator and stream CodeT5 generation.
+
+        Args:
+            kannada_text (str): Cleaned Kannada description
+            english_description (str): Translation the client already received
+                (from a failed Groq stream); reused instead of translating again
+        """
+        from translator.kannada_translator import translator
+        from .views import generator_manager
+
+        if not english_description or not english_description.strip():
+            await self.send_event({'type': 'status', 'step': 'translating'})
+            english_description = await asyncio.to_thread(translator.translate_kannada_to_english, kannada_text)
+            if not english_description or not english_description.strip():
+                await self.send_event({
+                    'type': 'error',
+                    'message': 'Translation returned empty result',
+                    'message_kannada': 'ಅನುವಾದ ದೋಷ: ಕನ್ನಡದಿಂದ ಇಂಗ್ಲಿಷ್‌ಗೆ ಅನುವಾದಿಸಲು ವಿಫಲವಾಗಿದೆ'
+                })
+                return
+            await self.send_event({'type': 'translation', 'english_description': english_description})
+
+        await self.send_event({'type': 'status', 'step': 'generating'})
+        generator = await asyncio.to_thread(generator_manager.get)
+        iterator = generator.stream_code(english_description)
+        while True:
+            event = await asyncio.to_thread(next, iterator, None)
+            if event is None:
+                return
+            if event['type'] == 'token':
+                await self.send_event(event)
+                continue
+
+            result = event['result']
+            if not result.get('code'):
+                await self.send_event({
+                    'type': 'error',
+                    'message': result.get('error', 'Code generation failed'),
+                    'message_kannada': 'ಕೋಡ್ ಉತ್ಪಾದನೆ ದೋಷ'
+                })
+                return
+            await self.send_event({
+                'type': 'complete',
+                'english_description': english_description,
+                'generated_code': result['code'],
+                'source': 'codet5'
+            })
+            return
@@ -0,0 +1,265 @@
+"""
+Interactive runs that outlive, and can be reached from, any one WebSocket.
+
+A run is pinned to the backend process that started it (its interpreter lives
+there), but the client's connection may land on another instance, e.g. after
+a reconnect through the load balancer. Every run therefore has a session id
+and two channel-layer groups:
+
+    interactive.run.<id>    the run's mailbox: input, attach, detach, kill
+    interactive.view.<id>   consumers in other processes showing the run
+
+Consumers in the owning process talk to the run directly (``local_runs``) and
+receive its events without going through the channel layer; only viewers
+elsewhere cost a publish per event. With the in-memory layer everything is
+local. When the last viewer goes away the run is stopped after
+``reattach_grace`` seconds (immediately when 0).
+
+Stdin is buffered here rather than written to the interpreter as it arrives:
+the client may send lines ahead of time, and each input() call (announced by
+the runner on its event pipe) takes the next one without a round trip. Only
+when the buffer is empty do viewers get {'type': 'waiting_for_input'}.
+"""
+import asyncio
+import logging
+import re
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from channels.layers import get_channel_layer
+
+from nlp_model.code_cache import compiled_cache
+from nlp_model.interactive import OutputRelay, interactive_pool
+from nlp_model.run_scheduler import SchedulerFull, run_scheduler
+
+logger = logging.getLogger(__name__)
+
+RUN_GROUP = 'interactive.run.{}'
+VIEW_GROUP = 'interactive.view.{}'
+
+SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Lines of stdin a client may send ahead (same limit as REST executions)
+MAX_BUFFERED_INPUTS = 100
+
+# Runs owned by this process, by session id
+local_runs: Dict[str, 'InteractiveRun'] = {}
+
+
+class InteractiveRun:
+    """
+    One program run: admission, interpreter, output relay and the mailbox
+    through which viewers in any process reach it.
+
+    Args:
+        code (str): Program to run
+        user (str): Scheduling key of the user who started it; only the same
+            user may attach to it later
+        viewer: The starting consumer (in this process)
+        inputs (list): Lines of stdin sent along with the program
+    """
+
+    def __init__(self, code: str, user: str, viewer, inputs: Optional[List[str]] = None):
+        self.id = uuid.uuid4().hex
+        self.code = code
+        self.user = user
+        self.layer = get_channel_layer()
+        self.local_viewers: Set = {viewer}
+        self.remote_viewers: Set[str] = set()
+        self.session = None
+        self.relay: Optional[OutputRelay] = None
+        self.stdin = deque()
+        self.waiting: Optional[str] = None  # prompt of the input() waiting for a line
+        self.input_requests = 0
+        self.inputs_buffered = 0  # input() calls served from the buffer, without a round trip
+        self.task: Optional[asyncio.Task] = None
+        self.buffer_input((inputs or [])[:MAX_BUFFERED_INPUTS])
+        self._channel: Optional[str] = None
+        self._grace: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> asyncio.Task:
+        local_runs[self.id] = self
+        self.task = asyncio.ensure_future(self._run())
+        return self.task
+
+    # --- events to viewers ---
+
+    async def emit(self, event: Dict):
+        for viewer in list(self.local_viewers):
+            await viewer.send_event(event)
+        if self.remote_viewers:
+            await self.layer.group_send(VIEW_GROUP.format(self.id),
+                                        {'type': 'interactive.event', 'session': self.id, 'event': event})
+
+    async def _position(self, position: int):
+        await self.emit({'type': 'queued', 'position': position})
+
+    # --- the run ---
+
+    async def _run(self):
+        ticket = relay = mailbox = None
+        try:
+            self._channel = await self.layer.new_channel()
+            await self.layer.group_add(RUN_GROUP.format(self.id), self._channel)
+            mailbox = asyncio.ensure_future(self._serve_mailbox())
+            await self.emit({'type': 'session', 'session': self.id})
+
+            # Same import/builtin policy as the REST executor
+            verdict = compiled_cache.get(self.code).verdict
+            if not verdict and not verdict.syntax_error:
+                await self.emit({
+                    'type': 'error',
+                    'message': f'Code contains potentially dangerous operation: {verdict.message()}'
+                })
+                return
+
+            try:
+                ticket = await run_scheduler.acquire(self.user, self._position)
+            except SchedulerFull as e:
+                await self.emit({'type': 'error', 'message': str(e), 'reason': e.reason})
+                return
+            if ticket.position:
+                await self.emit({'type': 'started'})
+
+            session = self.session = await interactive_pool.acquire()
+            # Read output in real-time; the relay batches it into frames
+            on_limit = (lambda: session.kill('output_limit')) if interactive_pool.stop_on_output_limit else None
+            relay = self.relay = OutputRelay(self.emit, on_limit=on_limit)
+            relay.follow(session.process, session.touch)
+            session.on_input_request = self._input_requested
+            await session.start(self.code)
+
+            # Wait for the program to end (or hit a limit), then for its last output
+            outcome = await session.wait()
+            output = await relay.close()
+            outcome['resources'].update(stdout_bytes=output.pop('stdout_bytes'),
+                                        stderr_bytes=output.pop('stderr_bytes'))
+
+            # Send completion message
+            await self.emit(dict(outcome, type='complete', input_requests=self.input_requests,
+                                 inputs_buffered=self.inputs_buffered, **output))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.emit({'type': 'error', 'message': str(e)})
+        finally:
+            if relay is not None:
+                relay.cancel()
+            if self.session is not None:
+                self.session.kill('finished')
+            if ticket is not None:
+                run_scheduler.release(ticket)
+            if self._grace is not None:
+                self._grace.cancel()
+            local_runs.pop(self.id, None)
+            for viewer in list(self.local_viewers):
+                viewer.run_finished(self.id)
+            if mailbox is not None:
+                mailbox.cancel()
+            await asyncio.shield(self._leave())
+
+    async def _leave(self):
+        try:
+            if self.remote_viewers:
+                await self.layer.group_send(VIEW_GROUP.format(self.id),
+                                            {'type': 'interactive.finished', 'session': self.id})
+            if self._channel is not None:
+                await self.layer.group_discard(RUN_GROUP.format(self.id), self._channel)
+        except Exception as e:
+            logger.warning(f"Could not leave channel groups of run {self.id}: {e}")
+
+    # --- control, from local consumers or the mailbox ---
+
+    def buffer_input(self, lines: List[str]) -> bool:
+        """Queue lines of stdin; False (nothing queued) if the buffer would overflow."""
+        # Pasted text is one line per input() call
+        split = [part for line in lines for part in str(line).replace('\x00', '').split('\n')]
+        if len(self.stdin) + len(split) > MAX_BUFFERED_INPUTS:
+            return False
+        self.stdin.extend(split)
+        return True
+
+    async def send_input(self, lines: List[str]):
+        if not self.buffer_input(lines):
+            await self.emit({'type': 'error', 'message': f'At most {MAX_BUFFERED_INPUTS} inputs can be queued'})
+            return
+        if self.waiting is not None and self.stdin:
+            await self._feed()
+
+    async def _input_requested(self, event: Dict):
+        self.input_requests += 1
+        # The prompt goes out before the state, whatever the flush interval
+        await self.relay.sync(event.get('stdout_bytes', 0))
+        if self.stdin:
+            self.inputs_buffered += 1
+            await self._feed()
+            return
+        self.waiting = event.get('prompt', '')
+        await self.emit({'type': 'waiting_for_input', 'prompt': self.waiting})
+
+    async def _feed(self):
+        line = self.stdin.popleft()
+        self.waiting = None
+        if self.session is not None and self.session.alive():
+            await self.session.send_input(line + '\n')
+            await self.emit({'type': 'input_consumed', 'input': line, 'queued': len(self.stdin)})
+
+    def stop(self, reason: str):
+        """Kill the program, or drop the run from the queue if it has not started."""
+        if self.session is not None:
+            self.session.kill(reason)
+        elif self.task is not None:
+            self.task.cancel()
+
+    def attach_local(self, viewer):
+        self.local_viewers.add(viewer)
+        self._viewer_joined()
+
+    def detach_local(self, viewer):
+        self.local_viewers.discard(viewer)
+        self._viewer_left()
+
+    def _viewer_joined(self):
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+
+    def _viewer_left(self):
+        # Nobody is left to read the output or answer input(): stop the program
+        if self.local_viewers or self.remote_viewers:
+            return
+        grace = interactive_pool.reattach_grace
+        if grace <= 0:
+            self.stop('disconnected')
+        elif self._grace is None:
+            self._grace = asyncio.get_running_loop().call_later(grace, self.stop, 'disconnected')
+
+    async def _serve_mailbox(self):
+        while True:
+            message = await self.layer.receive(self._channel)
+            try:
+                await self._handle(message)
+            except Exception as e:
+                logger.warning(f"Run {self.id}: could not handle {message.get('type')}: {e}")
+
+    async def _handle(self, message: Dict):
+        kind = message.get('type')
+        if kind == 'interactive.input':
+            await self.send_input(message.get('lines', []))
+        elif kind == 'interactive.attach':
+            reply_to = message['reply_to']
+            if message.get('user') != self.user:
+                await self.layer.send(reply_to, {'type': 'interactive.refused', 'session': self.id})
+                return
+            self.remote_viewers.add(reply_to)
+            self._viewer_joined()
+            await self.layer.send(reply_to, {'type': 'interactive.attached', 'session': self.id,
+                                             'waiting': self.waiting})
+        elif kind == 'interactive.detach':
+            self.remote_viewers.discard(message.get('channel'))
+            self._viewer_left()
+        elif kind == 'interactive.kill':
+            if message.get('user') == self.user:
+                self.stop(message.get('reason', 'killed'))
@@ -0,0 +1,137 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from nlp_model.algorithm_rules import RANGE_END_PATTERN, RANGE_PATTERNS, resolve_var_case
+from nlp_model.postprocessing import (
+    assigned_in_code, clean_generated_text, extract_assignments
+)
+
+SAMPLES = [
+    ('assign 5 to A and assign 10 to B then add them', 'c = A + B\nprint(c)'),
+    ('start sum as 0 and add numbers from 1 to n', 'for i in range(1, n + 1):\n    sum += i'),
+    ('n = 10 print numbers from 1 to N', 'public class Main { static void main() { System.out.println(i); } }'),
+    ('initialize count to 0 and count from x to y', '...def count_up(x, y): return y - x}'),
+    ('x = 3 y = 4 multiply x and y', 'print(x * y)'),
+    ('print numbers between 1 and 20', 'class Printer: pass'),
+    ('reverse a string', 'text = "hello"\nprint(text[::-1])'),
+    ('print hello world', 'print("Hello World")'),
+]
+
+
+# --- Pre-change implementation (string patterns, list of "var = value" lines) ---
+
+def _legacy_clean(text):
+    if not text:
+        return text
+    text = re.sub(r'^[.\s]*public\s+class\s+[a-zA-Z_]\w*.*?\s*\{', '', text, flags=re.DOTALL)
+    text = re.sub(r'^[.\s]*static\s+void\s+main.*?\s*\{', '', text, flags=re.DOTALL)
+    text = re.sub(r'System\.out\.println\s*\((.*?)\);?', r'print(\1)', text)
+    text = re.sub(r'^[.\s]*def\s+[a-zA-Z_]\w*\s*\(.*?\)\s*:\s*', '', text)
+    text = re.sub(r'^[.\s]*class\s+[a-zA-Z_]\w*\s*:\s*', '', text)
+    text = text.lstrip('. \n\t')
+    if text.endswith('}') and '{' not in text:
+        text = text.rstrip('} \n\t')
+    return text.strip()
+
+
+def _legacy_extract(description):
+    assignments = []
+    for value, var in re.findall(r'assign\s+(\d+)\s+to\s+([a-zA-Z_]\w*)', description, re.IGNORECASE):
+        assignments.append(f"{var} = {value}")
+    for var, value in re.findall(r'(?:start|initialize)\s+([a-zA-Z_]\w*)\s+(?:as|to|with)\s+(\d+)',
+                                 description, re.IGNORECASE):
+        if f"{var} = {value}" not in assignments:
+            assignments.append(f"{var} = {value}")
+    for var, value in re.findall(r'([a-zA-Z_]\w*)\s*=\s*(\d+)', description):
+        if f"{var} = {value}" not in assignments:
+            assignments.append(f"{var} = {value}")
+    return assignments
+
+
+def _legacy_resolve(assignments, token):
+    if token.isdigit():
+        return token
+    for a in assignments:
+        var = a.split('=')[0].strip()
+        if var.lower() == token.lower():
+            return var
+    return token
+
+
+def _legacy_range(description, assignments):
+    for pattern in (r'from\s+(\d+|[a-zA-Z_]\w*)\s+to\s+(\d+|[a-zA-Z_]\w*)',
+                    r'(\d+|[a-zA-Z_]\w*)\s+to\s+(\d+|[a-zA-Z_]\w*)',
+                    r'between\s+(\d+|[a-zA-Z_]\w*)\s+and\s+(\d+|[a-zA-Z_]\w*)'):
+        match = re.search(pattern, description, re.IGNORECASE)
+        if match:
+            return _legacy_resolve(assignments, match.group(1)), _legacy_resolve(assignments, match.group(2))
+    end_only = re.search(r'to\s+(\d+|[a-zA-Z_]\w*)', description, re.IGNORECASE)
+    if end_only:
+        return '1', _legacy_resolve(assignments, end_only.group(1))
+    return None, None
+
+
+def _legacy_postprocess(description, raw):
+    code = _legacy_clean(raw)
+    assignments = _legacy_extract(description)
+    _legacy_range(description, assignments)
+    existing = set()
+    for line in code.strip().split('\n'):
+        match = re.match(r'^([a-zA-Z_]\w*)\s*=', line.strip())
+        if match:
+            existing.add(match.group(1))
+    return [a for a in assignments if a.split('=')[0].strip() not in existing]
+
+
+# --- Current implementation ---
+
+def _range(description, assignments):
+    for pattern in RANGE_PATTERNS:
+        match = pattern.search(description)
+        if match:
+            return resolve_var_case(assignments, match.group(1)), resolve_var_case(assignments, match.group(2))
+    end_only = RANGE_END_PATTERN.search(description)
+    if end_only:
+        return '1', resolve_var_case(assignments, end_only.group(1))
+    return None, None
+
+
+def _postprocess(description, raw):
+    code = clean_generated_text(raw)
+    assignments = extract_assignments(description)
+    _range(description, assignments)
+    existing = assigned_in_code(code)
+    return [f"{var} = {value}" for var, value in assignments.values() if var not in existing]
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the per-description cost of generator post-processing, before vs after precompiling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--cold', action='store_true',
+                            help="Clear re's pattern cache before every description, as happens when "
+                                 "a busy server cycles through more patterns than the cache holds")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        cold = options['cold']
+
+        def bench(fn):
+            elapsed = 0.0
+            for i in range(iterations):
+                description, raw = SAMPLES[i % len(SAMPLES)]
+                if cold:
+                    re.purge()
+                start = time.perf_counter()
+                fn(description, raw)
+                elapsed += time.perf_counter() - start
+            return elapsed / iterations * 1e6
+
+        before = bench(_legacy_postprocess)
+        after = bench(_postprocess)
+        self.stdout.write(f"before (string patterns):      {before:.1f} µs/description")
+        self.stdout.write(f"after  (precompiled, 1 pass):  {after:.1f} µs/description")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {before / after:.2f}x"))
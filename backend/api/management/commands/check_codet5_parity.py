@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_model.model_backends import BACKENDS, load_seq2seq
+
+SAMPLE_DESCRIPTIONS = [
+    'print hello world',
+    'print numbers from 1 to 10',
+    'find the sum of two numbers',
+    'check if a number is even',
+    'reverse a string',
+    'find the largest number in a list',
+    'multiply two numbers and print the result',
+    'count the vowels in a string',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare CodeT5 outputs of the int8 backends against the full-precision (FP32) model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', default=['quantized', 'onnx'],
+                            choices=[b for b in BACKENDS if b != 'pytorch'])
+        parser.add_argument('--max-length', type=int, default=256)
+        parser.add_argument('--min-match', type=float, default=0.75,
+                            help='Minimum fraction of outputs identical to FP32 (default 0.75)')
+
+    def handle(self, *args, **options):
+        from transformers import pipeline
+
+        repo_id = settings.HF_REPO_ID
+        prompts = [f"Translate English to Python: {d}" for d in SAMPLE_DESCRIPTIONS]
+
+        def run(backend):
+            tokenizer, model, used = load_seq2seq(repo_id, backend, cache_dir=settings.CODET5_MODEL_CACHE_DIR)
+            generate = pipeline("text2text-generation", model=model, tokenizer=tokenizer)
+            start = time.time()
+            outputs = [generate(p, max_length=options['max_length'], truncation=True)[0]['generated_text']
+                       for p in prompts]
+            return used, outputs, (time.time() - start) / len(prompts)
+
+        _, reference, ref_latency = run('pytorch')
+        self.stdout.write(f"pytorch (FP32): {ref_latency * 1000:.1f} ms/description")
+
+        failed = []
+        for backend in options['backends']:
+            used, outputs, latency = run(backend)
+            if used != backend:
+                self.stdout.write(self.style.WARNING(f"{backend}: unavailable, loaded '{used}' instead - skipped"))
+                continue
+            matches = sum(1 for ref, out in zip(reference, outputs) if ref.strip() == out.strip())
+            ratio = matches / len(reference)
+            line = (f"{backend}: {matches}/{len(reference)} identical to FP32, "
+                    f"{latency * 1000:.1f} ms/description ({ref_latency / latency:.2f}x)")
+            if ratio >= options['min_match']:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.ERROR(line))
+                for desc, ref, out in zip(SAMPLE_DESCRIPTIONS, reference, outputs):
+                    if ref.strip() != out.strip():
+                        self.stdout.write(f"  {desc!r}\n    fp32: {ref!r}\n    {backend}: {out!r}")
+                failed.append(backend)
+
+        if failed:
+            raise CommandError(f"Parity below {options['min_match']:.0%} for: {', '.join(failed)}")
@@ -0,0 +1,96 @@
+import ast
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_model.code_cache import compiled_cache
+from nlp_model.code_executor import executor
+from nlp_model.safety import SafetyAnalyzer
+
+# Programs the safety policy must reject: known sandbox escapes
+REJECTED = {
+    'attrgetter escape': (
+        "import operator\n"
+        "get = operator.attrgetter\n"
+        "subs = get('__class__.__base__.__subclasses__')(())()\n"
+        "wrap = [c for c in subs if c.__name__ == '_wrap_close'][0]\n"
+        "print(get('__init__.__globals__')(wrap)['popen']('id').read())\n"
+    ),
+    'Formatter.get_field escape': (
+        "import string\n"
+        "subs = string.Formatter().get_field('0.__class__.__base__.__subclasses__', [()], {})[0]()\n"
+    ),
+    'attrgetter with a built name': (
+        "from operator import attrgetter\n"
+        "print(attrgetter('_' * 2 + 'class' + '_' * 2)(()))\n"
+    ),
+    'generator frame walk': (
+        "def g():\n"
+        "    yield x.gi_frame.f_back\n"
+        "x = g()\n"
+        "for f in x:\n"
+        "    break\n"
+        "while f is not None and 'os' not in f.f_globals:\n"
+        "    f = f.f_back\n"
+        "print(f.f_globals['os'].environ)\n"
+    ),
+    'coroutine frame': "async def c():\n    pass\nprint(c().cr_frame)\n",
+    'code object': "def f():\n    return 1\nprint(f.co_consts)\n",
+    'methodcaller': "import operator\nprint(operator.methodcaller('__reduce_ex__', 2)(()))\n",
+    'star import': "from operator import *\nprint(attrgetter)\n",
+    'dunder attribute': "print(().__class__.__base__.__subclasses__())\n",
+    'dunder in a string': "names = ['__globals__']\n",
+    'format field': "print('{0.__class__}'.format(()))\n",
+    'private module member': "import random\nprint(random._os)\n",
+    'import of os': "import os\n",
+    'getattr': "print(getattr((), 'count'))\n",
+}
+
+# Ordinary programs the policy must keep accepting
+ALLOWED = {
+    'operator functions': "import operator\nprint(operator.add(2, 3), operator.itemgetter(1)([4, 5]))\n",
+    'string constants': "import string\nprint(string.ascii_lowercase, string.capwords('a b'))\n",
+    'main guard': "def main():\n    print('hi')\n\nif __name__ == '__main__':\n    main()\n",
+    'class': (
+        "class Point:\n"
+        "    def __init__(self, x):\n"
+        "        self._x = x\n"
+        "    def __repr__(self):\n"
+        "        return f'Point({self._x})'\n"
+        "print(Point(1))\n"
+    ),
+    'underscore rule': "print('_' * 10)\nprint('__________')\n",
+    'str.format': "print('{0} + {1} = {2}'.format(1, 2, 3))\n",
+}
+
+
+class Command(BaseCommand):
+    help = 'Check the sandbox safety policy against known escapes and ordinary programs'
+
+    def handle(self, *args, **options):
+        analyzer = SafetyAnalyzer()
+        failed = []
+        for expect_safe, cases in ((False, REJECTED), (True, ALLOWED)):
+            for name, code in cases.items():
+                verdict = analyzer.check_tree(ast.parse(code))
+                if bool(verdict) == expect_safe:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"ok   {name}: {'allowed' if expect_safe else verdict.message()}"))
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        f"FAIL {name}: expected {'allowed' if expect_safe else 'rejected'}, "
+                        f"got {verdict.message() or 'allowed'}"))
+                    failed.append(name)
+
+        # Rejected code must never run, so it can never be served from the result cache
+        for name, code in REJECTED.items():
+            first, second = executor.execute_code(code), executor.execute_code(code)
+            rejected = all(r['status'] == 'error' and 'forbidden' in r['error'] and not r.get('cached')
+                           for r in (first, second))
+            if rejected and not compiled_cache.get(code).deterministic:
+                self.stdout.write(self.style.SUCCESS(f"ok   {name}: rejected by the executor, not memoized"))
+            else:
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: executor returned {second!r}"))
+                failed.append(f'{name} (executor)')
+
+        if failed:
+            raise CommandError(f"{len(failed)} safety policy checks failed: {', '.join(failed)}")
@@ -0,0 +1,60 @@
+import contextlib
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_model.algorithm_rules import match_rule
+from nlp_model.postprocessing import extract_assignments
+
+# (description, complete rule expected to answer it, what the emitted program prints);
+# None when no template may answer it without the model
+RULE_CASES = [
+    ('print numbers from 1 to 5', 'print_range', '1 2 3 4 5'),
+    ('print numbers from 0 to 10 step 2', 'step_loop', '0 2 4 6 8 10'),
+    ('display values from 0 to 20 step 5', 'step_loop', '0 5 10 15 20'),
+    ('print numbers from 10 to 0 step 5', 'step_loop', '10 5 0'),
+    ('print numbers in reverse from 1 to 10', 'countdown', '10 9 8 7 6 5 4 3 2 1'),
+    ('print numbers from 1 to 5 in descending order', 'countdown', '5 4 3 2 1'),
+    ('print odd numbers from 1 to 9', 'odd_range', '1 3 5 7 9'),
+    ('print numbers from 0 to 10 step 2 in reverse', 'step_loop', '10 8 6 4 2 0'),
+    ('sort a list in descending order', 'sort_list', '[9, 8, 5, 2, 1]'),
+    ('multiply a = 6 and b = 7', 'multiply_two', '42'),
+    ('find the sum of a list', 'list_sum', '15'),
+    # Qualifiers no single template honours: left to the model
+    ('print odd numbers from 1 to 20 step 3', None, None),
+    ('print even numbers in reverse from 1 to 10', None, None),
+    ('print squares of numbers from 1 to 5', None, None),
+    ('print every second number from 1 to 10', None, None),
+    # Products that are not of two operands
+    ('find the product of a list', None, None),
+    ('product of numbers from 1 to 5', None, None),
+]
+
+
+class Command(BaseCommand):
+    help = ('Run sample descriptions through the complete heuristic templates (the fast path that skips '
+            'the model) and check the programs they emit')
+
+    def handle(self, *args, **options):
+        failed = []
+        for description, expected_rule, expected_output in RULE_CASES:
+            match = match_rule(description, '', extract_assignments(description), complete_only=True)
+            rule_name, output = (match[0], _run(match[1])) if match else (None, None)
+            if (rule_name, output) == (expected_rule, expected_output):
+                self.stdout.write(self.style.SUCCESS(f"ok   {description!r} -> {rule_name}"))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"FAIL {description!r} -> {rule_name} printing {output!r} "
+                    f"(expected {expected_rule} printing {expected_output!r})"))
+                failed.append(description)
+
+        if failed:
+            raise CommandError(f"{len(failed)} of {len(RULE_CASES)} template checks failed")
+
+
+def _run(code: str) -> str:
+    """Output of a template program, one space between printed lines."""
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        exec(compile(code, '<template>', 'exec'), {'__name__': '__main__'})
+    return ' '.join(stdout.getvalue().split())
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nlp_model.codet5_generator import CodeT5Generator
+from nlp_model.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = 'Run the dedicated CodeT5 inference process that batches generation requests from web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=settings.CODET5_INFERENCE_ADDRESS or '127.0.0.1:6100',
+                            help="'host:port' or Unix socket path (default: CODET5_INFERENCE_ADDRESS)")
+        parser.add_argument('--max-batch-size', type=int, default=settings.CODET5_MAX_BATCH_SIZE)
+        parser.add_argument('--max-wait-ms', type=float, default=settings.CODET5_MAX_BATCH_WAIT_MS)
+
+    def handle(self, *args, **options):
+        generator = CodeT5Generator(
+            hf_token=settings.HF_TOKEN,
+            hf_repo_id=settings.HF_REPO_ID,
+            batch_size=options['max_batch_size'],
+            backend=settings.CODET5_BACKEND,
+            model_cache_dir=settings.CODET5_MODEL_CACHE_DIR
+        )
+        if not generator.pipeline and not generator.hf_token:
+            raise CommandError('No local model loaded and no HF_TOKEN set - nothing to serve')
+
+        server = InferenceServer(
+            generator,
+            options['address'],
+            authkey=settings.CODET5_INFERENCE_AUTHKEY.encode(),
+            max_batch_size=options['max_batch_size'],
+            max_wait_ms=options['max_wait_ms']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Inference server starting on {options['address']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,186 @@
+import base64
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+
+from nlp_model.code_executor import CodeExecutor
+
+STATUSES = {
+    'queued': {'id': 1, 'description': 'In Queue'},
+    'processing': {'id': 2, 'description': 'Processing'},
+    'success': {'id': 3, 'description': 'Accepted'},
+    'timeout': {'id': 5, 'description': 'Time Limit Exceeded'},
+    'compile': {'id': 6, 'description': 'Compilation Error'},
+    'error': {'id': 11, 'description': 'Runtime Error (NZEC)'},
+}
+PYTHON3 = 71
+
+
+class Judge0Stub:
+    """Judge0-compatible subset (Python 3 only) backed by the local sandbox pool."""
+
+    def __init__(self, executor: CodeExecutor, workers: int):
+        self.executor = executor
+        self.jobs = ThreadPoolExecutor(max_workers=workers)
+        self.submissions = {}
+        self.lock = threading.Lock()
+
+    def create(self, data: dict, encoded: bool) -> dict:
+        if data.get('language_id') != PYTHON3:
+            return {'language_id': [f"language with id {data.get('language_id')} doesn't exist"]}
+        if not data.get('source_code'):
+            return {'source_code': ["can't be blank"]}
+
+        token = str(uuid.uuid4())
+        code = _decode(data['source_code'], encoded)
+        stdin = _decode(data.get('stdin') or '', encoded)
+        with self.lock:
+            self.submissions[token] = {'token': token, 'status': STATUSES['queued']}
+        self.jobs.submit(self._run, token, code, stdin)
+        return {'token': token}
+
+    def _run(self, token: str, code: str, stdin: str):
+        with self.lock:
+            self.submissions[token]['status'] = STATUSES['processing']
+        inputs = stdin.split('\n') if stdin else []
+        result = self.executor.execute_code(code, inputs)
+
+        resources = result.get('resources') or {}
+        status = result['status']
+        if status == 'error' and result['error'].startswith('Syntax error'):
+            status = 'compile'
+        submission = {
+            'token': token,
+            'stdout': result['output'] or None,
+            'stderr': None if status == 'compile' else (result['error'] or None),
+            'compile_output': result['error'] if status == 'compile' else None,
+            'message': None,
+            'time': _seconds(resources.get('cpu_user'), resources.get('cpu_sys')),
+            'wall_time': _seconds(resources.get('wall_time', result['execution_time'])),
+            'memory': resources.get('peak_rss_kb'),
+            'status': STATUSES.get(status, STATUSES['error']),
+        }
+        with self.lock:
+            self.submissions[token] = submission
+
+    def get(self, token: str, encoded: bool, fields=None):
+        with self.lock:
+            submission = self.submissions.get(token)
+        if submission is None:
+            return None
+        out = {}
+        for key, value in submission.items():
+            if fields and key not in fields:
+                continue
+            if encoded and key in ('stdout', 'stderr', 'compile_output') and value:
+                value = base64.b64encode(value.encode('utf-8')).decode('ascii')
+            out[key] = value
+        return out
+
+    def wait(self, token: str, timeout: float):
+        # Blocking ?wait=true variant
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.submissions[token]['status']['id'] > STATUSES['processing']['id']:
+                    return
+            time.sleep(0.02)
+
+
+def _seconds(*values):
+    known = [v for v in values if v is not None]
+    return f"{sum(known):.3f}" if known else None
+
+
+def _decode(value: str, encoded: bool) -> str:
+    return base64.b64decode(value).decode('utf-8', errors='replace') if encoded else value
+
+
+def make_handler(stub: Judge0Stub, quiet: bool):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            if not quiet:
+                super().log_message(fmt, *args)
+
+        def _send(self, status: int, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _query(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            return url.path.rstrip('/'), query, query.get('base64_encoded') == 'true'
+
+        def do_POST(self):
+            path, query, encoded = self._query()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                return self._send(400, {'error': 'invalid JSON'})
+
+            if path == '/submissions/batch':
+                return self._send(201, [stub.create(item, encoded) for item in body.get('submissions', [])])
+            if path == '/submissions':
+                created = stub.create(body, encoded)
+                if 'token' not in created:
+                    return self._send(422, created)
+                if query.get('wait') == 'true':
+                    stub.wait(created['token'], stub.executor.timeout + 5)
+                    return self._send(201, stub.get(created['token'], encoded))
+                return self._send(201, created)
+            self._send(404, {'error': 'not found'})
+
+        def do_GET(self):
+            path, query, encoded = self._query()
+            fields = set(query['fields'].split(',')) if query.get('fields') and query['fields'] != '*' else None
+            if path == '/submissions/batch':
+                tokens = [t for t in query.get('tokens', '').split(',') if t]
+                return self._send(200, {'submissions': [stub.get(t, encoded, fields) for t in tokens]})
+            if path.startswith('/submissions/'):
+                submission = stub.get(path.rsplit('/', 1)[1], encoded, fields)
+                if submission is None:
+                    return self._send(404, {'error': 'Not found'})
+                return self._send(200, submission)
+            if path == '/about':
+                return self._send(200, {'version': 'stub', 'homepage': 'https://judge0.com'})
+            self._send(404, {'error': 'not found'})
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = 'Serve a Judge0-compatible API (submissions, batch submissions) backed by the local sandbox, for tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default='127.0.0.1:2358', help="'host:port' to listen on")
+        parser.add_argument('--workers', type=int, default=4, help='Submissions executed concurrently')
+        parser.add_argument('--quiet', action='store_true', help='Do not log every request')
+
+    def handle(self, *args, **options):
+        host, port = options['address'].rsplit(':', 1)
+        # execute_code always runs locally, whatever JUDGE0_URL says
+        executor = CodeExecutor(pool_size=options['workers'])
+        executor.start_pool()
+        stub = Judge0Stub(executor, options['workers'])
+
+        server = ThreadingHTTPServer((host, int(port)), make_handler(stub, options['quiet']))
+        self.stdout.write(self.style.SUCCESS(f"Judge0 stub listening on http://{options['address']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stub.jobs.shutdown(wait=False)
+            if executor.pool is not None:
+                executor.pool.shutdown()
@@ -0,0 +1,170 @@
+import asyncio
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+# Replies sent as +OK to connection set-up commands clients issue
+ACCEPTED = {b'SELECT', b'AUTH', b'CLIENT', b'READONLY', b'FLUSHALL', b'FLUSHDB'}
+
+
+class RedisPubSubStub:
+    """
+    The part of Redis the pub/sub channel layer (channels_redis.pubsub) uses:
+    SUBSCRIBE, UNSUBSCRIBE, PUBLISH and PING, over RESP2 or RESP3 (HELLO), in
+    one process.
+    """
+
+    def __init__(self, quiet: bool):
+        self.quiet = quiet
+        self.subscribers = defaultdict(set)  # channel -> writers
+        self.resp3 = set()  # writers that switched to RESP3 with HELLO 3
+        self.published = 0
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscribed = set()
+        try:
+            while True:
+                command = await _read_command(reader)
+                if command is None:
+                    break
+                name, args = command[0].upper(), command[1:]
+                if name == b'QUIT':
+                    writer.write(b'+OK\r\n')
+                    break
+                self._dispatch(name, args, writer, subscribed)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            for channel in subscribed:
+                self._drop(channel, writer)
+            self.resp3.discard(writer)
+            writer.close()
+
+    def _push(self, writer, items):
+        # Pub/sub messages are out-of-band pushes in RESP3
+        writer.write(_array(items, b'>' if writer in self.resp3 else b'*'))
+
+    def _dispatch(self, name: bytes, args, writer, subscribed: set):
+        if name == b'HELLO':
+            version = int(args[0]) if args else 2
+            if version not in (2, 3):
+                writer.write(b'-NOPROTO unsupported protocol version\r\n')
+                return
+            fields = [b'server', b'redis', b'version', b'7.0.0', b'proto', version, b'id', id(writer) % 100000,
+                      b'mode', b'standalone', b'role', b'master', b'modules', []]
+            if version == 3:
+                self.resp3.add(writer)
+                writer.write(_map(fields))
+            else:
+                self.resp3.discard(writer)
+                writer.write(_array(fields))
+        elif name == b'PING':
+            if subscribed:
+                self._push(writer, [b'pong', args[0] if args else b''])
+            else:
+                writer.write(_bulk(args[0]) if args else b'+PONG\r\n')
+        elif name == b'ECHO' and args:
+            writer.write(_bulk(args[0]))
+        elif name in ACCEPTED:
+            writer.write(b'+OK\r\n')
+        elif name == b'INFO':
+            writer.write(_bulk(b'# Server\r\nredis_version:7.0.0\r\nredis_mode:standalone\r\n'))
+        elif name == b'PUBLISH' and len(args) == 2:
+            channel, message = args
+            receivers = list(self.subscribers.get(channel, ()))
+            for receiver in receivers:
+                self._push(receiver, [b'message', channel, message])
+            self.published += 1
+            if not self.quiet:
+                print(f"PUBLISH {channel.decode(errors='replace')} -> {len(receivers)} ({len(message)} bytes)")
+            writer.write(_integer(len(receivers)))
+        elif name == b'SUBSCRIBE' and args:
+            for channel in args:
+                subscribed.add(channel)
+                self.subscribers[channel].add(writer)
+                self._push(writer, [b'subscribe', channel, len(subscribed)])
+        elif name == b'UNSUBSCRIBE':
+            channels = args or list(subscribed)
+            if not channels:
+                self._push(writer, [b'unsubscribe', None, 0])
+            for channel in channels:
+                subscribed.discard(channel)
+                self._drop(channel, writer)
+                self._push(writer, [b'unsubscribe', channel, len(subscribed)])
+        else:
+            writer.write(f"-ERR unknown command '{name.decode(errors='replace')}'\r\n".encode())
+
+    def _drop(self, channel: bytes, writer):
+        writers = self.subscribers.get(channel)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self.subscribers[channel]
+
+
+async def _read_command(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        # Inline command (redis-cli without RESP, telnet)
+        return line.split() or [b'PING']
+    items = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        if not header.startswith(b'$'):
+            raise ValueError('expected a bulk string')
+        data = await reader.readexactly(int(header[1:]) + 2)
+        items.append(data[:-2])
+    return items
+
+
+def _bulk(value: bytes) -> bytes:
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def _integer(value: int) -> bytes:
+    return b':%d\r\n' % value
+
+
+def _value(item) -> bytes:
+    if isinstance(item, int):
+        return _integer(item)
+    if isinstance(item, list):
+        return _array(item)
+    return _bulk(item)
+
+
+def _array(items, kind: bytes = b'*') -> bytes:
+    return b''.join([kind + b'%d\r\n' % len(items)] + [_value(item) for item in items])
+
+
+def _map(fields) -> bytes:
+    return b''.join([b'%%%d\r\n' % (len(fields) // 2)] + [_value(item) for item in fields])
+
+
+class Command(BaseCommand):
+    help = ('Serve the Redis pub/sub subset used by channels_redis.pubsub.RedisPubSubChannelLayer, '
+            'for running several backend processes locally without Redis')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default='127.0.0.1:6379', help="'host:port' to listen on")
+        parser.add_argument('--quiet', action='store_true', help='Do not log every PUBLISH')
+
+    def handle(self, *args, **options):
+        host, port = options['address'].rsplit(':', 1)
+        stub = RedisPubSubStub(options['quiet'])
+
+        async def main():
+            server = await asyncio.start_server(stub.serve, host, int(port))
+            self.stdout.write(self.style.SUCCESS(f"Redis pub/sub stub listening on redis://{options['address']}"))
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_userprofile_otp_userprofile_otp_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codetask',
+            name='cpu_system_time',
+            field=models.FloatField(blank=True, help_text='CPU seconds spent in the kernel', null=True),
+        ),
+        migrations.AddField(
+            model_name='codetask',
+            name='cpu_user_time',
+            field=models.FloatField(blank=True, help_text='CPU seconds spent in user mode', null=True),
+        ),
+        migrations.AddField(
+            model_name='codetask',
+            name='peak_memory_kb',
+            field=models.PositiveIntegerField(blank=True, help_text='Peak resident memory in KB', null=True),
+        ),
+        migrations.AddField(
+            model_name='codetask',
+            name='stderr_bytes',
+            field=models.PositiveIntegerField(blank=True, help_text='Bytes written to stderr', null=True),
+        ),
+        migrations.AddField(
+            model_name='codetask',
+            name='stdout_bytes',
+            field=models.PositiveIntegerField(blank=True, help_text='Bytes written to stdout', null=True),
+        ),
+    ]
@@ -72,6 +72,11 @@ class CodeTask(models.Model):
     error_message = models.TextField(blank=True, null=True, help_text="Error message if execution failed")
     error_kannada = models.TextField(blank=True, null=True, help_text="Error translated to Kannada")
     execution_time = models.FloatField(null=True, blank=True, help_text="Execution time in seconds")
+    cpu_user_time = models.FloatField(null=True, blank=True, help_text="CPU seconds spent in user mode")
+    cpu_system_time = models.FloatField(null=True, blank=True, help_text="CPU seconds spent in the kernel")
+    peak_memory_kb = models.PositiveIntegerField(null=True, blank=True, help_text="Peak resident memory in KB")
+    stdout_bytes = models.PositiveIntegerField(null=True, blank=True, help_text="Bytes written to stdout")
+    stderr_bytes = models.PositiveIntegerField(null=True, blank=True, help_text="Bytes written to stderr")
     is_valid = models.BooleanField(default=False, help_text="Whether code is syntactically valid")
     use_trinket = models.BooleanField(default=False, help_text="Whether to use Trinket IO for execution")
     trinket_embed_url = models.URLField(blank=True, null=True)
@@ -93,6 +98,21 @@ class CodeTask(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+    def record_execution(self, result):
+        """Store an executor result (status/output/error/execution_time/resources) and save"""
+        resources = result.get('resources') or {}
+        self.code_output = result.get('output', '')
+        self.error_message = result.get('error') or None
+        self.execution_time = resources.get('wall_time', result.get('execution_time'))
+        self.cpu_user_time = resources.get('cpu_user')
+        self.cpu_system_time = resources.get('cpu_sys')
+        self.peak_memory_kb = resources.get('peak_rss_kb')
+        self.stdout_bytes = resources.get('stdout_bytes')
+        self.stderr_bytes = resources.get('stderr_bytes')
+        self.status = 'success' if result.get('status') == 'success' else 'error'
+        self.last_executed = timezone.now()
+        self.save()
+
     def __str__(self):
         return f"{self.user.username} - {self.kannada_input[:50]}..."
 
@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/execute/$', consumers.CodeExecutionConsumer.as_asgi(), name='execute-ws'),
+    re_path(r'ws/generate/$', consumers.CodeGenerationConsumer.as_asgi(), name='generate-ws'),
 ]
@@ -57,10 +57,12 @@ class CodeTaskSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'kannada_input', 'english_translation', 'generated_python_code',
             'code_output', 'error_message', 'error_kannada', 'execution_time',
+            'cpu_user_time', 'cpu_system_time', 'peak_memory_kb', 'stdout_bytes', 'stderr_bytes',
             'is_valid', 'use_trinket', 'trinket_embed_url', 'trinket_iframe_html',
             'status', 'created_at', 'updated_at', 'last_executed'
         ]
-        read_only_fields = ['id', 'english_translation', 'code_output', 'error_kannada', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'english_translation', 'code_output', 'error_kannada', 'created_at', 'updated_at',
+                            'cpu_user_time', 'cpu_system_time', 'peak_memory_kb', 'stdout_bytes', 'stderr_bytes']
 
 
 class CodeTaskListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,31 @@
+"""
+Rate limiting for WebSocket messages, with the REST API's throttle rates
+"""
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SocketRateThrottle(SimpleRateThrottle):
+    """
+    AnonRateThrottle/UserRateThrottle for one WebSocket connection. The cache
+    keys are the ones DRF uses, so a client's REST requests and WebSocket
+    messages draw on the same budget ('anon' per address, 'user' per account).
+
+    Args:
+        scope (dict): ASGI scope of the connection
+    """
+
+    def __init__(self, scope):
+        user = scope.get('user')
+        if user is not None and user.is_authenticated:
+            self.scope, self.ident = 'user', user.pk
+        else:
+            client = scope.get('client') or ('unknown',)
+            self.scope, self.ident = 'anon', client[0]
+        super().__init__()
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.ident}
+
+    def allow(self) -> bool:
+        """Record one request; False if it is over the rate (see wait())."""
+        return self.allow_request(None, None)
@@ -44,6 +44,7 @@ urlpatterns = [
     # Original endpoints (keep for backward compatibility)
     path('translate/kannada/', views.translate_kannada, name='translate_kannada'),
     path('execute/code/', views.execute_code, name='execute_code'),
+    path('execute/batch/', views.execute_code_batch, name='execute_code_batch'),
     path('pipeline/full/', views.full_pipeline, name='full_pipeline'),
     path('trinket/embed/', views.generate_trinket_embed, name='generate_trinket_embed'),
     path('preprocess/', views.preprocess_text, name='preprocess_text'),
@@ -4,6 +4,8 @@ Input validation and sanitization utilities
 from rest_framework import serializers
 import re
 
+from nlp_model.code_cache import compiled_cache
+
 
 class KannadaTextValidator(serializers.Serializer):
     """Validator for Kannada text input"""
@@ -58,21 +60,12 @@ class CodeExecutionValidator(serializers.Serializer):
         if len(sanitized.strip()) < 1:
             raise serializers.ValidationError("Code cannot be empty")
         
-        # Check for dangerous imports/operations (basic safety)
-        dangerous_patterns = [
-            r'__import__',
-            r'eval\s*\(',
-            r'exec\s*\(',
-            r'compile\s*\(',
-            r'open\s*\(',
-            r'file\s*\(',
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, sanitized, re.IGNORECASE):
-                raise serializers.ValidationError(
-                    f"Code contains potentially dangerous operation: {pattern}"
-                )
+        # Check imports, dangerous builtins and dunder access (same policy as the executor)
+        verdict = compiled_cache.get(sanitized).verdict
+        if not verdict and not verdict.syntax_error:
+            raise serializers.ValidationError(
+                f"Code contains potentially dangerous operation: {verdict.message()}"
+            )
         
         return sanitized
 
@@ -91,6 +84,35 @@ class CodeExecutionValidator(serializers.Serializer):
         return sanitized_inputs
 
 
+class MultiCaseExecutionValidator(CodeExecutionValidator):
+    """Validator for running one program against several stdin cases"""
+    inputs = None
+    cases = serializers.ListField(
+        child=serializers.ListField(
+            child=serializers.CharField(max_length=1000, allow_blank=True, trim_whitespace=False),
+            max_length=100
+        ),
+        min_length=1,
+        max_length=50,  # Max 50 test cases per request
+        help_text="One list of input values per test case"
+    )
+    expected_outputs = serializers.ListField(
+        child=serializers.CharField(max_length=10000, allow_blank=True, trim_whitespace=False),
+        required=False,
+        help_text="Optional expected output of each test case"
+    )
+
+    def validate_cases(self, value):
+        """Sanitize every test case"""
+        return [[str(inp).replace('\x00', '')[:1000] for inp in case] for case in value]
+
+    def validate(self, data):
+        expected = data.get('expected_outputs')
+        if expected is not None and len(expected) != len(data['cases']):
+            raise serializers.ValidationError("expected_outputs must have one entry per test case")
+        return data
+
+
 class PipelineValidator(serializers.Serializer):
     """Validator for full pipeline input"""
     kannada_description = serializers.CharField(
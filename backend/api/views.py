@@ -8,24 +8,43 @@ import time
 
 from translator.kannada_translator import translator
 from nlp_model.codet5_generator import CodeT5Generator
+from nlp_model.model_lifecycle import ModelManager
+from nlp_model.inference_server import InferenceClient
 from nlp_model.code_executor import executor
+from nlp_model.execution_router import router
 from nlp_model.trinket_io import trinket
 from nlp_model.text_preprocessor import preprocessor
 from django.conf import settings
 from .validators import (
     KannadaTextValidator, 
     CodeExecutionValidator, 
+    MultiCaseExecutionValidator,
     PipelineValidator,
     TrinketEmbedValidator
 )
 
 logger = logging.getLogger(__name__)
 
-# Initialize generator with HuggingFace API
-code_generator = CodeT5Generator(
-    hf_token=settings.HF_TOKEN,
-    hf_repo_id=settings.HF_REPO_ID
-)
+# Generator is built through the lifecycle manager (lazy / background / preload)
+# instead of at import, so Django startup does not block on model loading
+def _build_code_generator():
+    inference_client = None
+    if settings.CODET5_INFERENCE_ADDRESS:
+        inference_client = InferenceClient(
+            settings.CODET5_INFERENCE_ADDRESS,
+            authkey=settings.CODET5_INFERENCE_AUTHKEY.encode(),
+            timeout=settings.CODET5_INFERENCE_TIMEOUT
+        )
+    return CodeT5Generator(
+        hf_token=settings.HF_TOKEN,
+        hf_repo_id=settings.HF_REPO_ID,
+        batch_size=settings.CODET5_BATCH_SIZE,
+        backend=settings.CODET5_BACKEND,
+        model_cache_dir=settings.CODET5_MODEL_CACHE_DIR,
+        inference_client=inference_client
+    )
+
+generator_manager = ModelManager(_build_code_generator, mode=settings.CODET5_LOAD_MODE, name='CodeT5 generator')
 
 @api_view(['POST'])
 @throttle_classes([AnonRateThrottle, UserRateThrottle])
@@ -127,23 +146,16 @@ def execute_code(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Prefer Judge0 if configured
-        if executor.has_judge0():
-            judge_result = executor.execute_via_judge0(code, inputs)
-            if judge_result.get('status') != 'unavailable':
-                result = judge_result
-            else:
-                logger.warning("Judge0 unavailable, falling back to local executor")
-                result = executor.execute_code(code, inputs)
-        else:
-            result = executor.execute_code(code, inputs)
+        # Judge0 or the local sandbox, whichever is currently healthy and faster
+        result, _ = router.execute(code, inputs)
         
         resp = {
             'code': code,
             'status': result['status'],
             'output': result['output'],
             'error': result['error'],
-            'execution_time': result['execution_time']
+            'execution_time': result['execution_time'],
+            'resources': result.get('resources')
         }
         logger.info(f"[execute_code] Completed in {time.time()-start:.3f}s, status={result['status']}")
         return Response(resp)
@@ -155,6 +167,55 @@ def execute_code(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@throttle_classes([AnonRateThrottle, UserRateThrottle])
+def execute_code_batch(request):
+    """
+    Execute one program against several test cases (compiled once, cases run in parallel).
+    Rate limit: same as execute_code, one request per batch
+
+    Request body:
+    {
+        "code": "Python code here",
+        "cases": [["input1"], ["input2"]],
+        "expected_outputs": ["output1", "output2"]   (optional)
+    }
+    """
+    validator = MultiCaseExecutionValidator(data=request.data)
+    if not validator.is_valid():
+        return Response(
+            {
+                'error': 'Invalid input',
+                'error_kannada': 'ಅಮಾನ್ಯ ಇನ್‌ಪುಟ್',
+                'details': validator.errors
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        code = validator.validated_data['code']
+        cases = validator.validated_data['cases']
+        expected = validator.validated_data.get('expected_outputs')
+        logger.info(f"[execute_code_batch] Code length: {len(code)}, cases: {len(cases)}")
+
+        result, exec_env = router.execute_many(code, cases)
+        result['execution_environment'] = exec_env
+        if expected is not None:
+            for case, expected_output in zip(result['cases'], expected):
+                case['expected_output'] = expected_output
+                case['passed'] = case['status'] == 'success' and case['output'].strip() == expected_output.strip()
+            result['passed'] = sum(1 for case in result['cases'] if case['passed'])
+
+        logger.info(f"[execute_code_batch] Completed in {result['execution_time']:.3f}s, counts={result['counts']}")
+        return Response(dict(result, code=code))
+
+    except Exception as e:
+        logger.error(f"Batch execution error: {str(e)}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(['POST'])
 @throttle_classes([AnonRateThrottle, UserRateThrottle])
 def full_pipeline(request):
@@ -260,7 +321,7 @@ def full_pipeline(request):
 
             # --- Step 2: Generate code using Hugging Face Model (CodeT5) ---
             try:
-                generation_result = code_generator.generate_code(english_description)
+                generation_result = generator_manager.get().generate_code(english_description)
                 generated_code = generation_result.get('code', '')
                 if not generated_code:
                     raise ValueError(generation_result.get('error', 'Code generation failed'))
@@ -288,10 +349,10 @@ def full_pipeline(request):
         # Step 3: Prepare execution environment
         if use_trinket and not requires_input:
             # First validate syntax
-            try:
-                compile(generated_code, '<string>', 'exec')
-            except SyntaxError as e:
-                error_msg = f"Syntax Error: {str(e)}"
+            # Parsed once and cached; the execution below reuses the compiled code
+            syntax_error = executor.syntax_error(generated_code)
+            if syntax_error is not None:
+                error_msg = f"Syntax Error: {str(syntax_error)}"
                 error_kannada_info = translator.translate_error_to_kannada(error_msg)
                 response_data.update({
                     'error': error_kannada_info.get('error', error_msg),
@@ -302,16 +363,10 @@ def full_pipeline(request):
                 return Response(response_data)
             
             # Then test runtime execution to catch runtime errors
-            exec_env = 'local'
-            execution_result = executor.execute_via_judge0(generated_code, user_inputs) if executor.has_judge0() else executor.execute_code(generated_code, user_inputs)
-            if execution_result.get('status') == 'unavailable':
-                exec_env = 'local'
-                execution_result = executor.execute_code(generated_code, user_inputs)
-            else:
-                exec_env = 'judge0' if executor.has_judge0() else 'local'
+            execution_result, exec_env = router.execute(generated_code, user_inputs)
             
-            if execution_result['status'] == 'error' and execution_result['error']:
-                # Runtime error detected - translate to Kannada
+            if execution_result['status'] in ('error', 'timeout') and execution_result['error']:
+                # Runtime error or runaway loop detected - translate to Kannada
                 error_kannada_info = translator.translate_error_to_kannada(execution_result['error'])
                 response_data.update({
                     'error': error_kannada_info.get('error', execution_result['error']),
@@ -343,14 +398,8 @@ def full_pipeline(request):
                         'status': 'error'
                     })
         else:
-            # Use executor (Judge0 if available)
-            exec_env = 'local'
-            execution_result = executor.execute_via_judge0(generated_code, user_inputs) if executor.has_judge0() else executor.execute_code(generated_code, user_inputs)
-            if execution_result.get('status') == 'unavailable':
-                exec_env = 'local'
-                execution_result = executor.execute_code(generated_code, user_inputs)
-            else:
-                exec_env = 'judge0' if executor.has_judge0() else 'local'
+            # Use executor (Judge0 or local, see ExecutionRouter)
+            execution_result, exec_env = router.execute(generated_code, user_inputs)
             
             # If there's an error, translate it to Kannada
             error_response = {}
@@ -362,6 +411,7 @@ def full_pipeline(request):
                 'execution_status': execution_result['status'],
                 'output': execution_result['output'],
                 'execution_time': execution_result['execution_time'],
+                'resources': execution_result.get('resources'),
                 'error': error_response.get('error', ''),
                 'error_kannada': error_response.get('error_kannada', ''),
                 'execution_environment': exec_env,
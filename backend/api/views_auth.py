@@ -219,12 +219,21 @@ class CodeTaskViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
         """Execute saved code task"""
+        from nlp_model.execution_router import router
         code_task = self.get_object()
-        # Integration with your existing code executor
-        # This is a placeholder for your execution logic
+        if not code_task.generated_python_code:
+            return Response({'error': 'No code to execute'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result, exec_env = router.execute(code_task.generated_python_code, request.data.get('inputs') or [])
+        code_task.record_execution(result)
         return Response({
-            'message': 'Code execution endpoint',
-            'code_id': code_task.id
+            'code_id': code_task.id,
+            'status': result['status'],
+            'output': result['output'],
+            'error': result['error'],
+            'execution_time': result['execution_time'],
+            'resources': result.get('resources'),
+            'execution_environment': exec_env
         }, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
@@ -401,9 +410,26 @@ class HealthCheckView(generics.GenericAPIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
+        from api.views import generator_manager
+        from nlp_model.code_executor import executor
+        from nlp_model.execution_router import router
+        from nlp_model.interactive import interactive_pool
+        from nlp_model.run_scheduler import run_scheduler
+        model_status = generator_manager.status()
+        if generator_manager.is_ready:
+            generator = generator_manager.get()
+            model_status['cache'] = generator.cache_stats()
+            model_status['hf_api'] = generator.api_metrics()
         return Response({
             'status': 'healthy',
             'message': 'CodeNudi backend is running',
+            'model_ready': generator_manager.is_ready,
+            'model': model_status,
+            'sandbox': executor.pool_stats(),
+            'execution_cache': executor.cache_stats(),
+            'judge0': executor.judge0_stats(),
+            'execution_routing': router.metrics(),
+            'interactive': dict(interactive_pool.stats(), scheduler=run_scheduler.stats()),
             'timestamp': timezone.now()
         }, status=status.HTTP_200_OK)
 
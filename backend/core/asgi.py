@@ -19,6 +19,16 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 # before importing code that may import ORM models
 django_asgi_app = get_asgi_application()
 
+# Start model loading per CODET5_LOAD_MODE
+from api.views import generator_manager  # noqa: E402
+generator_manager.start()
+
+# Pre-start the code execution sandbox workers and the backend health probes
+from nlp_model.code_executor import executor  # noqa: E402
+from nlp_model.execution_router import router  # noqa: E402
+executor.start_pool()
+router.start()
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
@@ -117,11 +117,26 @@ if env_origins:
 CORS_ALLOW_CREDENTIALS = True
 
 # Channels Configuration
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# In-memory only reaches consumers in this process. Set REDIS_URL (several URLs,
+# comma-separated, shard the layer) to run more than one backend instance;
+# CHANNEL_LAYER_BACKEND picks the channels_redis flavour (pub/sub by default,
+# channels_redis.core.RedisChannelLayer for the list-based one).
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": os.getenv('CHANNEL_LAYER_BACKEND', 'channels_redis.pubsub.RedisPubSubChannelLayer'),
+            "CONFIG": {
+                "hosts": [url.strip() for url in REDIS_URL.split(',') if url.strip()],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
     }
-}
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -158,6 +173,22 @@ CACHES = {
 # HuggingFace Configuration (Optional - for CodeT5 inference API)
 HF_TOKEN = os.getenv('HF_TOKEN', '')
 HF_REPO_ID = os.getenv('HF_REPO_ID', 'kannada-codet5')
+CODET5_BATCH_SIZE = int(os.getenv('CODET5_BATCH_SIZE', '8'))  # lines per forward pass for multi-line input
+CODET5_BACKEND = os.getenv('CODET5_BACKEND', 'pytorch')  # 'pytorch', 'quantized' (torch int8) or 'onnx' (ONNX Runtime int8)
+CODET5_MODEL_CACHE_DIR = os.getenv('CODET5_MODEL_CACHE_DIR', str(BASE_DIR / 'model_cache'))
+# When the generator is built: 'lazy' (first request), 'background' (warm-up thread at
+# startup, readiness on /api/health/) or 'preload' (at startup; use with `gunicorn --preload`
+# so forked workers share the weights copy-on-write)
+CODET5_LOAD_MODE = os.getenv('CODET5_LOAD_MODE', 'lazy')
+
+# Dedicated inference process (python manage.py run_inference_server). When the address is
+# set ('host:port' or a Unix socket path), web workers send model calls there instead of
+# loading CodeT5 themselves; the server batches concurrent requests.
+CODET5_INFERENCE_ADDRESS = os.getenv('CODET5_INFERENCE_ADDRESS', '')
+CODET5_INFERENCE_AUTHKEY = os.getenv('CODET5_INFERENCE_AUTHKEY', SECRET_KEY)
+CODET5_INFERENCE_TIMEOUT = float(os.getenv('CODET5_INFERENCE_TIMEOUT', '30'))  # seconds
+CODET5_MAX_BATCH_SIZE = int(os.getenv('CODET5_MAX_BATCH_SIZE', '16'))  # descriptions per dynamic batch
+CODET5_MAX_BATCH_WAIT_MS = float(os.getenv('CODET5_MAX_BATCH_WAIT_MS', '10'))  # max time a request waits for a batch
 
 # Code Executor Configuration
 EXECUTOR_TIMEOUT = 10  # seconds
@@ -4,3 +4,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Start model loading per CODET5_LOAD_MODE (preload runs here, before gunicorn forks)
+from api.views import generator_manager  # noqa: E402
+generator_manager.start()
@@ -0,0 +1,120 @@
+"""
+Per-execution resource accounting.
+
+Every backend attaches a ``resources`` dict to its result:
+
+    wall_time     seconds on the wall clock
+    cpu_user      CPU seconds in user mode      (None if the backend cannot tell)
+    cpu_sys       CPU seconds in kernel mode    (None if the backend cannot tell)
+    peak_rss_kb   peak resident memory in KB    (None if the backend cannot tell)
+    stdout_bytes  bytes the program wrote to stdout (before truncation)
+    stderr_bytes  bytes the program wrote to stderr (before truncation)
+"""
+import sys
+import time
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def usage(wall_time: float, cpu_user: Optional[float] = None, cpu_sys: Optional[float] = None,
+          peak_rss_kb: Optional[int] = None, stdout_bytes: int = 0, stderr_bytes: int = 0) -> Dict:
+    return {
+        'wall_time': round(wall_time, 4),
+        'cpu_user': None if cpu_user is None else round(cpu_user, 4),
+        'cpu_sys': None if cpu_sys is None else round(cpu_sys, 4),
+        'peak_rss_kb': peak_rss_kb,
+        'stdout_bytes': stdout_bytes,
+        'stderr_bytes': stderr_bytes,
+    }
+
+
+def utf8_len(text: str) -> int:
+    return len(text.encode('utf-8', 'surrogatepass')) if text else 0
+
+
+def maxrss_kb(ru_maxrss: int) -> int:
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return ru_maxrss // 1024 if sys.platform == 'darwin' else ru_maxrss
+
+
+def reset_peak_rss():
+    """Reset this process's VmHWM (Linux >= 4.0) so the next reading covers one run only."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    return maxrss_kb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+class ResourceMeter:
+    """
+    Measures one run in the current process.
+
+    Args:
+        dedicated_process (bool): The process runs nothing else (a sandbox worker):
+            CPU is taken for the whole process and peak memory is reset per run.
+            Otherwise CPU is per thread where supported and peak memory is unknown,
+            since it would be the web server's.
+    """
+
+    __slots__ = ('dedicated_process', '_wall', '_cpu', '_end')
+
+    def __init__(self, dedicated_process: bool = False):
+        self.dedicated_process = dedicated_process
+        self._wall = 0.0
+        self._cpu = None
+        self._end = None
+
+    def _rusage(self):
+        if resource is None:
+            return None
+        if self.dedicated_process:
+            return resource.getrusage(resource.RUSAGE_SELF)
+        return resource.getrusage(getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF))
+
+    def start(self):
+        if self.dedicated_process:
+            reset_peak_rss()
+        self._end = None
+        self._cpu = self._rusage()
+        self._wall = time.perf_counter()
+
+    def finish(self):
+        """
+        Take the end readings now. For per-thread CPU, call start() and finish()
+        on the thread that runs the code; stop() may then be called from another.
+        """
+        self._end = (time.perf_counter(), self._rusage())
+
+    def stop(self, stdout_bytes: int = 0, stderr_bytes: int = 0) -> Dict:
+        if self._end is None:
+            self.finish()
+        ended_at, end = self._end
+        wall = ended_at - self._wall
+        if end is None or self._cpu is None:
+            return usage(wall, stdout_bytes=stdout_bytes, stderr_bytes=stderr_bytes)
+        return usage(
+            wall,
+            cpu_user=end.ru_utime - self._cpu.ru_utime,
+            cpu_sys=end.ru_stime - self._cpu.ru_stime,
+            peak_rss_kb=peak_rss_kb() if self.dedicated_process else None,
+            stdout_bytes=stdout_bytes,
+            stderr_bytes=stderr_bytes,
+        )
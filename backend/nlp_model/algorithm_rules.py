@@ -0,0 +1,580 @@
+"""
+Declarative rule table for the heuristic code templates used by CodeT5Generator.
+
+Each rule lists the trigger keywords that make it a candidate, the regexes it
+needs (compiled once at import) and an emitter that builds the program. At
+import the table is compiled into a keyword -> rule index, so a description is
+only checked against rules whose trigger words actually appear in it. Rules are
+tried in table order; the first emitter that returns code wins.
+"""
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .postprocessing import Assignments, assignment_lines
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'[a-z_][a-z0-9_]*|\d+')
+
+NUMBER_WORDS = ('number', 'numbers')
+LIST_WORDS = ('list', 'lists', 'array', 'arrays')
+STRING_WORDS = ('string', 'strings')
+PRINT_WORDS = ('print', 'prints', 'printing')
+DISPLAY_WORDS = PRINT_WORDS + ('display', 'displays', 'output')
+STEP_WORDS = ('step', 'increment')
+DESCENDING_WORDS = ('countdown', 'reverse', 'reversed', 'descending', 'backwards')
+# Words that change what a program must do beyond its trigger; a rule that
+# ignores one of them is not a complete answer (see Rule.handles)
+QUALIFIER_WORDS = frozenset(STEP_WORDS + DESCENDING_WORDS + (
+    'odd', 'even', 'every', 'alternate', 'square', 'squares', 'cube', 'cubes',
+    'multiple', 'multiples', 'prime', 'primes', 'factorial',
+))
+
+RANGE_PATTERNS = [
+    re.compile(r'from\s+(\d+|[a-zA-Z_]\w*)\s+to\s+(\d+|[a-zA-Z_]\w*)', re.IGNORECASE),
+    re.compile(r'(\d+|[a-zA-Z_]\w*)\s+to\s+(\d+|[a-zA-Z_]\w*)', re.IGNORECASE),
+    re.compile(r'between\s+(\d+|[a-zA-Z_]\w*)\s+and\s+(\d+|[a-zA-Z_]\w*)', re.IGNORECASE),
+]
+RANGE_END_PATTERN = re.compile(r'to\s+(\d+|[a-zA-Z_]\w*)', re.IGNORECASE)
+
+
+def resolve_var_case(assignments: Assignments, token: str) -> str:
+    """Return token with correct case if it refers to a variable present in assignments; otherwise return as-is."""
+    if token.isdigit():
+        return token
+    entry = assignments.get(token.lower())
+    return entry[0] if entry else token
+
+
+def extract_range(description: str, assignments: Assignments):
+    """Extract start and end expressions for a numeric range from description.
+    Returns (start_expr, end_expr) where each is either a number string or a variable name preserving case.
+    """
+    # Match patterns: 'from X to Y', 'X to Y', 'between X and Y'
+    match = None
+    for pattern in RANGE_PATTERNS:
+        match = pattern.search(description)
+        if match:
+            break
+    if not match:
+        # Fallback: look for explicit end like 'to 10' when start is implied as 1
+        end_only = RANGE_END_PATTERN.search(description)
+        if end_only:
+            return '1', resolve_var_case(assignments, end_only.group(1))
+        return None, None
+    start_expr = resolve_var_case(assignments, match.group(1))
+    end_expr = resolve_var_case(assignments, match.group(2))
+    return start_expr, end_expr
+
+
+class RuleContext:
+    """Everything an emitter may look at for one description."""
+
+    def __init__(self, description: str, generated_code: str, assignments: Assignments):
+        self.description = description
+        self.desc_lower = description.lower()
+        self.words = set(WORD_RE.findall(self.desc_lower))
+        self.qualifiers = self.words & QUALIFIER_WORDS
+        self.generated_code = generated_code
+        self.variables = assignments
+        # "<var> = <value>" lines, the form emitters splice into programs
+        self.assignments = assignment_lines(assignments)
+        # Check if loop logic is already present
+        self.has_loop = any(keyword in generated_code for keyword in ['for', 'while', 'range'])
+
+        # Find N variable from assignments (preserve case)
+        self.n_var = None
+        for key, (var_name, _) in assignments.items():
+            if key in ('n', 'num', 'number'):
+                self.n_var = var_name
+                break
+
+    def has(self, *words) -> bool:
+        """True if any of the given words appears in the description."""
+        return any(w in self.words for w in words)
+
+    def assigned_vars(self) -> List[str]:
+        return [var for var, _ in self.variables.values()]
+
+    def range(self):
+        return extract_range(self.description, self.variables)
+
+
+class Rule:
+    """One heuristic template: trigger keywords, compiled patterns and an emitter."""
+
+    __slots__ = ('name', 'keywords', 'patterns', 'emit', 'needs_no_loop', 'complete', 'handles')
+
+    def __init__(self, name: str, keywords: Tuple[str, ...], patterns: Dict[str, 're.Pattern'],
+                 emit: Callable[[RuleContext, Dict[str, 're.Pattern']], Optional[str]],
+                 needs_no_loop: bool = False, complete: bool = True, handles: Tuple[str, ...] = ()):
+        self.name = name
+        self.keywords = keywords
+        self.patterns = patterns
+        self.emit = emit
+        self.needs_no_loop = needs_no_loop
+        # complete: the emitted program fully answers the description, so the
+        # model can be skipped (see CodeT5Generator._generate_from_template)
+        self.complete = complete
+        # Qualifier words the emitter takes into account: its own trigger words
+        # plus any it reads from the description
+        self.handles = QUALIFIER_WORDS.intersection(keywords + handles)
+
+    def answers(self, ctx: RuleContext) -> bool:
+        """True if this complete template honours every qualifier in the description."""
+        return self.complete and ctx.qualifiers <= self.handles
+
+
+RULES: List[Rule] = []
+
+
+def rule(name: str, keywords, patterns: Optional[Dict[str, str]] = None, needs_no_loop: bool = False,
+         complete: bool = True, handles=()):
+    """Register the decorated emitter in RULES (declaration order = priority)."""
+    compiled = {key: re.compile(p, re.IGNORECASE) for key, p in (patterns or {}).items()}
+
+    def register(emit):
+        RULES.append(Rule(name, tuple(keywords), compiled, emit, needs_no_loop, complete, tuple(handles)))
+        return emit
+    return register
+
+
+def _two_operand_names(ctx: RuleContext):
+    """Pick two operand names from assignments, falling back to input() prompts for a and b."""
+    assignments = list(ctx.assignments)
+    vars_from_assign = ctx.assigned_vars()
+    if len(vars_from_assign) >= 2:
+        return vars_from_assign[0], vars_from_assign[1], assignments
+    a_var, b_var = 'a', 'b'
+    if not assignments:
+        assignments = [
+            f"{a_var} = int(input('Enter first number: '))",
+            f"{b_var} = int(input('Enter second number: '))"
+        ]
+    return a_var, b_var, assignments
+
+
+def _binary_op(ctx: RuleContext, operator: str) -> str:
+    a_var, b_var, assignments = _two_operand_names(ctx)
+    code_parts = list(assignments)
+    code_parts.append(f'result = {a_var} {operator} {b_var}')
+    code_parts.append('print(result)')
+    return '\n'.join(code_parts)
+
+
+def _range_loop(ctx: RuleContext, body: List[str]) -> Optional[str]:
+    # Ascending with step 1 only; a step or a direction is step_loop/countdown's job
+    if ctx.has(*STEP_WORDS, *DESCENDING_WORDS):
+        return None
+    start_expr, end_expr = ctx.range()
+    if not end_expr:
+        return None
+    code_parts = list(ctx.assignments)
+    code_parts.append(f'for i in range({start_expr or 1}, {end_expr} + 1):')
+    code_parts.extend(body)
+    return '\n'.join(code_parts)
+
+
+def _on_text_input(*lines) -> str:
+    return '\n'.join(["text = input('Enter a string: ')"] + list(lines))
+
+
+# ========== ARITHMETIC PATTERNS ==========
+
+@rule('sum_1_to_n', keywords=['sum'], patterns={'range': r'(?:from\s+)?1\s+to\s+([a-zA-Z_]\w*)'},
+      needs_no_loop=True)
+def _sum_to_n(ctx, p):
+    # Sum-related algorithm with range (1 to N, from 1 to N, etc.)
+    has_range = p['range'].search(ctx.desc_lower)
+    has_find_sum = ctx.has('find', 'calculate', 'compute')
+    if not (has_range or has_find_sum) or not ctx.n_var:
+        return None
+    code_parts = list(ctx.assignments)
+    sum_var = 'sum'
+    # Add sum initialization if not already present
+    if not any(f'{sum_var} = 0' in a or f'{sum_var}=0' in a for a in ctx.assignments):
+        code_parts.append(f'{sum_var} = 0')
+    code_parts.append(f'for i in range(1, {ctx.n_var} + 1):')
+    code_parts.append(f'    {sum_var} += i')
+    code_parts.append(f'print({sum_var})')
+    return '\n'.join(code_parts)
+
+
+@rule('sum_two_function', keywords=['function', 'functions'])
+def _sum_two_function(ctx, p):
+    # Write/Define a function to find the sum of two numbers
+    if not (ctx.has('sum') and ctx.has('two') and ctx.has(*NUMBER_WORDS)):
+        return None
+    params = [v for v in dict.fromkeys(ctx.assigned_vars()) if v.lower() != 'sum']
+    a_name, b_name = (params[0], params[1]) if len(params) >= 2 else ('a', 'b')
+
+    code_parts = [
+        f'def sum_two_numbers({a_name}, {b_name}):',
+        f'    return {a_name} + {b_name}',
+    ]
+    assign_map = {}
+    for a in ctx.assignments:
+        var, val = [x.strip() for x in a.split('=')]
+        assign_map[var] = val
+
+    # Example usage: reuse assigned variables when available, otherwise a simple demo
+    if a_name in assign_map and b_name in assign_map:
+        code_parts.append(f'print(sum_two_numbers({a_name}, {b_name}))')
+    elif len(assign_map) >= 2:
+        keys = list(assign_map.keys())
+        code_parts.append(f'{keys[0]} = {assign_map[keys[0]]}')
+        code_parts.append(f'{keys[1]} = {assign_map[keys[1]]}')
+        code_parts.append(f'print(sum_two_numbers({keys[0]}, {keys[1]}))')
+    else:
+        code_parts.append('print(sum_two_numbers(5, 7))')
+    return '\n'.join(code_parts)
+
+
+@rule('add_two', keywords=['add', 'adds', 'addition', 'sum'])
+def _add_two(ctx, p):
+    if 'two variables' not in ctx.desc_lower and 'two numbers' not in ctx.desc_lower:
+        return None
+    return _binary_op(ctx, '+')
+
+
+@rule('multiply_two', keywords=['multiply', 'product'])
+def _multiply_two(ctx, p):
+    # Two operands ("two numbers", "a and b", "a by b"); the product of a list,
+    # of digits or of a range is a different program
+    if ctx.has('list', 'array', 'digits', 'elements', 'from'):
+        return None
+    if not ('two variables' in ctx.desc_lower or 'two numbers' in ctx.desc_lower
+            or ctx.has('and', 'by', 'with') or len(ctx.variables) == 2):
+        return None
+    return _binary_op(ctx, '*')
+
+
+@rule('divide_two', keywords=['divide', 'division'])
+def _divide_two(ctx, p):
+    if not ctx.has('by', 'two'):
+        return None
+    return _binary_op(ctx, '/')
+
+
+@rule('subtract_two', keywords=['subtract', 'minus', 'difference'])
+def _subtract_two(ctx, p):
+    if not ctx.has('from', 'two'):
+        return None
+    return _binary_op(ctx, '-')
+
+
+# ========== PRINT / CONDITION / RANGE PATTERNS ==========
+
+@rule('even_range', keywords=['even'], needs_no_loop=True)
+def _even_range(ctx, p):
+    return _range_loop(ctx, ['    if i % 2 == 0:', '        print(i)'])
+
+
+# Not complete: "print <word>" is a guess the model may improve on
+@rule('print_text', keywords=PRINT_WORDS, complete=False, patterns={
+    'string': r'print\s+(?:["\'])(.*?)(?:["\'])',
+    'variable': r'print\s+(?:the\s+)?([a-zA-Z_]\w*)',
+})
+def _print_text(ctx, p):
+    # Simple print "something"
+    string_match = p['string'].search(ctx.description)
+    if string_match:
+        return f'print("{string_match.group(1)}")'
+
+    # Simple print hello world (special case for common hallucinations)
+    if 'hello world' in ctx.desc_lower:
+        return 'print("Hello World")'
+
+    # Simple print a variable
+    var_match = p['variable'].search(ctx.desc_lower)
+    if var_match:
+        var_name = var_match.group(1)
+        if any(var_name in a for a in ctx.assignments):
+            return '\n'.join(list(ctx.assignments) + [f'print({var_name})'])
+        return f'print({var_name})'
+    return None
+
+
+@rule('if_condition', keywords=['if'], patterns={
+    'condition': r'if\s+(?:a|the)?\s*([a-zA-Z_]\w*|number)\s+(?:is|==|equals|is equal to)\s+(\d+|\"[^\"]+\"|[a-zA-Z_]\w*).*?print',
+    'text': r'print\s+["\'](.*?)["\']',
+})
+def _if_condition(ctx, p):
+    # If-condition (e.g., If a number is 10 then print it)
+    if not ctx.has(*DISPLAY_WORDS):
+        return None
+    match = p['condition'].search(ctx.desc_lower)
+    if not match:
+        return None
+    var_name = match.group(1).strip()
+    target_val = match.group(2).strip()
+    if var_name.lower() in ['number', 'a number']:
+        var_name = 'num'
+
+    code_parts = [a for a in ctx.assignments if a.split('=')[0].strip() == var_name]
+    if not code_parts:
+        # Default initialization if missing
+        if target_val.isdigit():
+            code_parts.append(f"{var_name} = {target_val}")
+        else:
+            code_parts.append(f"{var_name} = 10  # Example value")
+
+    code_parts.append(f"if {var_name} == {target_val}:")
+    # Detect what to print
+    if 'print it' in ctx.desc_lower or f'print {var_name}' in ctx.desc_lower:
+        code_parts.append(f"    print({var_name})")
+    else:
+        text_match = p['text'].search(ctx.description)
+        if text_match:
+            code_parts.append(f"    print(\"{text_match.group(1)}\")")
+        else:
+            code_parts.append(f"    print({var_name})")
+    return '\n'.join(code_parts)
+
+
+@rule('odd_range', keywords=['odd'], needs_no_loop=True)
+def _odd_range(ctx, p):
+    return _range_loop(ctx, ['    if i % 2 != 0:', '        print(i)'])
+
+
+# ========== LOOP PATTERNS ==========
+
+@rule('while_loop', keywords=['while'], needs_no_loop=True, patterns={
+    'condition': r'while\s+([a-zA-Z_]\w*)\s+(?:is\s+)?(?:less than|<)\s+(\d+|[a-zA-Z_]\w*)',
+})
+def _while_loop(ctx, p):
+    # While loop (e.g., "while x is less than 10")
+    match = p['condition'].search(ctx.desc_lower)
+    if not match:
+        return None
+    var_name, limit = match.group(1), match.group(2)
+    code_parts = []
+    # Add variable initialization if not present
+    if not any(var_name in a for a in ctx.assignments):
+        code_parts.append(f"{var_name} = 0")
+    code_parts.extend(ctx.assignments)
+    code_parts.append(f"while {var_name} < {limit}:")
+    code_parts.append(f"    print({var_name})")
+    code_parts.append(f"    {var_name} += 1")
+    return '\n'.join(code_parts)
+
+
+@rule('step_loop', keywords=STEP_WORDS, needs_no_loop=True, handles=DESCENDING_WORDS,
+      patterns={'step': r'(?:step|increment)(?:\s+(?:size|of|by))*\s+(\d+)'})
+def _step_loop(ctx, p):
+    # For loop with step (e.g., "print numbers from 0 to 10 step 2")
+    step_match = p['step'].search(ctx.desc_lower)
+    if not step_match:
+        return None
+    start_expr, end_expr = ctx.range()
+    if not end_expr:
+        return None
+    start_expr, step = start_expr or '0', step_match.group(1)
+    code_parts = list(ctx.assignments)
+    descending = start_expr.isdigit() and end_expr.isdigit() and int(start_expr) > int(end_expr)
+    if ctx.has(*DESCENDING_WORDS) and not descending:
+        start_expr, end_expr, descending = end_expr, start_expr, True
+    if descending:
+        code_parts.append(f'for i in range({start_expr}, {end_expr} - 1, -{step}):')
+    else:
+        code_parts.append(f'for i in range({start_expr}, {end_expr} + 1, {step}):')
+    code_parts.append('    print(i)')
+    return '\n'.join(code_parts)
+
+
+@rule('countdown', keywords=DESCENDING_WORDS, needs_no_loop=True)
+def _countdown(ctx, p):
+    # Countdown/reverse loop (e.g., "print numbers from 10 to 1" or "countdown")
+    start_expr, end_expr = ctx.range()
+    if not (start_expr and end_expr):
+        return None
+    # Count down from the larger bound; "from 1 to 10" and "from 10 to 1" both mean 10..1
+    if start_expr.isdigit() and end_expr.isdigit() and int(start_expr) > int(end_expr):
+        start_expr, end_expr = end_expr, start_expr
+    code_parts = list(ctx.assignments)
+    code_parts.append(f'for i in range({end_expr}, {start_expr} - 1, -1):')
+    code_parts.append('    print(i)')
+    return '\n'.join(code_parts)
+
+
+# After step_loop and countdown, which handle the ranges it cannot
+@rule('print_range', keywords=PRINT_WORDS + ('display', 'displays'), needs_no_loop=True)
+def _print_range(ctx, p):
+    if not ctx.has('numbers', 'values'):
+        return None
+    return _range_loop(ctx, ['    print(i)'])
+
+
+# ========== INPUT/OUTPUT PATTERNS ==========
+
+@rule('user_input', keywords=['input', 'inputs', 'read', 'take'])
+def _user_input(ctx, p):
+    # Get user input (e.g., "take input from user", "read a number")
+    if not ctx.has('user', 'name', *NUMBER_WORDS):
+        return None
+    if ctx.has('integer', *NUMBER_WORDS):
+        return "num = int(input('Enter a number: '))\nprint(num)"
+    if ctx.has('name', 'text', *STRING_WORDS):
+        var_name = 'name' if ctx.has('name') else 'text'
+        return f"{var_name} = input('Enter {var_name}: ')\nprint({var_name})"
+    return None
+
+
+@rule('multiple_inputs', keywords=['two', 'three'])
+def _multiple_inputs(ctx, p):
+    # Multiple inputs (e.g., "take two numbers as input")
+    if not ctx.has('input', 'inputs', 'read'):
+        return None
+    count = 2 if ctx.has('two') else 3
+    code_parts = [f"num{i} = int(input('Enter number {i}: '))" for i in range(1, count + 1)]
+    if ctx.has('add', 'sum'):
+        code_parts.append(f"result = {' + '.join(f'num{i}' for i in range(1, count + 1))}")
+        code_parts.append("print(result)")
+    else:
+        code_parts.extend(f"print(num{i})" for i in range(1, count + 1))
+    return '\n'.join(code_parts)
+
+
+# ========== STRING MANIPULATION PATTERNS ==========
+
+@rule('reverse_string', keywords=['reverse'])
+def _reverse_string(ctx, p):
+    if not ctx.has(*STRING_WORDS):
+        return None
+    return _on_text_input("reversed_text = text[::-1]", "print(reversed_text)")
+
+
+@rule('uppercase_string', keywords=['uppercase', 'upper', 'capital'])
+def _uppercase_string(ctx, p):
+    if not ctx.has(*STRING_WORDS):
+        return None
+    return _on_text_input("upper_text = text.upper()", "print(upper_text)")
+
+
+@rule('lowercase_string', keywords=['lowercase', 'lower', 'small'])
+def _lowercase_string(ctx, p):
+    if not ctx.has(*STRING_WORDS):
+        return None
+    return _on_text_input("lower_text = text.lower()", "print(lower_text)")
+
+
+@rule('concatenate_strings', keywords=['concatenate', 'join', 'combine'])
+def _concatenate_strings(ctx, p):
+    if not ctx.has(*STRING_WORDS):
+        return None
+    return '\n'.join([
+        "str1 = input('Enter first string: ')",
+        "str2 = input('Enter second string: ')",
+        "result = str1 + str2",
+        "print(result)",
+    ])
+
+
+@rule('string_length', keywords=['length', 'size', 'count'])
+def _string_length(ctx, p):
+    if not ctx.has(*STRING_WORDS):
+        return None
+    return _on_text_input("length = len(text)", "print(length)")
+
+
+# ========== LIST/ARRAY PATTERNS ==========
+
+@rule('create_list', keywords=['create', 'make', 'initialize'],
+      patterns={'values': r'(?:with|of|containing)\s+(\d[\d,\s]*)'})
+def _create_list(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    values_match = p['values'].search(ctx.description)
+    if values_match:
+        code = f"my_list = [{values_match.group(1).strip().rstrip(',')}]"
+    else:
+        code = "my_list = [1, 2, 3, 4, 5]  # Example list"
+    return code + "\nprint(my_list)"
+
+
+@rule('append_list', keywords=['append', 'add'])
+def _append_list(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    return "my_list = [1, 2, 3]\nmy_list.append(4)\nprint(my_list)"
+
+
+@rule('list_sum', keywords=['sum'])
+def _list_sum(ctx, p):
+    if not ctx.has('elements', *LIST_WORDS):
+        return None
+    return "my_list = [1, 2, 3, 4, 5]\ntotal = sum(my_list)\nprint(total)"
+
+
+@rule('list_max', keywords=['maximum', 'max', 'largest'])
+def _list_max(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    return "my_list = [1, 2, 3, 4, 5]\nmaximum = max(my_list)\nprint(maximum)"
+
+
+@rule('list_min', keywords=['minimum', 'min', 'smallest'])
+def _list_min(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    return "my_list = [1, 2, 3, 4, 5]\nminimum = min(my_list)\nprint(minimum)"
+
+
+@rule('sort_list', keywords=['sort', 'sorted', 'sorting'], handles=['descending', 'reverse'])
+def _sort_list(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    sort_call = "my_list.sort(reverse=True)" if ctx.has('descending', 'reverse') else "my_list.sort()"
+    return f"my_list = [5, 2, 8, 1, 9]\n{sort_call}\nprint(my_list)"
+
+
+@rule('iterate_list', keywords=['iterate', 'loop', 'traverse'])
+def _iterate_list(ctx, p):
+    if not ctx.has(*LIST_WORDS):
+        return None
+    return "my_list = [1, 2, 3, 4, 5]\nfor item in my_list:\n    print(item)"
+
+
+def _build_index(rules: List[Rule]) -> Dict[str, Tuple[int, ...]]:
+    index: Dict[str, List[int]] = {}
+    for position, r in enumerate(rules):
+        for keyword in r.keywords:
+            index.setdefault(keyword, []).append(position)
+    return {keyword: tuple(positions) for keyword, positions in index.items()}
+
+
+KEYWORD_INDEX = _build_index(RULES)
+
+
+def candidate_rules(ctx: RuleContext) -> List[Rule]:
+    """Rules whose trigger keywords appear in the description, in priority order."""
+    positions = set()
+    for word in ctx.words:
+        positions.update(KEYWORD_INDEX.get(word, ()))
+    return [RULES[i] for i in sorted(positions)]
+
+
+def match_rule(description: str, generated_code: str, assignments: Assignments,
+               complete_only: bool = False) -> Optional[Tuple[str, str]]:
+    """
+    Run the description through the rule table.
+
+    Args:
+        complete_only: Only consider rules whose template is a complete program
+            and that honour every qualifier (step, direction, ...) in the
+            description
+
+    Returns:
+        (rule_name, code) for the first rule that emits code, or None.
+    """
+    ctx = RuleContext(description, generated_code, assignments)
+    for r in candidate_rules(ctx):
+        if r.needs_no_loop and ctx.has_loop:
+            continue
+        if complete_only and not r.answers(ctx):
+            continue
+        code = r.emit(ctx, r.patterns)
+        if code is not None:
+            return r.name, code
+    return None
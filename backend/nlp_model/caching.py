@@ -0,0 +1,295 @@
+"""
+Caching utilities shared by the NLP and execution services.
+
+- LRUCache: thread-safe in-process LRU with optional TTL and hit/miss counters
+- SQLiteCache: persistent key/value tier with TTL and size-based eviction
+- GenerationCache: two-tier cache for raw CodeT5 outputs
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with optional time-to-live.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept in memory
+            ttl (float): Seconds an entry stays valid (None = no expiry)
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent string cache stored in a single SQLite table.
+    Entries expire after ``ttl`` seconds and the least recently used rows are
+    evicted once the table grows past ``max_entries``.
+    """
+
+    # Run size-based eviction once every N writes instead of on every write
+    EVICT_EVERY = 50
+    # A hit only rewrites accessed_at once it is this many seconds stale, so reads
+    # stay reads; eviction order is only needed to this precision
+    TOUCH_INTERVAL = 600
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        # Opened on first use in each process: a connection must not cross a
+        # fork (CODET5_LOAD_MODE=preload builds this in the gunicorn master)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Create the schema now so a bad path fails here, not on the first request
+        self._open().close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+        conn.commit()
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection (call with the lock held)."""
+        pid = os.getpid()
+        if self._pid != pid:
+            # One inherited from the parent is left alone; closing it could
+            # release the parent's locks
+            self._conn = self._open()
+            self._pid = pid
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT value, created_at, accessed_at FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at, accessed_at = row
+            if self.ttl and created_at + self.ttl < now:
+                # Left for _evict to delete
+                return None
+            if accessed_at + self.TOUCH_INTERVAL < now:
+                conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+                conn.commit()
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then the least recently used rows over max_entries."""
+        removed = 0
+        if self.ttl:
+            removed += conn.execute(
+                'DELETE FROM cache WHERE created_at < ?', (now - self.ttl,)
+            ).rowcount
+        (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)', (overflow,)
+            ).rowcount
+        self.evictions += removed
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM cache')
+            conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()
+        return count
+
+
+class GenerationCache:
+    """
+    Content-addressed cache for raw model generations.
+    Keys are derived from the normalized description, model id, max_length and
+    the inference backend and quantization that produced the text.
+    Lookups go to the in-process LRU first, then to the persistent SQLite tier.
+    """
+
+    def __init__(self, memory_size: int = 512, persistent_path: Optional[str] = None,
+                 ttl: Optional[float] = None, max_entries: int = 10000):
+        self.memory = LRUCache(maxsize=memory_size, ttl=ttl)
+        self.persistent = None
+        if persistent_path:
+            try:
+                self.persistent = SQLiteCache(persistent_path, ttl=ttl, max_entries=max_entries)
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent generation cache unavailable ({persistent_path}): {e}")
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_persistent = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['GenerationCache']:
+        """Build the cache from GENERATION_CACHE_* environment variables (None if disabled)."""
+        if os.getenv('GENERATION_CACHE_ENABLED', 'true').lower() != 'true':
+            return None
+        default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'generation_cache.sqlite3')
+        ttl = float(os.getenv('GENERATION_CACHE_TTL', str(7 * 24 * 3600)))
+        return cls(
+            memory_size=int(os.getenv('GENERATION_CACHE_MEMORY_SIZE', '512')),
+            persistent_path=os.getenv('GENERATION_CACHE_PATH', default_path) or None,
+            ttl=ttl or None,
+            max_entries=int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', '10000')),
+        )
+
+    @staticmethod
+    def normalize(description: str) -> str:
+        """Unicode-normalize and collapse whitespace (case is kept: it names variables)."""
+        return ' '.join(unicodedata.normalize('NFC', description).split())
+
+    def make_key(self, description: str, model_id: str, max_length: int,
+                 backend: str = '', quantization: str = '') -> str:
+        """
+        Args:
+            backend (str): Where the text comes from, e.g. 'pytorch', 'onnx' or 'hf-api'
+            quantization (str): Weight precision of that backend, e.g. 'fp32' or 'int8'
+        """
+        raw = f"{model_id}\x00{backend}\x00{quantization}\x00{max_length}\x00{self.normalize(description)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits_memory += 1
+            return value
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent generation cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                with self._lock:
+                    self.hits_persistent += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent generation cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits_memory, hits_persistent, misses = self.hits_memory, self.hits_persistent, self.misses
+        lookups = hits_memory + hits_persistent + misses
+        return {
+            'hits_memory': hits_memory,
+            'hits_persistent': hits_persistent,
+            'misses': misses,
+            'hit_rate': round((hits_memory + hits_persistent) / lookups, 3) if lookups else 0.0,
+            'memory_size': len(self.memory),
+            'memory_evictions': self.memory.evictions,
+            'persistent_size': len(self.persistent) if self.persistent is not None else 0,
+            'persistent_evictions': self.persistent.evictions if self.persistent is not None else 0,
+        }
@@ -0,0 +1,109 @@
+"""
+LRU cache of parsed and compiled user snippets.
+
+The same generated programs are executed over and over (pipeline validation,
+the user pressing Run, quiz replays). Each unique source is parsed once; the
+syntax check, the safety verdict and the compiled code object sent to the
+sandbox all come from that one parse.
+"""
+import ast
+import hashlib
+import marshal
+import os
+from typing import Dict, Optional
+
+from .caching import LRUCache
+from .safety import SafetyAnalyzer, Verdict, analyzer as default_analyzer
+from .sandbox import SANDBOX_FILENAME
+
+
+# Sources of output that can differ between two runs of the same program
+NONDETERMINISTIC_MODULES = frozenset({'random', 'time', 'datetime', 'secrets', 'uuid'})
+# id()/hash() and default object reprs vary per process, and so does the
+# iteration order of sets of strings (hash randomization)
+NONDETERMINISTIC_NAMES = frozenset({'id', 'hash', 'set', 'frozenset', 'object'})
+
+
+def is_deterministic(tree: ast.AST) -> bool:
+    """
+    True if running the program twice with the same inputs must print the same
+    thing: no clock or randomness imports and nothing whose output depends on
+    memory addresses or hash seeds. Conservative - false negatives only cost a
+    cache miss.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split('.')[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if (node.module or '').split('.')[0] in NONDETERMINISTIC_MODULES:
+                return False
+        elif isinstance(node, ast.Name):
+            if node.id in NONDETERMINISTIC_NAMES:
+                return False
+        elif isinstance(node, (ast.Set, ast.SetComp, ast.ClassDef)):
+            return False
+    return True
+
+
+class CompiledSnippet:
+    """Everything derived from one parse of a source string."""
+
+    __slots__ = ('key', 'code', 'bytecode', 'syntax_error', 'verdict', 'deterministic')
+
+    def __init__(self, key: str, code=None, bytecode: Optional[bytes] = None,
+                 syntax_error: Optional[SyntaxError] = None, verdict: Optional[Verdict] = None,
+                 deterministic: bool = False):
+        self.key = key
+        self.code = code
+        # marshal'd code object, what the sandbox workers receive instead of source
+        self.bytecode = bytecode
+        self.syntax_error = syntax_error
+        self.verdict = verdict
+        # Same (code, inputs) always gives the same result, so results may be memoized
+        self.deterministic = deterministic
+
+
+class CompiledCodeCache:
+    """
+    Args:
+        maxsize (int): Snippets kept (default: COMPILED_CODE_CACHE_SIZE)
+        analyzer (SafetyAnalyzer): Policy applied to each new snippet
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, analyzer: SafetyAnalyzer = default_analyzer):
+        self.cache = LRUCache(maxsize=maxsize or int(os.getenv('COMPILED_CODE_CACHE_SIZE', '512')))
+        self.analyzer = analyzer
+        self.parses = 0
+
+    @staticmethod
+    def make_key(source: str) -> str:
+        return hashlib.sha256(source.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get(self, source: str) -> CompiledSnippet:
+        key = self.make_key(source)
+        snippet = self.cache.get(key)
+        if snippet is not None:
+            return snippet
+
+        self.parses += 1
+        try:
+            tree = ast.parse(source, SANDBOX_FILENAME)
+        except SyntaxError as e:
+            verdict = Verdict(False, f'Syntax error: {e.msg}', e.lineno, (e.offset or 1) - 1, syntax_error=True)
+            snippet = CompiledSnippet(key, syntax_error=e, verdict=verdict)
+        else:
+            verdict = self.analyzer.check(source, tree=tree, key=key)
+            code = compile(tree, SANDBOX_FILENAME, 'exec') if verdict else None
+            snippet = CompiledSnippet(key, code, marshal.dumps(code) if code else None, verdict=verdict,
+                                      deterministic=bool(verdict) and is_deterministic(tree))
+
+        self.cache.set(key, snippet)
+        return snippet
+
+    def stats(self) -> Dict:
+        return dict(self.cache.stats(), parses=self.parses)
+
+
+# Global cache instance
+compiled_cache = CompiledCodeCache()
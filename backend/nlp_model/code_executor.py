@@ -1,35 +1,27 @@
-import subprocess
-import sys
 import os
 import logging
-import signal
-from contextlib import contextmanager
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
 
-import requests
+from .accounting import usage
+from .caching import LRUCache
+from .code_cache import compiled_cache
+from .judge0_client import Judge0Client
+from .sandbox import SandboxPool, run_code
 
 logger = logging.getLogger(__name__)
 
-class TimeoutException(Exception):
-    """Raised when code execution times out."""
-    pass
-
 class CodeExecutor:
     """
     Safely executes Python code with timeout and output capture.
     Prevents dangerous operations and limits resource usage.
     """
     
-    # Forbidden imports and functions that could harm the system
-    FORBIDDEN_PATTERNS = [
-        'import os', 'os.', 'subprocess', 'sys.exit', '__import__',
-        'eval', 'exec', 'compile', 'open', 'quit', 'exit',
-        'socket', 'urllib', 'requests', 'http', 'ftplib', 'smtplib'
-    ]
-    
-    def __init__(self, timeout=10, max_output=10000, judge0_url: Optional[str] = None, judge0_api_key: Optional[str] = None):
+    def __init__(self, timeout=10, max_output=10000, judge0_url: Optional[str] = None, judge0_api_key: Optional[str] = None,
+                 pool_size: Optional[int] = None, worker_max_runs: Optional[int] = None,
+                 memory_limit_mb: Optional[int] = None, max_lines: Optional[int] = None):
         """
         Initialize the executor.
         
@@ -38,11 +30,58 @@ class CodeExecutor:
             max_output (int): Maximum output size in characters
             judge0_url (str): Base URL of Judge0 API (e.g., http://localhost:2358)
             judge0_api_key (str): Optional API key for Judge0 (X-Auth-Token)
+            pool_size (int): Sandbox worker processes for local execution; 0 runs code
+                in-process (default: EXECUTOR_POOL_SIZE)
+            worker_max_runs (int): Executions before a sandbox worker is replaced
+            memory_limit_mb (int): Address-space limit of each sandbox worker
+            max_lines (int): Budget of executed lines per run, 0 = unlimited
+                (default: EXECUTOR_MAX_LINES). Deterministic regardless of machine
+                load, but tracing slows tight loops several times over
         """
         self.timeout = timeout
         self.max_output = max_output
         self.judge0_url = judge0_url or os.getenv('JUDGE0_URL', '').strip()
         self.judge0_api_key = judge0_api_key or os.getenv('JUDGE0_API_KEY', '').strip()
+        # Submissions go through the batch API and a shared poller instead of ?wait=true
+        self.judge0 = Judge0Client(
+            self.judge0_url,
+            self.judge0_api_key,
+            timeout=timeout,
+            max_output=max_output,
+            poll_interval=float(os.getenv('JUDGE0_POLL_INTERVAL', '0.25')),
+        ) if self.judge0_url else None
+        self.max_lines = int(max_lines if max_lines is not None else os.getenv('EXECUTOR_MAX_LINES', '0'))
+
+        # Output beyond max_output is always dropped as it is written; with
+        # EXECUTOR_STOP_ON_OUTPUT_LIMIT=true the program is also stopped right there
+        self.stop_on_output_limit = os.getenv('EXECUTOR_STOP_ON_OUTPUT_LIMIT', 'false').lower() == 'true'
+
+        pool_size = int(pool_size if pool_size is not None else os.getenv('EXECUTOR_POOL_SIZE', '2'))
+        # Workers are started on first use (or by start_pool at server startup)
+        self.pool = SandboxPool(
+            size=pool_size,
+            timeout=timeout,
+            max_output=max_output,
+            max_runs=int(worker_max_runs or os.getenv('EXECUTOR_WORKER_MAX_RUNS', '100')),
+            memory_limit_mb=int(memory_limit_mb or os.getenv('EXECUTOR_MEMORY_LIMIT_MB', '256')),
+            max_lines=self.max_lines,
+            stop_on_output_limit=self.stop_on_output_limit,
+        ) if pool_size > 0 else None
+
+        # Memoized results of deterministic programs; EXECUTION_RESULT_CACHE_SIZE=0 disables
+        result_cache_size = int(os.getenv('EXECUTION_RESULT_CACHE_SIZE', '256'))
+        self.results = LRUCache(
+            maxsize=result_cache_size,
+            ttl=float(os.getenv('EXECUTION_RESULT_CACHE_TTL', '300'))
+        ) if result_cache_size > 0 else None
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._fanout_threads: Optional[ThreadPoolExecutor] = None
+
+    def start_pool(self):
+        """Pre-start the sandbox workers so the first request does not pay for it."""
+        if self.pool is not None:
+            self.pool.start()
 
     def has_judge0(self) -> bool:
         return bool(self.judge0_url)
@@ -50,6 +89,7 @@ class CodeExecutor:
     def execute_via_judge0(self, code: str, inputs: Optional[List[str]] = None, language_id: int = 71) -> dict:
         """
         Execute code using a Judge0 instance if configured.
+        Results of deterministic programs are memoized (see _memoized).
 
         Args:
             code: Source code to run
@@ -58,63 +98,17 @@ class CodeExecutor:
         Returns:
             dict with status/output/error/execution_time
         """
-        if not self.judge0_url:
-            return {'status': 'unavailable', 'output': '', 'error': 'Judge0 URL not configured', 'execution_time': 0}
-
-        url = self.judge0_url.rstrip('/') + '/submissions/?wait=true'
-        payload = {
-            'source_code': code,
-            'language_id': language_id,
-            'stdin': '\n'.join(inputs or []),
-        }
+        return self._memoized(f'judge0:{language_id}', code, inputs,
+                              lambda: self._execute_judge0(code, inputs, language_id))
 
-        headers = {'Content-Type': 'application/json'}
-        if self.judge0_api_key:
-            headers['X-Auth-Token'] = self.judge0_api_key
-
-        start_time = time.time()
-        try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=self.timeout + 5)
-            if not resp.ok:
-                return {
-                    'status': 'error',
-                    'output': '',
-                    'error': f'Judge0 error {resp.status_code}: {resp.text[:200]}',
-                    'execution_time': time.time() - start_time
-                }
-
-            data = resp.json() or {}
-            status_obj = data.get('status', {})
-            status_id = status_obj.get('id')
-            status_desc = status_obj.get('description', '')
-
-            output = data.get('stdout') or ''
-            error = data.get('stderr') or data.get('compile_output') or ''
-
-            status_str = 'success'
-            if status_id == 5:
-                status_str = 'timeout'
-            elif status_id not in (3,):
-                status_str = 'error'
-
-            return {
-                'status': status_str,
-                'output': output[:self.max_output],
-                'error': error[:self.max_output] if error else (status_desc if status_str == 'error' else ''),
-                'execution_time': time.time() - start_time
-            }
+    def _execute_judge0(self, code: str, inputs: Optional[List[str]], language_id: int) -> dict:
+        if self.judge0 is None:
+            return {'status': 'unavailable', 'output': '', 'error': 'Judge0 URL not configured', 'execution_time': 0}
+        return self.judge0.run(code, inputs, language_id)
 
-        except requests.RequestException as e:
-            return {
-                'status': 'unavailable',
-                'output': '',
-                'error': f'Judge0 unavailable: {str(e)}',
-                'execution_time': time.time() - start_time
-            }
-    
     def is_code_safe(self, code: str) -> bool:
         """
-        Check if code contains forbidden patterns.
+        Check code against the safety policy (see nlp_model.safety).
         
         Args:
             code (str): Python code to check
@@ -122,133 +116,192 @@ class CodeExecutor:
         Returns:
             bool: True if code appears safe, False otherwise
         """
-        code_lower = code.lower()
-        
-        for pattern in self.FORBIDDEN_PATTERNS:
-            if pattern.lower() in code_lower:
-                logger.warning(f"Forbidden pattern detected: {pattern}")
-                return False
-        
-        return True
+        return compiled_cache.get(code).verdict.safe
+
+    def syntax_error(self, code: str) -> Optional[SyntaxError]:
+        """SyntaxError of code, or None if it compiles (shares the cached parse)."""
+        return compiled_cache.get(code).syntax_error
     
     def execute_code(self, code: str, inputs=None) -> dict:
         """
-        Execute Python code safely with timeout.
+        Execute Python code safely with timeout in a sandbox worker process.
         
         Args:
             code (str): Python code to execute
+            inputs (list): Values returned by successive input() calls
             
         Returns:
             dict: Execution result with status, output, and errors
         """
-        # Safety check
-        if not self.is_code_safe(code):
+        return self._memoized('local', code, inputs, lambda: self._execute_local(code, inputs))
+
+    def _execute_local(self, code: str, inputs=None) -> dict:
+        # One cached parse serves the syntax check, the safety check and execution
+        snippet = compiled_cache.get(code)
+        return self._rejection(snippet) or self._run_snippet(snippet, code, inputs)
+
+    @staticmethod
+    def _rejection(snippet) -> Optional[dict]:
+        """Error result for code that must not run, or None."""
+        if snippet.syntax_error is not None:
             return {
                 'status': 'error',
                 'output': '',
-                'error': 'Code contains forbidden operations',
+                'error': f'Syntax error: {snippet.syntax_error}',
                 'execution_time': 0
             }
-        
-        # Prepare execution environment
-        input_queue = list(inputs or [])
-
-        def safe_input(prompt: str = ''):
-            if input_queue:
-                return str(input_queue.pop(0))
-            # Fallback to empty string to avoid blocking
-            return ''
-
-        safe_globals = {
-            '__builtins__': {
-                'print': print,
-                'range': range,
-                'len': len,
-                'str': str,
-                'int': int,
-                'float': float,
-                'list': list,
-                'dict': dict,
-                'tuple': tuple,
-                'set': set,
-                'bool': bool,
-                'sum': sum,
-                'max': max,
-                'min': min,
-                'sorted': sorted,
-                'enumerate': enumerate,
-                'zip': zip,
-                'map': map,
-                'filter': filter,
-                'abs': abs,
-                'round': round,
-                'pow': pow,
-                'divmod': divmod,
-                'input': safe_input,
-            }
-        }
-        
-        output = []
-        errors = []
-        execution_time = 0
-        
-        # Redirect stdout to capture output
-        from io import StringIO
-        import time
-        
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = StringIO()
-        sys.stderr = StringIO()
-        
-        try:
-            start_time = time.time()
-            
-            # Execute with timeout
-            exec(code, safe_globals)
-            
-            execution_time = time.time() - start_time
-            
-            output_text = sys.stdout.getvalue()
-            error_text = sys.stderr.getvalue()
-            
-            output = output_text[:self.max_output]
-            errors = error_text[:self.max_output] if error_text else ''
-            
-            return {
-                'status': 'success',
-                'output': output.strip(),
-                'error': errors.strip() if errors else '',
-                'execution_time': round(execution_time, 3)
-            }
-        
-        except TimeoutError:
-            return {
-                'status': 'timeout',
-                'output': sys.stdout.getvalue()[:self.max_output],
-                'error': f'Execution exceeded {self.timeout} seconds',
-                'execution_time': self.timeout
-            }
-        
-        except SyntaxError as e:
+
+        verdict = snippet.verdict
+        if not verdict:
             return {
                 'status': 'error',
                 'output': '',
-                'error': f'Syntax error: {str(e)}',
-                'execution_time': time.time() - start_time if 'start_time' in locals() else 0
-            }
-        
-        except Exception as e:
-            return {
-                'status': 'error',
-                'output': sys.stdout.getvalue()[:self.max_output],
-                'error': f'{type(e).__name__}: {str(e)}',
-                'execution_time': time.time() - start_time if 'start_time' in locals() else 0
+                'error': f'Code contains forbidden operations: {verdict.message()}',
+                'execution_time': 0
             }
-        
+        return None
+
+    def _run_snippet(self, snippet, code: str, inputs=None) -> dict:
+        if self.pool is not None:
+            return self.pool.run(code, inputs, bytecode=snippet.bytecode)
+
+        # Single-process fallback (EXECUTOR_POOL_SIZE=0): runs in this interpreter without
+        # isolation; signals only work in the main thread, so time and lines are traced
+        return run_code(snippet.code, inputs, self.max_output, timeout=self.timeout, max_lines=self.max_lines,
+                        stop_on_output_limit=self.stop_on_output_limit)
+
+    def execute_many(self, code: str, input_sets: List[List[str]]) -> dict:
+        """
+        Run one program against many stdin cases. The code is parsed, checked and
+        compiled once; the cases are spread over the sandbox workers in parallel
+        (deterministic programs still hit the result cache per case).
+
+        Args:
+            code (str): Python code to execute
+            input_sets (list): One list of input() values per case
+
+        Returns:
+            dict: Per-case results under 'cases' plus aggregate timing (see summarize_cases)
+        """
+        start_time = time.time()
+        snippet = compiled_cache.get(code)
+        rejected = self._rejection(snippet)
+        if rejected is not None:
+            return self.summarize_cases([dict(rejected) for _ in input_sets], time.time() - start_time)
+
+        def run_case(inputs):
+            return self._memoized('local', code, inputs, lambda: self._run_snippet(snippet, code, inputs))
+
+        if self.pool is not None and len(input_sets) > 1:
+            cases = list(self._fanout().map(run_case, input_sets))
+        else:
+            cases = [run_case(inputs) for inputs in input_sets]
+        return self.summarize_cases(cases, time.time() - start_time)
+
+    def execute_many_via_judge0(self, code: str, input_sets: List[List[str]], language_id: int = 71) -> dict:
+        """Same as execute_many, as one Judge0 batch submission."""
+        start_time = time.time()
+        if self.judge0 is None:
+            cases = [self._execute_judge0(code, inputs, language_id) for inputs in input_sets]
+        else:
+            cases = self.judge0.run_many(code, input_sets, language_id)
+        return self.summarize_cases(cases, time.time() - start_time)
+
+    def _fanout(self) -> ThreadPoolExecutor:
+        # One thread per sandbox worker: threads only wait on worker pipes
+        with self._inflight_lock:
+            if self._fanout_threads is None:
+                self._fanout_threads = ThreadPoolExecutor(max_workers=self.pool.size,
+                                                          thread_name_prefix='sandbox-fanout')
+            return self._fanout_threads
+
+    @staticmethod
+    def summarize_cases(cases: List[dict], wall_time: float) -> dict:
+        """
+        Returns:
+            dict: status ('success' only if every case succeeded), cases (each with its
+            index), counts per status, wall-clock time of the whole batch, the
+            summed/max per-case execution time and aggregate resources
+        """
+        counts = {}
+        for case in cases:
+            counts[case['status']] = counts.get(case['status'], 0) + 1
+        times = [case.get('execution_time') or 0 for case in cases]
+        measured = [case['resources'] for case in cases if case.get('resources')]
+
+        def total(key):
+            values = [r[key] for r in measured if r.get(key) is not None]
+            return sum(values) if values else None
+        return {
+            'status': 'success' if cases and counts.get('success') == len(cases) else 'error',
+            'cases': [dict(case, index=i) for i, case in enumerate(cases)],
+            'counts': counts,
+            'total_cases': len(cases),
+            'execution_time': round(wall_time, 3),
+            'total_case_time': round(sum(times), 3),
+            'max_case_time': round(max(times), 3) if times else 0,
+            # Summed over cases, except memory which is the largest peak
+            'resources': usage(
+                wall_time,
+                cpu_user=total('cpu_user'),
+                cpu_sys=total('cpu_sys'),
+                peak_rss_kb=max((r['peak_rss_kb'] for r in measured if r.get('peak_rss_kb')), default=None),
+                stdout_bytes=total('stdout_bytes') or 0,
+                stderr_bytes=total('stderr_bytes') or 0,
+            ),
+        }
+
+    def _memoized(self, environment: str, code: str, inputs, run) -> dict:
+        """
+        Return a remembered result for deterministic programs (same code and inputs
+        always print the same thing), otherwise call ``run``. Concurrent identical
+        requests - a whole class pressing Run on the same example - wait for the
+        first one instead of all executing it.
+        """
+        if self.results is None:
+            return run()
+        snippet = compiled_cache.get(code)
+        if not snippet.deterministic:
+            return run()
+
+        key = (environment, snippet.key, tuple(inputs or ()))
+        cached = self.results.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        with self._inflight_lock:
+            in_flight = self._inflight.get(key)
+            if in_flight is None:
+                self._inflight[key] = threading.Event()
+        if in_flight is not None:
+            in_flight.wait(self.timeout + 5)
+            cached = self.results.get(key)
+            if cached is not None:
+                return dict(cached, cached=True)
+            return run()
+
+        try:
+            result = run()
+            # Timeouts depend on load and failures may be infrastructure errors
+            if result.get('status') == 'success':
+                self.results.set(key, result)
+            return result
         finally:
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+            with self._inflight_lock:
+                self._inflight.pop(key).set()
+
+    def pool_stats(self) -> dict:
+        return self.pool.stats() if self.pool is not None else {}
+
+    def judge0_stats(self) -> dict:
+        return self.judge0.stats() if self.judge0 is not None else {}
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the compiled-code and result caches."""
+        return {
+            'compiled': compiled_cache.stats(),
+            'results': self.results.stats() if self.results is not None else {},
+        }
 
 # Global executor instance
 executor = CodeExecutor()
@@ -0,0 +1,224 @@
+"""
+Routes code executions between Judge0 and the local sandbox.
+
+Previously every request tried Judge0 first and only fell back to local
+execution after Judge0 answered 'unavailable', so during an outage each
+request paid the full connect timeout. The router keeps a sliding window of
+latency/outcome per backend and a circuit breaker for Judge0, probes both
+backends in the background, and sends each submission to the faster healthy
+backend. Decisions are counted for the health endpoint.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .code_executor import executor
+from .http_client import CircuitBreaker, LatencyStats
+
+logger = logging.getLogger(__name__)
+
+JUDGE0 = 'judge0'
+LOCAL = 'local'
+
+# Trivial program used by health probes; run without memoization
+PROBE_CODE = 'print(1)'
+
+
+class ExecutionRouter:
+    """
+    Args:
+        executor (CodeExecutor): Provides both backends
+        probe_interval (float): Seconds between background health probes, 0 disables
+        window (int): Executions kept in each backend's sliding window
+        failure_threshold / reset_timeout: Judge0 circuit breaker settings
+        max_error_rate (float): Judge0 is skipped while its windowed failure rate is above this
+        min_samples (int): Samples per backend before latencies are compared; until
+            then Judge0 is preferred, as before
+    """
+
+    def __init__(self, executor, probe_interval: Optional[float] = None, window: int = 50,
+                 failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None,
+                 max_error_rate: float = 0.5, min_samples: int = 3):
+        self.executor = executor
+        self.probe_interval = float(probe_interval if probe_interval is not None
+                                    else os.getenv('EXECUTION_PROBE_INTERVAL', '30'))
+        self.stats = {JUDGE0: LatencyStats(window), LOCAL: LatencyStats(window)}
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(failure_threshold or os.getenv('JUDGE0_FAILURE_THRESHOLD', '3')),
+            reset_timeout=float(reset_timeout or os.getenv('JUDGE0_RESET_TIMEOUT', '30'))
+        )
+        self.max_error_rate = max_error_rate
+        self._judge0_last_ok = True
+        self.min_samples = min_samples
+
+        self.decisions = Counter()
+        self.reasons = Counter()
+        self.last_decision: Dict = {}
+        self.last_probe: Dict = {}
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- routing ---
+
+    def preference(self) -> Tuple[str, str]:
+        """(backend, reason) the next submission would go to, without side effects."""
+        if not self.executor.has_judge0():
+            return LOCAL, 'judge0_not_configured'
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return LOCAL, 'judge0_circuit_open'
+        # A successful probe or call since the failures lets traffic back without
+        # waiting for the window to dilute them
+        if not self._judge0_last_ok and self.stats[JUDGE0].error_rate() > self.max_error_rate:
+            return LOCAL, 'judge0_error_rate'
+
+        judge0_latency = self._mean(JUDGE0)
+        local_latency = self._mean(LOCAL)
+        if judge0_latency is not None and local_latency is not None and local_latency < judge0_latency:
+            return LOCAL, 'local_faster'
+        return JUDGE0, 'judge0_faster' if local_latency is not None else 'judge0_preferred'
+
+    def choose(self) -> Tuple[str, str]:
+        """(backend, reason) for the next submission."""
+        backend, reason = self.preference()
+        # Half-open lets a single trial through; everyone else stays local meanwhile
+        if backend == JUDGE0 and not self.breaker.allow_request():
+            return LOCAL, 'judge0_trial_in_flight'
+        return backend, reason
+
+    def execute(self, code: str, inputs: Optional[List[str]] = None) -> Tuple[Dict, str]:
+        """Run code on the chosen backend; returns (result, backend that produced it)."""
+        backend, reason = self.choose()
+        if backend == JUDGE0:
+            result = self._timed(JUDGE0, lambda: self.executor.execute_via_judge0(code, inputs))
+            if result.get('status') != 'unavailable':
+                self._decided(JUDGE0, reason)
+                return result, JUDGE0
+            logger.warning("Judge0 unavailable, falling back to local executor")
+            reason = 'judge0_unavailable_fallback'
+
+        result = self._timed(LOCAL, lambda: self.executor.execute_code(code, inputs))
+        self._decided(LOCAL, reason)
+        return result, LOCAL
+
+    def execute_many(self, code: str, input_sets: List[List[str]]) -> Tuple[Dict, str]:
+        """Run code against several stdin cases on one backend (see CodeExecutor.execute_many)."""
+        backend, reason = self.choose()
+        if backend == JUDGE0:
+            start = time.monotonic()
+            result = self.executor.execute_many_via_judge0(code, input_sets)
+            if not result['counts'].get('unavailable'):
+                # Batch wall time is not comparable with single runs; only the outcome counts
+                self.breaker.record_success()
+                self._judge0_last_ok = True
+                self._decided(JUDGE0, reason)
+                return result, JUDGE0
+            self._record(JUDGE0, time.monotonic() - start, {'status': 'unavailable'})
+            logger.warning("Judge0 unavailable, running test cases on the local executor")
+            reason = 'judge0_unavailable_fallback'
+
+        result = self.executor.execute_many(code, input_sets)
+        self._decided(LOCAL, reason)
+        return result, LOCAL
+
+    def _timed(self, backend: str, run) -> Dict:
+        start = time.monotonic()
+        try:
+            result = run()
+        except Exception:
+            self._record(backend, time.monotonic() - start, {'status': 'unavailable'})
+            raise
+        if not result.get('cached'):
+            self._record(backend, time.monotonic() - start, result)
+        elif backend == JUDGE0:
+            # Memoized answers say nothing about the backend's current speed or
+            # health; a half-open trial spent on one goes to the next call
+            self.breaker.release_trial()
+        return result
+
+    def _record(self, backend: str, latency: float, result: Dict):
+        # Only infrastructure failures count; errors in user code are normal results
+        ok = result.get('status') != 'unavailable'
+        self.stats[backend].record(latency, ok)
+        if backend == JUDGE0:
+            self._judge0_last_ok = ok
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _mean(self, backend: str) -> Optional[float]:
+        if self.stats[backend].snapshot()['window'] < self.min_samples:
+            return None
+        return self.stats[backend].mean_latency()
+
+    def _decided(self, backend: str, reason: str):
+        with self._lock:
+            self.decisions[backend] += 1
+            self.reasons[reason] += 1
+            self.last_decision = {'backend': backend, 'reason': reason, 'at': time.time()}
+
+    # --- background probes ---
+
+    def start(self):
+        """Start the background prober (idempotent)."""
+        if self.probe_interval <= 0 or (self._prober is not None and self._prober.is_alive()):
+            return
+        self._stop.clear()
+        self._prober = threading.Thread(target=self._probe_loop, name='execution-prober', daemon=True)
+        self._prober.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception as e:
+                logger.warning(f"Execution probe failed: {e}")
+
+    def probe(self) -> Dict:
+        """
+        Run a trivial program on each backend, bypassing result memoization, so
+        latencies stay fresh and an open Judge0 circuit closes as soon as Judge0
+        is back instead of waiting for a user request to risk it.
+        """
+        results = {}
+        if self.executor.has_judge0():
+            results[JUDGE0] = self._probe_one(JUDGE0, lambda: self.executor._execute_judge0(PROBE_CODE, None, 71))
+        results[LOCAL] = self._probe_one(LOCAL, lambda: self.executor._execute_local(PROBE_CODE))
+        self.last_probe = dict(results, at=time.time())
+        return results
+
+    def _probe_one(self, backend: str, run) -> Dict:
+        start = time.monotonic()
+        result = run()
+        latency = time.monotonic() - start
+        self._record(backend, latency, result)
+        return {'status': result.get('status'), 'ms': round(latency * 1000, 1)}
+
+    # --- metrics ---
+
+    def metrics(self) -> Dict:
+        next_backend, next_reason = self.preference()
+        with self._lock:
+            decisions = dict(self.decisions)
+            reasons = dict(self.reasons)
+            last_decision = dict(self.last_decision)
+        return {
+            'next': {'backend': next_backend, 'reason': next_reason},
+            'decisions': decisions,
+            'reasons': reasons,
+            'last_decision': last_decision,
+            'last_probe': self.last_probe,
+            'judge0': dict(self.stats[JUDGE0].snapshot(), circuit=self.breaker.snapshot()),
+            'local': self.stats[LOCAL].snapshot(),
+        }
+
+
+# Global router instance
+router = ExecutionRouter(executor)
@@ -1,9 +1,75 @@
 import os
+import json
 import logging
 from groq import Groq
 
 logger = logging.getLogger(__name__)
 
+GROQ_MODEL = "llama-3.3-70b-versatile"  # Using a strong model for translation and code
+
+# Separator between the English line and the code in streamed answers
+STREAM_SEPARATOR = '---'
+
+# (kannada, english_description, python_code) few-shot examples shared by both prompts
+_EXAMPLES = [
+    ("ಹಲೋ ವರ್ಲ್ಡ್ ಎಂದು ಮುದ್ರಿಸು", "print hello world", 'print("Hello World")'),
+    ("೧ ರಿಂದ ೧೦ ರವರೆಗೆ ಸಂಖ್ಯೆಗಳನ್ನು ಮುದ್ರಿಸು", "print numbers from 1 to 10",
+     "for i in range(1, 11):\n    print(i)"),
+    ("ಸಂಖ್ಯೆ ಧನಾತ್ಮಕವಾಗಿದ್ದರೆ ಧನಾತ್ಮಕ ಎಂದು ಮುದ್ರಿಸು", "if number is positive print positive",
+     'number = 5\nif number > 0:\n    print("Positive")'),
+    ("ಎರಡು ಸಂಖ್ಯೆಗಳನ್ನು ಸೇರಿಸುವ ಕಾರ್ಯವನ್ನು ರಚಿಸು", "create a function to add two numbers",
+     "def add(a, b):\n    return a + b"),
+    ("೧ ರಿಂದ ೫ ರವರೆಗಿನ ಪಟ್ಟಿಯನ್ನು ರಚಿಸು", "create a list from 1 to 5", "numbers = [1, 2, 3, 4, 5]"),
+    ("ಪಟ್ಟಿಯಲ್ಲಿರುವ ಎಲ್ಲಾ ಸಂಖ್ಯೆಗಳನ್ನು ಮುದ್ರಿಸು", "print all numbers in the list",
+     "numbers = [1, 2, 3, 4, 5]\nfor num in numbers:\n    print(num)"),
+    ("ಸಂಖ್ಯೆ ಸಮವಾಗಿದ್ದರೆ ಸಮ ಇಲ್ಲದಿದ್ದರೆ ಬೆಸ ಎಂದು ಮುದ್ರಿಸು", "if number is even print even else print odd",
+     'number = 4\nif number % 2 == 0:\n    print("Even")\nelse:\n    print("Odd")'),
+    ("೧ ರಿಂದ ೧೦೦ ರವರೆಗಿನ ಸಂಖ್ಯೆಗಳ ಮೊತ್ತವನ್ನು ಲೆಕ್ಕಹಾಕು", "calculate sum of numbers from 1 to 100",
+     "total = sum(range(1, 101))\nprint(total)"),
+    ("ಪಟ್ಟಿಯಲ್ಲಿ ದೊಡ್ಡ ಸಂಖ್ಯೆಯನ್ನು ಹುಡುಕು", "find the largest number in the list",
+     "numbers = [3, 7, 2, 9, 1]\nlargest = max(numbers)\nprint(largest)"),
+    ("ವಾಕ್ಯವನ್ನು ಹಿಮ್ಮುಖವಾಗಿ ಮುದ್ರಿಸು", "print the string in reverse",
+     'text = "Hello"\nreversed_text = text[::-1]\nprint(reversed_text)'),
+]
+
+_TASK = """You are an expert programming assistant proficient in Kannada, English, and Python.
+Your task is to:
+1. Translate a given Kannada instruction or description of a coding problem into clear English.
+2. Generate valid, executable Python code based on that instruction.
+
+Examples of expected output:
+"""
+
+_JSON_SYSTEM_PROMPT = _TASK + "".join(
+    f'\nInput: "{kannada}"\nOutput: '
+    f'{json.dumps({"english_description": english, "python_code": code}, ensure_ascii=False)}\n'
+    for kannada, english, code in _EXAMPLES
+) + """
+Return ONLY a valid JSON object with the following format (no markdown, no extra text):
+{
+    "english_description": "The translated English description",
+    "python_code": "The generated python code"
+}
+"""
+
+# Plain-text format for streaming: JSON would only become parseable once complete
+_STREAM_SYSTEM_PROMPT = _TASK + "".join(
+    f'\nInput: "{kannada}"\nOutput:\n{english}\n{STREAM_SEPARATOR}\n{code}\n'
+    for kannada, english, code in _EXAMPLES
+) + f"""
+Answer with the English description on the first line, a line containing only {STREAM_SEPARATOR},
+then the Python code. No markdown, no code fences, no extra text.
+"""
+
+
+def _strip_code_fences(code: str) -> str:
+    lines = code.strip().split('\n')
+    if lines and lines[0].startswith('```'):
+        lines = lines[1:]
+    if lines and lines[-1].strip() == '```':
+        lines = lines[:-1]
+    return '\n'.join(lines).strip()
+
 class GroqService:
     def __init__(self, api_key=None):
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
@@ -31,54 +97,12 @@ class GroqService:
             # We can do this in one prompt for efficiency, or two for clarity.
             # Let's try a combined prompt to save latency.
             
-            system_prompt = """You are an expert programming assistant proficient in Kannada, English, and Python.
-            Your task is to:
-            1. Translate a given Kannada instruction or description of a coding problem into clear English.
-            2. Generate valid, executable Python code based on that instruction.
-
-            Examples of expected output:
-            
-            Input: "ಹಲೋ ವರ್ಲ್ಡ್ ಎಂದು ಮುದ್ರಿಸು"
-            Output: {"english_description": "print hello world", "python_code": "print(\\"Hello World\\")"}
-
-            Input: "೧ ರಿಂದ ೧೦ ರವರೆಗೆ ಸಂಖ್ಯೆಗಳನ್ನು ಮುದ್ರಿಸು"
-            Output: {"english_description": "print numbers from 1 to 10", "python_code": "for i in range(1, 11):\\n    print(i)"}
-
-            Input: "ಸಂಖ್ಯೆ ಧನಾತ್ಮಕವಾಗಿದ್ದರೆ ಧನಾತ್ಮಕ ಎಂದು ಮುದ್ರಿಸು"
-            Output: {"english_description": "if number is positive print positive", "python_code": "number = 5\\nif number > 0:\\n    print(\\"Positive\\")"}
-
-            Input: "ಎರಡು ಸಂಖ್ಯೆಗಳನ್ನು ಸೇರಿಸುವ ಕಾರ್ಯವನ್ನು ರಚಿಸು"
-            Output: {"english_description": "create a function to add two numbers", "python_code": "def add(a, b):\\n    return a + b"}
-
-            Input: "೧ ರಿಂದ ೫ ರವರೆಗಿನ ಪಟ್ಟಿಯನ್ನು ರಚಿಸು"
-            Output: {"english_description": "create a list from 1 to 5", "python_code": "numbers = [1, 2, 3, 4, 5]"}
-
-            Input: "ಪಟ್ಟಿಯಲ್ಲಿರುವ ಎಲ್ಲಾ ಸಂಖ್ಯೆಗಳನ್ನು ಮುದ್ರಿಸು"
-            Output: {"english_description": "print all numbers in the list", "python_code": "numbers = [1, 2, 3, 4, 5]\\nfor num in numbers:\\n    print(num)"}
-
-            Input: "ಸಂಖ್ಯೆ ಸಮವಾಗಿದ್ದರೆ ಸಮ ಇಲ್ಲದಿದ್ದರೆ ಬೆಸ ಎಂದು ಮುದ್ರಿಸು"
-            Output: {"english_description": "if number is even print even else print odd", "python_code": "number = 4\\nif number % 2 == 0:\\n    print(\\"Even\\")\\nelse:\\n    print(\\"Odd\\")"}
-
-            Input: "೧ ರಿಂದ ೧೦೦ ರವರೆಗಿನ ಸಂಖ್ಯೆಗಳ ಮೊತ್ತವನ್ನು ಲೆಕ್ಕಹಾಕು"
-            Output: {"english_description": "calculate sum of numbers from 1 to 100", "python_code": "total = sum(range(1, 101))\\nprint(total)"}
-
-            Input: "ಪಟ್ಟಿಯಲ್ಲಿ ದೊಡ್ಡ ಸಂಖ್ಯೆಯನ್ನು ಹುಡುಕು"
-            Output: {"english_description": "find the largest number in the list", "python_code": "numbers = [3, 7, 2, 9, 1]\\nlargest = max(numbers)\\nprint(largest)"}
-
-            Input: "ವಾಕ್ಯವನ್ನು ಹಿಮ್ಮುಖವಾಗಿ ಮುದ್ರಿಸು"
-            Output: {"english_description": "print the string in reverse", "python_code": "text = \\"Hello\\"\\nreversed_text = text[::-1]\\nprint(reversed_text)"}
-            
-            Return ONLY a valid JSON object with the following format (no markdown, no extra text):
-            {
-                "english_description": "The translated English description",
-                "python_code": "The generated python code"
-            }
-            """
+            system_prompt = _JSON_SYSTEM_PROMPT
             
             user_prompt = f"Kannada Input: {kannada_text}"
 
             completion = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile", # Using a strong model for translation and code
+                model=GROQ_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -90,7 +114,6 @@ class GroqService:
 
             result_json = completion.choices[0].message.content
             
-            import json
             parsed_result = json.loads(result_json)
             
             return {
@@ -104,5 +127,71 @@ class GroqService:
                 "error": str(e)
             }
 
+    def stream_kannada_input(self, kannada_text):
+        """
+        Streaming variant of process_kannada_input.
+
+        Yields event dicts as the completion arrives:
+        {'type': 'translation', 'english_description': str} once the English line is complete,
+        {'type': 'token', 'data': str} for each chunk of code,
+        {'type': 'complete', 'english_description': str, 'generated_code': str} at the end,
+        or a single {'type': 'error', 'error': str}.
+        """
+        if not self.client:
+            yield {'type': 'error', 'error': "Groq client not initialized. Please check API key."}
+            return
+
+        try:
+            stream = self.client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": _STREAM_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Kannada Input: {kannada_text}"}
+                ],
+                temperature=0.1,
+                max_tokens=1024,
+                stream=True
+            )
+
+            buffer = ''
+            english_description = None
+            code_parts = []
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ''
+                if not delta:
+                    continue
+                if english_description is not None:
+                    code_parts.append(delta)
+                    yield {'type': 'token', 'data': delta}
+                    continue
+
+                buffer += delta
+                head, sep, rest = buffer.partition(f'\n{STREAM_SEPARATOR}\n')
+                if not sep:
+                    continue
+                english_description = head.strip()
+                yield {'type': 'translation', 'english_description': english_description}
+                if rest:
+                    code_parts.append(rest)
+                    yield {'type': 'token', 'data': rest}
+
+            if english_description is None:
+                # Separator never arrived: treat the first line as English, the rest as code
+                head, _, rest = buffer.strip().partition('\n')
+                english_description = head.strip()
+                code_parts = [rest.replace(STREAM_SEPARATOR, '', 1)]
+
+            yield {
+                'type': 'complete',
+                'english_description': english_description,
+                'generated_code': _strip_code_fences(''.join(code_parts))
+            }
+
+        except Exception as e:
+            logger.error(f"Groq streaming error: {e}")
+            yield {'type': 'error', 'error': str(e)}
+
 # Singleton instance
 groq_service = GroqService()
@@ -0,0 +1,234 @@
+"""
+Shared HTTP plumbing for calls to external services (HF Inference API, Judge0).
+
+- CircuitBreaker: stops calling a failing endpoint for a cool-down window
+- LatencyStats: sliding window of per-call latency and outcome
+- ResilientHTTPClient: pooled keep-alive requests.Session with bounded
+  retries/backoff, a circuit breaker and latency metrics
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After ``failure_threshold`` consecutive
+    failures the circuit opens and calls are refused for ``reset_timeout``
+    seconds; then a single trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Hand back a half-open trial that ended without calling the endpoint."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit opened after {self._failures} failure(s); "
+                                   f"cooling down for {self.reset_timeout}s")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'retry_in': round(retry_in, 1),
+            }
+
+
+class LatencyStats:
+    """Sliding window of the last ``window`` calls (latency in seconds + success flag)."""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total_calls = 0
+        self.total_errors = 0
+        self.rejected = 0
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._samples.append((latency, ok))
+            self.total_calls += 1
+            if not ok:
+                self.total_errors += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def mean_latency(self, successful_only: bool = True) -> Optional[float]:
+        with self._lock:
+            values = [lat for lat, ok in self._samples if ok or not successful_only]
+        return sum(values) / len(values) if values else None
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = list(self._samples)
+        latencies = sorted(lat for lat, _ in samples)
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            'calls': self.total_calls,
+            'errors': self.total_errors,
+            'rejected_by_breaker': self.rejected,
+            'window': len(samples),
+            'window_error_rate': round(sum(1 for _, ok in samples if not ok) / len(samples), 3) if samples else 0.0,
+            'last_ms': round(samples[-1][0] * 1000, 1) if samples else None,
+            'avg_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            'p50_ms': pct(0.50),
+            'p95_ms': pct(0.95),
+        }
+
+
+class ResilientHTTPClient:
+    """
+    Pooled HTTP client for one external service.
+
+    Args:
+        name (str): Label used in logs and metrics
+        timeout: requests timeout, e.g. (connect_seconds, read_seconds)
+        retries (int): Retries for connection errors and ``retry_statuses``
+        backoff_factor (float): Exponential backoff base between retries (seconds)
+        retry_statuses: HTTP statuses that are retried (503 = HF model loading)
+        retry_methods: Methods retried on ``retry_statuses``; None for all. The
+            default is urllib3's idempotent set, so a POST that may already
+            have been processed is not sent twice. Connection errors (nothing
+            was sent) are retried for every method.
+        pool_size (int): Keep-alive connections kept per host
+        failure_threshold / reset_timeout: Circuit breaker settings
+    """
+
+    def __init__(self, name: str, timeout=(3.05, 20), retries: int = 2, backoff_factor: float = 1.0,
+                 retry_statuses: Iterable[int] = (502, 503, 504),
+                 retry_methods: Optional[Iterable[str]] = Retry.DEFAULT_ALLOWED_METHODS, pool_size: int = 10,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyStats()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # a read timeout already waited the full timeout; don't multiply it
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(retry_statuses),
+            allowed_methods=None if retry_methods is None else frozenset(retry_methods),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if not self.breaker.allow_request():
+            self.latency.record_rejected()
+            raise CircuitOpenError(f"{self.name}: circuit open, skipping call")
+
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.latency.record(time.monotonic() - start, ok=False)
+            self.breaker.record_failure()
+            raise
+
+        ok = response.status_code < 500 and response.status_code != 429
+        self.latency.record(time.monotonic() - start, ok=ok)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self) -> Dict:
+        return {'name': self.name, 'circuit': self.breaker.snapshot(), 'latency': self.latency.snapshot()}
@@ -0,0 +1,221 @@
+"""
+Standalone CodeT5 inference process with request micro-batching.
+
+The server owns the only copy of the model. Web workers send generation
+requests over a local socket (multiprocessing.connection); the server holds
+incoming requests for at most ``max_wait_ms`` or until ``max_batch_size``
+descriptions are queued, runs them through the model as one batch and sends
+each caller its slice of the results.
+
+Run it with:  python manage.py run_inference_server
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def parse_address(address: str):
+    """'host:port' -> (host, port) for TCP, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+class _Job:
+    __slots__ = ('request_id', 'descriptions', 'max_length', 'reply')
+
+    def __init__(self, request_id, descriptions, max_length, reply):
+        self.request_id = request_id
+        self.descriptions = descriptions
+        self.max_length = max_length
+        self.reply = reply
+
+
+class InferenceServer:
+    """Serves ``generator._generate_texts`` to many clients with dynamic batching."""
+
+    def __init__(self, generator, address: str, authkey: bytes,
+                 max_batch_size: int = 16, max_wait_ms: float = 10):
+        self.generator = generator
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: 'queue.Queue[_Job]' = queue.Queue()
+        self._stopped = threading.Event()
+        self._listener = None
+        self.batches = 0
+        self.requests = 0
+        self.descriptions = 0
+
+    def serve_forever(self):
+        self._listener = Listener(self.address, backlog=128, authkey=self.authkey)
+        logger.info(f"Inference server listening on {self.address} "
+                    f"(max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+        threading.Thread(target=self._batch_loop, name='inference-batcher', daemon=True).start()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    if self._stopped.is_set():
+                        break
+                    raise
+                except Exception as e:
+                    # Failed handshake (wrong authkey etc.) must not stop the server
+                    logger.warning(f"Rejected inference client: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'descriptions': self.descriptions,
+            'avg_batch_size': round(self.descriptions / self.batches, 2) if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def _serve_connection(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(message):
+            with send_lock:
+                try:
+                    conn.send(message)
+                except (OSError, EOFError):
+                    pass
+
+        try:
+            while True:
+                message = conn.recv()
+                if message.get('op') == 'stats':
+                    reply({'id': message.get('id'), 'stats': self.stats()})
+                    continue
+                self._queue.put(_Job(
+                    message.get('id'),
+                    list(message.get('descriptions') or []),
+                    int(message.get('max_length', 256)),
+                    reply
+                ))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Hold the batch open until it is full or the oldest request has waited max_wait
+            jobs = [first]
+            size = len(first.descriptions)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job.descriptions)
+
+            self._run_batch(jobs)
+
+    def _run_batch(self, jobs: List[_Job]):
+        groups: Dict[int, List[_Job]] = {}
+        for job in jobs:
+            groups.setdefault(job.max_length, []).append(job)
+
+        for max_length, group in groups.items():
+            flat = [d for job in group for d in job.descriptions]
+            try:
+                texts = self.generator._generate_texts(flat, max_length)
+            except Exception as e:
+                logger.error(f"Batched generation failed: {e}")
+                for job in group:
+                    job.reply({'id': job.request_id, 'error': str(e)})
+                continue
+
+            self.batches += 1
+            self.requests += len(group)
+            self.descriptions += len(flat)
+            offset = 0
+            for job in group:
+                count = len(job.descriptions)
+                job.reply({'id': job.request_id, 'texts': texts[offset:offset + count]})
+                offset += count
+
+
+class InferenceClient:
+    """
+    Client used by web workers. Keeps one connection per thread and
+    reconnects after any failure.
+    """
+
+    def __init__(self, address: str, authkey: bytes, timeout: float = 30):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, message: Dict) -> Dict:
+        message['id'] = next(self._ids)
+        try:
+            conn = self._connection()
+            conn.send(message)
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Inference server did not answer within {self.timeout}s")
+            reply = conn.recv()
+        except Exception:
+            self._drop_connection()
+            raise
+        if reply.get('error'):
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def generate_texts(self, descriptions: List[str], max_length: int = 256) -> List[str]:
+        """Raw model output for each description ('' when generation failed)."""
+        if not descriptions:
+            return []
+        reply = self._call({'op': 'generate', 'descriptions': list(descriptions), 'max_length': max_length})
+        return reply['texts']
+
+    def stats(self) -> Dict:
+        return self._call({'op': 'stats'})['stats']
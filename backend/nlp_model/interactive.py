@@ -0,0 +1,498 @@
+"""
+Warm interpreters for interactive (WebSocket terminal) runs.
+
+Starting ``python`` and importing the modules student code may use takes
+~150 ms, paid on every run when the consumer spawned a fresh process. The pool
+keeps ``size`` interpreters (nlp_model.interactive_runner) started ahead of
+time, blocked on their job pipe with rlimits already applied; a run takes one
+and a replacement is started in the background.
+
+Every session is limited:
+- memory: RLIMIT_AS in the interpreter
+- CPU:    RLIMIT_CPU in the interpreter (SIGXCPU ends the program with a message)
+- wall:   the session is killed ``wall_timeout`` seconds after it started
+- idle:   the session is killed after ``idle_timeout`` seconds without output or input
+A session runs in its own process group and is SIGKILLed as a group when it
+ends, when no client has been connected to it for ``reattach_grace`` seconds,
+or (PR_SET_PDEATHSIG) when the server dies.
+"""
+import asyncio
+import codecs
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .accounting import usage
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the nlp_model package; interpreters run ``-m`` from here
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# How often the watchdog checks the wall and idle limits
+WATCHDOG_INTERVAL = 0.5
+
+# Bytes read from the program's stdout/stderr at a time
+READ_CHUNK = 64 * 1024
+
+
+class InteractiveSession:
+    """
+    One interpreter from the pool, bound to one run.
+
+    ``process`` is an asyncio subprocess whose stdin/stdout/stderr are the
+    program's. The runner's events arrive on the event pipe: input requests go
+    to ``on_input_request``, the exit report is kept in ``report``.
+    """
+
+    def __init__(self, process, job_fd: int, events: asyncio.StreamReader, transport,
+                 wall_timeout: float, idle_timeout: float, warm: bool):
+        self.process = process
+        self.events = events
+        self.wall_timeout = wall_timeout
+        self.idle_timeout = idle_timeout
+        self.warm = warm
+        self.killed_reason: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.last_activity = time.monotonic()
+        self.report: Dict = {}
+        self.on_input_request: Optional[Callable[[Dict], Awaitable[None]]] = None
+        self._job_fd = job_fd
+        self._transport = transport
+        self._event_task: Optional[asyncio.Future] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def start(self, code: str):
+        """Hand the program to the interpreter; it starts running immediately."""
+        payload = json.dumps({'code': code}).encode('utf-8')
+        fd, self._job_fd = self._job_fd, None
+        self.started_at = self.last_activity = time.monotonic()
+        self._event_task = asyncio.ensure_future(self._read_events())
+        # Blocking writes, off the event loop; closing the pipe marks the end of the job
+        await asyncio.to_thread(_write_all_and_close, fd, payload)
+
+    async def _read_events(self):
+        # Ends at EOF: the runner exited, or close() dropped the pipe
+        while True:
+            line = await self.events.readline()
+            if not line:
+                return
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get('type') == 'exit':
+                self.report = event
+            elif event.get('type') == 'input_request' and self.on_input_request is not None:
+                self.touch()
+                await self.on_input_request(event)
+
+    def touch(self):
+        """Record activity (output or input) for the idle timeout."""
+        self.last_activity = time.monotonic()
+
+    async def send_input(self, text: str):
+        self.touch()
+        self.process.stdin.write(text.encode('utf-8'))
+        await self.process.stdin.drain()
+
+    def kill(self, reason: str = 'killed'):
+        """SIGKILL the interpreter and anything it started; safe to call more than once."""
+        if self.alive():
+            if self.killed_reason is None:
+                self.killed_reason = reason
+            # Once reaped the pid may belong to someone else
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        self.close()
+
+    def close(self):
+        if self._job_fd is not None:
+            os.close(self._job_fd)
+            self._job_fd = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._event_task is not None and not self._event_task.done():
+            self._event_task.cancel()
+
+    async def wait(self) -> Dict:
+        """
+        Wait for the program to end, enforcing the wall and idle limits.
+
+        Returns {'exit_code', 'status', 'reason', 'resources'}; status is
+        'success', 'error', 'timeout' (CPU, wall or idle limit) or 'killed'
+        (output limit, disconnect, restart).
+        """
+        exit_task = asyncio.ensure_future(self.process.wait())
+        try:
+            while not exit_task.done():
+                await asyncio.wait({exit_task}, timeout=WATCHDOG_INTERVAL)
+                now = time.monotonic()
+                if self.wall_timeout and now - self.started_at > self.wall_timeout:
+                    self.kill('wall_timeout')
+                elif self.idle_timeout and now - self.last_activity > self.idle_timeout:
+                    self.kill('idle_timeout')
+            exit_code = exit_task.result()
+        finally:
+            if not exit_task.done():
+                exit_task.cancel()
+
+        report = await self._read_report()
+        wall_time = time.monotonic() - self.started_at
+        self.close()
+        resources = report.get('resources') or usage(wall_time)
+        resources['wall_time'] = round(wall_time, 4)
+
+        reason = self.killed_reason or report.get('reason')
+        if reason in ('wall_timeout', 'idle_timeout', 'cpu_timeout'):
+            status = 'timeout'
+        elif reason is not None:
+            status = 'killed'
+        else:
+            status = 'success' if exit_code == 0 else 'error'
+        return {'exit_code': exit_code, 'status': status, 'reason': reason, 'resources': resources}
+
+    async def _read_report(self) -> Dict:
+        # A killed interpreter never writes its report
+        if self._event_task is not None and self._transport is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._event_task), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        return self.report
+
+
+def _write_all_and_close(fd: int, data: bytes):
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    except BrokenPipeError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class OutputRelay:
+    """
+    Relays a program's stdout/stderr to the client in few, large frames.
+
+    Sending one frame per line made ``for i in range(10**5): print(i)`` cost
+    100k JSON encodes and WebSocket frames. Readers put decoded chunks on a
+    bounded queue; a single sender merges them and sends one frame per stream
+    run every ``flush_interval`` seconds, or sooner once ``flush_bytes`` are
+    waiting. When the queue is full the readers stop reading, the pipe fills
+    up and the program blocks in print() until the client catches up.
+
+    After ``max_output`` bytes one {'type': 'output_truncated'} notice goes
+    out and ``on_limit`` is called (the consumer stops the program there unless
+    INTERACTIVE_STOP_ON_OUTPUT_LIMIT=false); anything read after that is
+    counted but not sent.
+
+    Args:
+        send_event (callable): Coroutine sending one event dict to the client
+        flush_interval (float): Seconds output may wait to be merged with more
+        flush_bytes (int): Waiting bytes that trigger an early flush
+        max_output (int): Bytes sent to the client per run
+        queue_size (int): Chunks buffered before reading is paused
+        on_limit (callable): Called once when output goes over ``max_output``
+    """
+
+    def __init__(self, send_event: Callable[[Dict], Awaitable[None]], flush_interval: Optional[float] = None,
+                 flush_bytes: Optional[int] = None, max_output: Optional[int] = None,
+                 queue_size: Optional[int] = None, on_limit: Optional[Callable[[], None]] = None):
+        self.send_event = send_event
+        self.on_limit = on_limit
+        self.flush_interval = float(flush_interval if flush_interval is not None
+                                    else os.getenv('INTERACTIVE_FLUSH_MS', '50')) / 1000
+        self.flush_bytes = int(flush_bytes or os.getenv('INTERACTIVE_FLUSH_BYTES', '16384'))
+        self.max_output = int(max_output or os.getenv('INTERACTIVE_MAX_OUTPUT', '1000000'))
+        self.queue: asyncio.Queue = asyncio.Queue(int(queue_size or os.getenv('INTERACTIVE_SEND_QUEUE', '32')))
+
+        self.written = {'stdout': 0, 'stderr': 0}
+        self.accepted = 0
+        self.dropped = 0
+        self.frames = 0
+        self._noticed = False
+        self._tasks: List[asyncio.Future] = []
+        # Bytes of each stream fully handed to the sender (or dropped)
+        self.relayed = {'stdout': 0, 'stderr': 0}
+        self._progress = asyncio.Event()
+
+    def follow(self, process, on_activity: Callable[[], None]):
+        """Start relaying ``process``'s stdout and stderr."""
+        self._tasks = [
+            asyncio.ensure_future(self.pump(process.stdout, 'stdout', on_activity)),
+            asyncio.ensure_future(self.pump(process.stderr, 'stderr', on_activity)),
+            asyncio.ensure_future(self._send_loop()),
+        ]
+
+    async def pump(self, stream: asyncio.StreamReader, name: str, on_activity: Callable[[], None]):
+        """Read one pipe until EOF."""
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            on_activity()
+            self.written[name] += len(chunk)
+            room = max(self.max_output - self.accepted, 0)
+            if len(chunk) > room:
+                self.dropped += len(chunk) - room
+                chunk = chunk[:room]
+            if chunk:
+                self.accepted += len(chunk)
+                text = decoder.decode(chunk)
+                if text:
+                    await self.queue.put((name, text))
+            if self.dropped and not self._noticed:
+                self._noticed = True
+                if self.on_limit is not None:
+                    self.on_limit()
+                await self.queue.put(('truncated', ''))
+            self.relayed[name] = self.written[name]
+            self._progress.set()
+        # A character cut by the cap is not worth a replacement character
+        text = decoder.decode(b'', final=True)
+        if text and not self.dropped:
+            await self.queue.put((name, text))
+
+    async def sync(self, stdout_bytes: int, timeout: float = 1.0):
+        """
+        Send everything up to byte ``stdout_bytes`` of stdout now, without waiting
+        for the flush interval (an input() prompt must show before the client is
+        told that input is awaited).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.relayed['stdout'] < stdout_bytes and not self.dropped:
+            self._progress.clear()
+            try:
+                await asyncio.wait_for(self._progress.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+        if self._tasks and not self._tasks[-1].done():
+            flushed = loop.create_future()
+            await self.queue.put(('sync', flushed))
+            await asyncio.wait({flushed}, timeout=timeout)
+
+    async def close(self) -> Dict:
+        """Wait for both pipes to close, send what is left; returns the output accounting."""
+        if self._tasks:
+            *pumps, sender = self._tasks
+            await asyncio.gather(*pumps)
+            await self.queue.put(None)
+            await sender
+            self._tasks = []
+        return {
+            'stdout_bytes': self.written['stdout'],
+            'stderr_bytes': self.written['stderr'],
+            'output_truncated': self.dropped > 0,
+            'dropped_bytes': self.dropped,
+            'frames': self.frames,
+        }
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _send_loop(self):
+        loop = asyncio.get_running_loop()
+        pending: List = []
+        size = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = False
+            # Take everything already queued without waiting
+            items = [] if item is False else [item]
+            while not self.queue.empty():
+                items.append(self.queue.get_nowait())
+
+            finished = notice = False
+            synced = []
+            for item in items:
+                if item is None:
+                    finished = True
+                elif item[0] == 'truncated':
+                    notice = True
+                elif item[0] == 'sync':
+                    synced.append(item[1])
+                else:
+                    pending.append(item)
+                    size += len(item[1])
+            if pending and deadline is None:
+                deadline = loop.time() + self.flush_interval
+
+            if pending and (finished or notice or synced or size >= self.flush_bytes
+                            or loop.time() >= deadline):
+                await self._flush(pending)
+                pending, size, deadline = [], 0, None
+            for flushed in synced:
+                if not flushed.done():
+                    flushed.set_result(None)
+            if notice:
+                self.frames += 1
+                await self.send_event({'type': 'output_truncated', 'limit': self.max_output})
+            if finished:
+                return
+
+    async def _flush(self, pending: List):
+        # One frame per run of the same stream keeps stdout/stderr interleaving intact
+        runs = [[pending[0][0], [pending[0][1]]]]
+        for name, text in pending[1:]:
+            if name == runs[-1][0]:
+                runs[-1][1].append(text)
+            else:
+                runs.append([name, [text]])
+        for name, parts in runs:
+            self.frames += 1
+            await self.send_event({'type': 'output', 'stream': name, 'data': ''.join(parts)})
+
+
+class InteractivePool:
+    """
+    Args:
+        size (int): Interpreters kept started and waiting for a job
+        memory_limit_mb (int): Address-space limit of each interpreter
+        cpu_seconds (int): CPU time a run may use
+        wall_timeout (float): Seconds a run may take in total, 0 disables
+        idle_timeout (float): Seconds a run may go without output or input, 0 disables
+    """
+
+    def __init__(self, size: Optional[int] = None, memory_limit_mb: Optional[int] = None,
+                 cpu_seconds: Optional[int] = None, wall_timeout: Optional[float] = None,
+                 idle_timeout: Optional[float] = None):
+        self.size = int(size if size is not None else os.getenv('INTERACTIVE_POOL_SIZE', '2'))
+        self.limits = {
+            'memory_limit_mb': int(memory_limit_mb or os.getenv(
+                'INTERACTIVE_MEMORY_LIMIT_MB', os.getenv('EXECUTOR_MEMORY_LIMIT_MB', '256'))),
+            'cpu_seconds': int(cpu_seconds or os.getenv('INTERACTIVE_CPU_SECONDS', '10')),
+        }
+        self.wall_timeout = float(wall_timeout if wall_timeout is not None
+                                  else os.getenv('INTERACTIVE_WALL_TIMEOUT', '300'))
+        self.idle_timeout = float(idle_timeout if idle_timeout is not None
+                                  else os.getenv('INTERACTIVE_IDLE_TIMEOUT', '120'))
+        self.stop_on_output_limit = os.getenv('INTERACTIVE_STOP_ON_OUTPUT_LIMIT', 'true').lower() == 'true'
+        # Seconds a run survives without any connected viewer, so a client can reattach
+        self.reattach_grace = float(os.getenv('INTERACTIVE_REATTACH_GRACE', '10'))
+
+        self._spares: List[InteractiveSession] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._spawning = 0
+        self.counters = Counter()
+
+    async def warm_up(self):
+        """Start spares up to ``size`` (cheap when the pool is already full)."""
+        self._bind_loop()
+        missing = self.size - len(self._spares) - self._spawning
+        if missing > 0:
+            await asyncio.gather(*(self._add_spare() for _ in range(missing)))
+
+    async def acquire(self) -> InteractiveSession:
+        """A started interpreter waiting for its program; cold-started if no spare is ready."""
+        self._bind_loop()
+        session = None
+        while self._spares:
+            spare = self._spares.pop()
+            if spare.alive():
+                session = spare
+                break
+            spare.close()
+        if session is None:
+            self.counters['cold_starts'] += 1
+            session = await self._spawn(warm=False)
+        else:
+            self.counters['warm_starts'] += 1
+        asyncio.ensure_future(self.warm_up())
+        return session
+
+    def _bind_loop(self):
+        # Subprocess transports belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self.shutdown()
+            self._loop = loop
+
+    async def _add_spare(self):
+        self._spawning += 1
+        try:
+            session = await self._spawn(warm=True)
+        except Exception as e:
+            logger.warning(f"Could not start interactive interpreter: {e}")
+            return
+        finally:
+            self._spawning -= 1
+        if self._loop is asyncio.get_running_loop() and len(self._spares) < self.size:
+            self._spares.append(session)
+        else:
+            session.kill('surplus')
+
+    async def _spawn(self, warm: bool) -> InteractiveSession:
+        job_read, job_write = os.pipe()
+        event_read, event_write = os.pipe()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, '-u', '-m', 'nlp_model.interactive_runner',
+                str(job_read), str(event_write), json.dumps(self.limits),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(job_read, event_write),
+                cwd=BACKEND_DIR,
+                # Only what the interpreter needs; the server's secrets stay out
+                env={'PYTHONIOENCODING': 'utf-8', 'PYTHONDONTWRITEBYTECODE': '1'},
+                start_new_session=True,
+            )
+        except BaseException:
+            os.close(job_write)
+            os.close(event_read)
+            raise
+        finally:
+            # The child's ends; the interpreter holds its own copies
+            os.close(job_read)
+            os.close(event_write)
+        self.counters['spawned'] += 1
+
+        events = asyncio.StreamReader()
+        transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(events), os.fdopen(event_read, 'rb', buffering=0))
+        return InteractiveSession(process, job_write, events, transport,
+                                  self.wall_timeout, self.idle_timeout, warm)
+
+    def shutdown(self):
+        """Kill the spares (e.g. when the event loop they belong to is gone)."""
+        spares, self._spares = self._spares, []
+        for session in spares:
+            session.kill('shutdown')
+
+    def stats(self) -> Dict:
+        return {
+            'size': self.size,
+            'spares': len(self._spares),
+            'limits': dict(self.limits, wall_timeout=self.wall_timeout, idle_timeout=self.idle_timeout,
+                           reattach_grace=self.reattach_grace),
+            **self.counters,
+        }
+
+
+# Global pool instance
+interactive_pool = InteractivePool()
@@ -0,0 +1,139 @@
+"""
+Entry point of a warm interactive interpreter (see interactive.InteractivePool).
+
+Started ahead of time: it imports the allowed modules, starts the JobThread
+the program will run on, applies rlimits and then blocks until the parent
+writes one job to the job pipe. The job runs with
+the process's real stdin/stdout/stderr (the WebSocket terminal). JSON lines on
+the event pipe tell the parent what the program is doing:
+
+    {'type': 'input_request', 'prompt': '...', 'stdout_bytes': n}   input() is about to read a line
+    {'type': 'exit', 'status': int, 'reason': ..., 'resources': {...}}
+
+``stdout_bytes`` is how much the program had written to stdout at that point,
+so the parent can relay the prompt before reporting that input is awaited.
+
+    python -u -m nlp_model.interactive_runner <job_fd> <event_fd> <limits json>
+"""
+import importlib
+import io
+import json
+import os
+import signal
+import sys
+import traceback
+
+from nlp_model.accounting import ResourceMeter
+from nlp_model.safety import ALLOWED_MODULES
+from nlp_model.sandbox import (
+    SAFE_BUILTINS, SANDBOX_FILENAME, JobThread, TimeoutException, _SIGXCPU, _apply_limits, _raise_timeout,
+    _set_cpu_budget
+)
+
+PR_SET_PDEATHSIG = 1
+
+
+def _die_with_parent():
+    """Have the kernel SIGKILL this process if the server process dies (Linux only)."""
+    try:
+        import ctypes
+        ctypes.CDLL(None, use_errno=True).prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    except (OSError, AttributeError):
+        pass
+
+
+def _emit(event_fd: int, event: dict):
+    os.write(event_fd, (json.dumps(event) + '\n').encode('utf-8'))
+
+
+class _CountingStdout(io.RawIOBase):
+    """Unbuffered fd 1 (as with ``-u``) that counts the bytes written."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(1, view):]
+        self.written += len(data)
+        return len(data)
+
+
+def _make_input(stdout: _CountingStdout, event_fd: int):
+    def input(prompt=''):
+        prompt = str(prompt)
+        if prompt:
+            sys.stdout.write(prompt)
+        sys.stdout.flush()
+        _emit(event_fd, {'type': 'input_request', 'prompt': prompt, 'stdout_bytes': stdout.written})
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError('EOF when reading a line')
+        return line[:-1] if line.endswith('\n') else line
+    return input
+
+
+def main():
+    job_fd, event_fd = int(sys.argv[1]), int(sys.argv[2])
+    limits = json.loads(sys.argv[3])
+    _die_with_parent()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Warm up: everything user code may import is already loaded when the job arrives
+    for name in sorted(ALLOWED_MODULES):
+        importlib.import_module(name)
+    # The job runs away from this module's frames and globals (os, sys, ...)
+    job_thread = JobThread()
+    _apply_limits(limits.get('memory_limit_mb'))
+
+    with os.fdopen(job_fd, 'rb') as job_pipe:
+        payload = job_pipe.read()
+    if not payload:
+        return 0
+    job = json.loads(payload)
+
+    stdout = _CountingStdout()
+    sys.stdout = io.TextIOWrapper(stdout, encoding='utf-8', errors='backslashreplace', write_through=True)
+
+    cpu_seconds = limits.get('cpu_seconds')
+    if _SIGXCPU is not None:
+        signal.signal(_SIGXCPU, _raise_timeout(f'Execution exceeded {cpu_seconds} seconds of CPU time'))
+    _set_cpu_budget(cpu_seconds)
+
+    meter = ResourceMeter(dedicated_process=True)
+    meter.start()
+    status, reason = 0, None
+    try:
+        try:
+            code = compile(job['code'], SANDBOX_FILENAME, 'exec')
+            error = job_thread.run(code, {'__builtins__': dict(SAFE_BUILTINS, input=_make_input(stdout, event_fd)),
+                                          '__name__': '__main__'})
+        except BaseException as e:
+            # A syntax error, or a CPU limit that fired just as the job ended
+            error = e
+        if isinstance(error, SystemExit):
+            status = error.code if isinstance(error.code, int) else (0 if error.code is None else 1)
+        elif isinstance(error, TimeoutException):
+            print(f'\n{error}', file=sys.stderr)
+            status, reason = 1, 'cpu_timeout'
+        elif error is not None:
+            # Hide the bootstrap (or this runner's) frame; the user's code starts at the next one
+            traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+            status = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+        _emit(event_fd, {'type': 'exit', 'status': status, 'reason': reason, 'resources': meter.stop()})
+    return status
+
+
+if __name__ == '__main__':
+    os._exit(main())
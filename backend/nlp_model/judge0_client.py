@@ -0,0 +1,276 @@
+"""
+Non-blocking Judge0 client.
+
+Instead of `POST /submissions?wait=true` (one connection held open for the
+whole remote run), submissions are created with `POST /submissions/batch` and
+one shared poller thread resolves the tokens of *all* pending submissions with
+`GET /submissions/batch?tokens=...`. Callers get a concurrent.futures.Future,
+so many remote executions can be in flight without a connection per execution.
+``run``/``run_many`` wait on those futures in the calling thread (the request
+thread of a synchronous view); nothing runs Judge0 from async code.
+
+For local testing run the Judge0-compatible stub:  python manage.py run_judge0_stub
+"""
+import base64
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait as wait_all
+from typing import Dict, List, Optional
+
+import requests
+
+from .accounting import usage, utf8_len
+from .http_client import ResilientHTTPClient
+
+logger = logging.getLogger(__name__)
+
+# Judge0 status ids
+STATUS_IN_QUEUE = 1
+STATUS_PROCESSING = 2
+STATUS_ACCEPTED = 3
+STATUS_TIME_LIMIT = 5
+
+PYTHON3 = 71
+
+
+def _b64encode(text: str) -> str:
+    return base64.b64encode((text or '').encode('utf-8')).decode('ascii')
+
+
+def _b64decode(value: Optional[str]) -> str:
+    if not value:
+        return ''
+    try:
+        return base64.b64decode(value).decode('utf-8', errors='replace')
+    except (ValueError, TypeError):
+        return value
+
+
+def _float(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class _Pending:
+    __slots__ = ('token', 'future', 'deadline', 'started')
+
+    def __init__(self, token: str, future: Future, deadline: float, started: float):
+        self.token = token
+        self.future = future
+        self.deadline = deadline
+        self.started = started
+
+
+class Judge0Client:
+    """
+    Args:
+        base_url (str): Judge0 base URL, e.g. http://localhost:2358
+        api_key (str): Optional X-Auth-Token
+        timeout (float): Per-submission CPU/wall limit sent to Judge0, and how long
+            a submission may stay pending before it is reported as unavailable
+        max_output (int): Maximum output size in characters
+        poll_interval (float): Seconds between batch polls while anything is pending
+        max_batch (int): Submissions per batch request (Judge0's default cap is 20)
+    """
+
+    def __init__(self, base_url: str, api_key: str = '', timeout: float = 10, max_output: int = 10000,
+                 poll_interval: float = 0.25, max_batch: int = 20, http: Optional[ResilientHTTPClient] = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_output = max_output
+        self.poll_interval = poll_interval
+        self.max_batch = max(1, int(max_batch))
+        self.http = http or ResilientHTTPClient('judge0', timeout=(3.05, 10), retries=1, pool_size=20)
+        self.headers = {'Content-Type': 'application/json'}
+        if api_key:
+            self.headers['X-Auth-Token'] = api_key
+
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self.polls = 0
+        self.submitted = 0
+
+    # --- submitting ---
+
+    def submit(self, code: str, inputs: Optional[List[str]] = None, language_id: int = PYTHON3) -> Future:
+        """Queue one run; the Future resolves to a status/output/error/execution_time dict."""
+        return self.submit_many(code, [inputs or []], language_id)[0]
+
+    def submit_many(self, code: str, input_sets: List[List[str]], language_id: int = PYTHON3) -> List[Future]:
+        """Queue the same code once per input list using the batch endpoint."""
+        futures = [Future() for _ in input_sets]
+        submissions = [{
+            'source_code': _b64encode(code),
+            'language_id': language_id,
+            'stdin': _b64encode('\n'.join(inputs or [])),
+            'cpu_time_limit': self.timeout,
+            'wall_time_limit': self.timeout * 2,
+        } for inputs in input_sets]
+
+        for start in range(0, len(submissions), self.max_batch):
+            chunk = submissions[start:start + self.max_batch]
+            chunk_futures = futures[start:start + self.max_batch]
+            started = time.time()
+            try:
+                resp = self.http.post(f'{self.base_url}/submissions/batch?base64_encoded=true',
+                                      json={'submissions': chunk}, headers=self.headers)
+                if not resp.ok:
+                    raise requests.RequestException(f'Judge0 error {resp.status_code}: {resp.text[:200]}')
+                items = resp.json()
+            except (requests.RequestException, ValueError) as e:
+                for future in chunk_futures:
+                    future.set_result(self._unavailable(e, started))
+                continue
+
+            for future, item in zip(chunk_futures, items):
+                token = item.get('token') if isinstance(item, dict) else None
+                if not token:
+                    future.set_result({
+                        'status': 'error',
+                        'output': '',
+                        'error': f'Judge0 rejected submission: {item}',
+                        'execution_time': 0
+                    })
+                    continue
+                self._track(_Pending(token, future, started + self.timeout * 2 + 10, started))
+            self.submitted += len(chunk)
+        return futures
+
+    def run(self, code: str, inputs: Optional[List[str]] = None, language_id: int = PYTHON3) -> Dict:
+        """Blocking convenience wrapper around ``submit``."""
+        return self.wait(self.submit(code, inputs, language_id))
+
+    def run_many(self, code: str, input_sets: List[List[str]], language_id: int = PYTHON3) -> List[Dict]:
+        """Blocking wrapper around ``submit_many``; one deadline covers the whole batch."""
+        futures = self.submit_many(code, input_sets, language_id)
+        wait_all(futures, timeout=self.timeout * 2 + 15)
+        return [f.result() if f.done() else self._unavailable('no result from poller', time.time())
+                for f in futures]
+
+    def wait(self, future: Future) -> Dict:
+        # The poller resolves every future by its deadline; this is only a backstop
+        try:
+            return future.result(timeout=self.timeout * 2 + 15)
+        except FutureTimeout:
+            return self._unavailable('no result from poller', time.time())
+
+    # --- polling ---
+
+    def _track(self, pending: _Pending):
+        with self._lock:
+            self._pending[pending.token] = pending
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name='judge0-poller', daemon=True)
+                self._poller.start()
+        self._wakeup.set()
+
+    def _poll_loop(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                tokens = list(self._pending)
+                if not tokens:
+                    self._wakeup.clear()
+                    continue
+
+            # Judge0 needs a moment for fresh submissions; one sleep serves every caller
+            time.sleep(self.poll_interval)
+            for start in range(0, len(tokens), self.max_batch):
+                self._poll_batch(tokens[start:start + self.max_batch])
+            self._expire_overdue()
+
+    def _poll_batch(self, tokens: List[str]):
+        self.polls += 1
+        try:
+            resp = self.http.get(
+                f'{self.base_url}/submissions/batch',
+                params={
+                    'tokens': ','.join(tokens),
+                    'base64_encoded': 'true',
+                    'fields': 'token,stdout,stderr,compile_output,message,status,time,wall_time,memory',
+                },
+                headers=self.headers
+            )
+            if not resp.ok:
+                logger.warning(f"Judge0 poll returned {resp.status_code}: {resp.text[:200]}")
+                return
+            submissions = resp.json().get('submissions') or []
+        except (requests.RequestException, ValueError) as e:
+            # Pending submissions stay queued until their deadline
+            logger.warning(f"Judge0 poll failed: {e}")
+            return
+
+        for data in submissions:
+            if not data:
+                continue
+            status_id = (data.get('status') or {}).get('id')
+            if status_id in (STATUS_IN_QUEUE, STATUS_PROCESSING, None):
+                continue
+            with self._lock:
+                pending = self._pending.pop(data.get('token'), None)
+            if pending is not None and not pending.future.done():
+                pending.future.set_result(self._to_result(data, pending.started))
+
+    def _expire_overdue(self):
+        now = time.time()
+        with self._lock:
+            overdue = [p for p in self._pending.values() if p.deadline < now]
+            for p in overdue:
+                del self._pending[p.token]
+        for p in overdue:
+            if not p.future.done():
+                p.future.set_result(self._unavailable('submission still pending at deadline', p.started))
+
+    # --- results ---
+
+    def _to_result(self, data: Dict, started: float) -> Dict:
+        status_obj = data.get('status') or {}
+        status_id = status_obj.get('id')
+        output = _b64decode(data.get('stdout'))
+        error = _b64decode(data.get('stderr')) or _b64decode(data.get('compile_output'))
+
+        status_str = 'success'
+        if status_id == STATUS_TIME_LIMIT:
+            status_str = 'timeout'
+        elif status_id != STATUS_ACCEPTED:
+            status_str = 'error'
+
+        wall_time = time.time() - started
+        return {
+            'status': status_str,
+            'output': output[:self.max_output],
+            'error': error[:self.max_output] if error else (status_obj.get('description', '') if status_str == 'error' else ''),
+            'execution_time': wall_time,
+            # Judge0 reports CPU time without a user/sys split and memory in KB
+            'resources': usage(
+                _float(data.get('wall_time'), wall_time),
+                cpu_user=_float(data.get('time')),
+                peak_rss_kb=int(data['memory']) if data.get('memory') is not None else None,
+                stdout_bytes=utf8_len(output),
+                stderr_bytes=utf8_len(error),
+            ),
+        }
+
+    @staticmethod
+    def _unavailable(reason, started: float) -> Dict:
+        return {
+            'status': 'unavailable',
+            'output': '',
+            'error': f'Judge0 unavailable: {reason}',
+            'execution_time': time.time() - started
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'submitted': self.submitted,
+            'polls': self.polls,
+            'http': self.http.metrics(),
+        }
@@ -0,0 +1,111 @@
+"""
+Inference backends for the CodeT5 seq2seq model.
+
+- pytorch:   full-precision AutoModelForSeq2SeqLM (default)
+- quantized: PyTorch dynamic int8 quantization of the Linear layers
+- onnx:      ONNX Runtime with int8 dynamic quantization, exported once and
+             cached on disk; falls back to 'quantized' when optimum/onnxruntime
+             are not installed
+"""
+import logging
+import os
+import re
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+
+# Weight precision of each backend's model
+QUANTIZATION = {'pytorch': 'fp32', 'quantized': 'int8', 'onnx': 'int8'}
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_cache'
+)
+
+# Marker written after a successful export + quantization so later starts skip both
+_READY_MARKER = '.quantized-ready'
+
+
+def _cache_slug(repo_id: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '--', repo_id)
+
+
+def load_seq2seq(repo_id: str, backend: str = 'pytorch', cache_dir: str = None) -> Tuple[object, object, str]:
+    """
+    Load tokenizer and model for the requested backend.
+
+    Args:
+        repo_id (str): HuggingFace repo id or local path of the model
+        backend (str): One of BACKENDS
+        cache_dir (str): Where exported ONNX models are kept (onnx backend only)
+
+    Returns:
+        (tokenizer, model, backend_used) - backend_used differs from backend
+        when a fallback was taken
+    """
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown CodeT5 backend '{backend}', using pytorch")
+        backend = 'pytorch'
+
+    tokenizer = AutoTokenizer.from_pretrained(repo_id)
+
+    if backend == 'onnx':
+        try:
+            model = _load_onnx_int8(repo_id, cache_dir or DEFAULT_CACHE_DIR)
+            return tokenizer, model, 'onnx'
+        except ImportError as e:
+            logger.warning(f"ONNX Runtime backend unavailable ({e}); falling back to PyTorch int8")
+        except Exception as e:
+            logger.warning(f"ONNX export/load failed ({e}); falling back to PyTorch int8")
+        backend = 'quantized'
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(repo_id)
+    model.eval()
+
+    if backend == 'quantized':
+        try:
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            return tokenizer, model, 'quantized'
+        except Exception as e:
+            logger.warning(f"PyTorch dynamic quantization failed ({e}); using full precision")
+
+    return tokenizer, model, 'pytorch'
+
+
+def _load_onnx_int8(repo_id: str, cache_dir: str):
+    """Export the model to ONNX and quantize it to int8 once, then load it from the cache."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    export_dir = os.path.join(cache_dir, _cache_slug(repo_id))
+    quantized_dir = export_dir + '-int8'
+
+    if not os.path.exists(os.path.join(quantized_dir, _READY_MARKER)):
+        logger.info(f"Exporting {repo_id} to ONNX (one-time) ...")
+        exported = ORTModelForSeq2SeqLM.from_pretrained(repo_id, export=True)
+        exported.save_pretrained(export_dir)
+
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for file_name in sorted(os.listdir(export_dir)):
+            if file_name.endswith('.onnx'):
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+                quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+        exported.config.save_pretrained(quantized_dir)
+
+        with open(os.path.join(quantized_dir, _READY_MARKER), 'w') as marker:
+            marker.write(repo_id)
+        logger.info(f"✓ Cached int8 ONNX model in {quantized_dir}")
+
+    file_names = {}
+    for kwarg, base in (('encoder_file_name', 'encoder_model'),
+                        ('decoder_file_name', 'decoder_model'),
+                        ('decoder_with_past_file_name', 'decoder_with_past_model')):
+        candidate = f'{base}_quantized.onnx'
+        if os.path.exists(os.path.join(quantized_dir, candidate)):
+            file_names[kwarg] = candidate
+
+    return ORTModelForSeq2SeqLM.from_pretrained(quantized_dir, **file_names)
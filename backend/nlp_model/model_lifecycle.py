@@ -0,0 +1,94 @@
+"""
+Lifecycle manager for expensive, process-wide model objects (e.g. CodeT5Generator).
+
+Modes:
+- lazy:       build on the first request that needs it
+- background: start building in a daemon thread at startup; requests that
+              arrive before it finishes wait for the same load
+- preload:    build synchronously at startup. Combined with
+              `gunicorn --preload` this happens in the master before workers
+              fork, so the weights are shared copy-on-write
+"""
+import gc
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelManager:
+    """Builds a single shared instance through ``factory`` according to ``mode``."""
+
+    MODES = ('lazy', 'background', 'preload')
+
+    def __init__(self, factory: Callable[[], object], mode: str = 'lazy', name: str = 'model'):
+        if mode not in self.MODES:
+            logger.warning(f"Unknown load mode '{mode}' for {name}, using lazy")
+            mode = 'lazy'
+        self.factory = factory
+        self.mode = mode
+        self.name = name
+        self._instance = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = False
+        self.load_seconds: Optional[float] = None
+        self.load_error: Optional[str] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def is_loading(self) -> bool:
+        return self._lock.locked() and not self._ready.is_set()
+
+    def start(self):
+        """Apply the startup behaviour of the configured mode (call once per process)."""
+        if self._started:
+            return
+        self._started = True
+        if self.mode == 'preload':
+            self._load()
+            # Move everything allocated so far out of the GC's reach so collections in
+            # forked workers do not touch (and un-share) the preloaded pages
+            gc.freeze()
+        elif self.mode == 'background':
+            self._thread = threading.Thread(target=self._load, name=f'{self.name}-warmup', daemon=True)
+            self._thread.start()
+
+    def get(self):
+        """Return the shared instance, building it now if nothing has yet."""
+        if self._ready.is_set():
+            return self._instance
+        return self._load()
+
+    def _load(self):
+        with self._lock:
+            if self._ready.is_set():
+                return self._instance
+            start = time.time()
+            logger.info(f"Loading {self.name} (mode={self.mode}) ...")
+            try:
+                self._instance = self.factory()
+                self.load_error = None
+            except Exception as e:
+                self.load_error = str(e)
+                logger.error(f"Loading {self.name} failed: {e}")
+                raise
+            self.load_seconds = round(time.time() - start, 3)
+            self._ready.set()
+            logger.info(f"✓ {self.name} ready in {self.load_seconds}s")
+            return self._instance
+
+    def status(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'ready': self.is_ready,
+            'loading': self.is_loading,
+            'load_seconds': self.load_seconds,
+            'error': self.load_error,
+        }
@@ -0,0 +1,121 @@
+"""
+Bounded stdout/stderr capture for executions.
+
+A StringIO keeps everything a program prints and is only sliced to
+``max_output`` afterwards, so ``for i in range(10**8): print(i)`` can grow to
+hundreds of MB first. BoundedOutput keeps at most ``limit`` bytes, counts what
+it drops, and can hand every accepted chunk to a callback (for streaming).
+
+The text and buffer layers are the C io.TextIOWrapper/BufferedWriter, so
+print() costs about the same as with a StringIO; the Python code below only
+sees one call per flushed block (BUFFER_SIZE, or one line with
+``line_buffering``).
+"""
+import codecs
+import io
+from typing import Callable, List, Optional
+
+BUFFER_SIZE = 64 * 1024
+
+
+class OutputLimitExceeded(BaseException):
+    """
+    Raised from print() once the limit is hit when the sink is set to stop the
+    program. BaseException, like TimeoutException, so a bare ``except Exception``
+    in user code cannot swallow it.
+    """
+    pass
+
+
+class _Collector(io.RawIOBase):
+    """Byte sink behind BoundedOutput's text layer."""
+
+    def __init__(self, limit: int, on_chunk: Optional[Callable[[str], None]], raise_on_overflow: bool):
+        super().__init__()
+        self.limit = limit
+        self.on_chunk = on_chunk
+        self.raise_on_overflow = raise_on_overflow
+        self.parts: List[bytes] = []
+        self.size = 0
+        self.dropped = 0
+        self.overflowed = False
+        # Chunks may end inside a multi-byte character
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        size = len(data)
+        room = self.limit - self.size
+        keep = bytes(data) if size <= room else bytes(data[:max(room, 0)])
+        if keep:
+            self.parts.append(keep)
+            self.size += len(keep)
+            if self.on_chunk is not None:
+                text = self._decoder.decode(keep)
+                if text:
+                    self.on_chunk(text)
+        if len(keep) < size:
+            self.dropped += size - len(keep)
+            if self.raise_on_overflow:
+                self.overflowed = True
+                raise OutputLimitExceeded(f'Output limit of {self.limit} bytes exceeded')
+        return size
+
+
+class BoundedOutput:
+    """
+    Args:
+        limit (int): Bytes kept (UTF-8)
+        on_chunk (callable): Called with each accepted piece of text when it is flushed
+        raise_on_overflow (bool): Raise OutputLimitExceeded on the first write that
+            does not fit, instead of silently dropping the rest
+        line_buffering (bool): Flush (and call on_chunk) at every newline
+
+    ``stream`` is the file object to install as sys.stdout; it is a plain C text
+    wrapper (a Python subclass would slow every print down).
+    """
+
+    def __init__(self, limit: int, on_chunk: Optional[Callable[[str], None]] = None,
+                 raise_on_overflow: bool = False, line_buffering: bool = False):
+        self.collector = _Collector(max(0, int(limit)), on_chunk, raise_on_overflow)
+        # A BufferedWriter keeps and re-sends a block whose write raised, which would
+        # count it twice; the text layer alone hands each byte over exactly once
+        raw = self.collector if raise_on_overflow else io.BufferedWriter(self.collector, BUFFER_SIZE)
+        self.stream = io.TextIOWrapper(raw, encoding='utf-8', errors='backslashreplace', newline='\n',
+                                       line_buffering=line_buffering)
+
+    def write(self, text: str) -> int:
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def _settle(self):
+        # Reading results must not raise; only writes by the program do
+        try:
+            self.stream.flush()
+        except OutputLimitExceeded:
+            pass
+
+    def getvalue(self) -> str:
+        self._settle()
+        # 'ignore' drops a character cut in half by the limit
+        return b''.join(self.collector.parts).decode('utf-8', 'ignore')
+
+    @property
+    def truncated(self) -> bool:
+        self._settle()
+        return self.collector.dropped > 0
+
+    @property
+    def dropped_bytes(self) -> int:
+        self._settle()
+        return self.collector.dropped
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes the program wrote, including the dropped ones."""
+        self._settle()
+        return self.collector.size + self.collector.dropped
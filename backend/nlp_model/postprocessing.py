@@ -0,0 +1,97 @@
+"""
+Precompiled patterns for cleaning CodeT5 output and reading variable
+assignments out of descriptions.
+
+Post-processing runs on every line of every request, so all patterns are
+compiled once at import and assignments are extracted in a single pass over
+the description.
+"""
+import re
+from typing import Dict, List, Tuple
+
+# Java/C#/C++ wrapper patterns
+JAVA_CLASS_RE = re.compile(r'^[.\s]*public\s+class\s+[a-zA-Z_]\w*.*?\s*\{', re.DOTALL)
+JAVA_MAIN_RE = re.compile(r'^[.\s]*static\s+void\s+main.*?\s*\{', re.DOTALL)
+JAVA_PRINTLN_RE = re.compile(r'System\.out\.println\s*\((.*?)\);?')
+
+# Common Python wrapper patterns
+PY_DEF_WRAPPER_RE = re.compile(r'^[.\s]*def\s+[a-zA-Z_]\w*\s*\(.*?\)\s*:\s*')
+PY_CLASS_WRAPPER_RE = re.compile(r'^[.\s]*class\s+[a-zA-Z_]\w*\s*:\s*')
+
+# Variable assigned at the start of a line of generated code
+CODE_ASSIGNMENT_RE = re.compile(r'^\s*([a-zA-Z_]\w*)\s*=', re.MULTILINE)
+
+INDENT_RE = re.compile(r'^(\s*)')
+
+# The three description forms, as one alternation:
+#   "Assign <value> to <variable>"
+#   "Start/Initialize <variable> as/to/with <value>"
+#   "<variable> = <value>"
+ASSIGNMENT_RE = re.compile(
+    r'assign\s+(?P<assign_value>\d+)\s+to\s+(?P<assign_var>[a-zA-Z_]\w*)'
+    r'|(?:start|initialize)\s+(?P<init_var>[a-zA-Z_]\w*)\s+(?:as|to|with)\s+(?P<init_value>\d+)'
+    r'|(?P<eq_var>[a-zA-Z_]\w*)\s*=\s*(?P<eq_value>\d+)',
+    re.IGNORECASE
+)
+
+# lowercase variable name -> (variable as written, value)
+Assignments = Dict[str, Tuple[str, str]]
+
+
+def clean_generated_text(text: str) -> str:
+    """
+    Clean up model hallucinations like 'def generate_python_code():', Java boilerplate, or leading dots.
+    """
+    if not text:
+        return text
+
+    text = JAVA_CLASS_RE.sub('', text)
+    text = JAVA_MAIN_RE.sub('', text)
+    text = JAVA_PRINTLN_RE.sub(r'print(\1)', text)
+
+    text = PY_DEF_WRAPPER_RE.sub('', text)
+    text = PY_CLASS_WRAPPER_RE.sub('', text)
+
+    # Remove leading dots, spaces, or weird characters
+    text = text.lstrip('. \n\t')
+
+    # Remove trailing braces if they seem like boilerplate (Java influence)
+    if text.endswith('}') and '{' not in text:
+        text = text.rstrip('} \n\t')
+
+    return text.strip()
+
+
+def extract_assignments(description: str) -> Assignments:
+    """
+    Extract variable assignments from a description in one scan.
+
+    Handles "Assign 5 to A", "Start sum as 0" and "x = 3". The result is keyed by
+    lowercase variable name and ordered like the forms above (all "assign"
+    matches first, then "start/initialize", then "="); the first value seen for
+    a variable wins.
+    """
+    buckets = ([], [], [])
+    for match in ASSIGNMENT_RE.finditer(description):
+        if match.group('assign_var'):
+            buckets[0].append((match.group('assign_var'), match.group('assign_value')))
+        elif match.group('init_var'):
+            buckets[1].append((match.group('init_var'), match.group('init_value')))
+        else:
+            buckets[2].append((match.group('eq_var'), match.group('eq_value')))
+
+    assignments: Assignments = {}
+    for bucket in buckets:
+        for var, value in bucket:
+            assignments.setdefault(var.lower(), (var, value))
+    return assignments
+
+
+def assignment_lines(assignments: Assignments) -> List[str]:
+    """Render assignments as "<var> = <value>" source lines."""
+    return [f"{var} = {value}" for var, value in assignments.values()]
+
+
+def assigned_in_code(code: str) -> set:
+    """Names assigned at the start of any line of code."""
+    return set(CODE_ASSIGNMENT_RE.findall(code))
@@ -0,0 +1,171 @@
+"""
+Admission control for interactive (WebSocket terminal) runs.
+
+Every run is an interpreter process, so a class opening the terminal page at
+once could start hundreds of them. Runs get a slot from the scheduler first:
+
+- at most ``max_running`` runs at a time in this process,
+- at most ``max_per_user`` of them (and as many waiting) for one user,
+- the rest wait in FIFO order and are told their position whenever it changes,
+- past ``max_queue`` waiting runs, new ones are rejected straight away.
+
+A waiter whose user is already at the per-user cap does not hold up the
+waiters behind it; it keeps its place and is admitted as soon as its user's
+earlier run finishes.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """The queue (or the user's share of it) is full; try again later."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class RunTicket:
+    """A place in the queue, then a running slot until released."""
+
+    __slots__ = ('user', 'notify', 'future', 'position', 'queued_at', 'started_at')
+
+    def __init__(self, user: str, notify: Optional[Callable[[int], Awaitable[None]]]):
+        self.user = user
+        self.notify = notify
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.position = 0
+        self.queued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class RunScheduler:
+    """
+    Args:
+        max_running (int): Runs executing at once in this process
+        max_per_user (int): Runs executing at once, and runs waiting, per user
+        max_queue (int): Runs waiting before new ones are rejected
+    """
+
+    def __init__(self, max_running: Optional[int] = None, max_per_user: Optional[int] = None,
+                 max_queue: Optional[int] = None):
+        self.max_running = int(max_running or os.getenv('INTERACTIVE_MAX_RUNNING', '8'))
+        self.max_per_user = int(max_per_user or os.getenv('INTERACTIVE_MAX_PER_USER', '1'))
+        self.max_queue = int(max_queue if max_queue is not None else os.getenv('INTERACTIVE_MAX_QUEUE', '50'))
+
+        self.running: Counter = Counter()
+        self.waiting: List[RunTicket] = []
+        self.counters = Counter()
+        self.max_wait = 0.0
+
+    @property
+    def total_running(self) -> int:
+        return sum(self.running.values())
+
+    async def acquire(self, user: str, notify: Optional[Callable[[int], Awaitable[None]]] = None) -> RunTicket:
+        """
+        Wait for a running slot. ``notify(position)`` is awaited with the 1-based
+        queue position when the run has to wait and again whenever it moves up.
+        Raises SchedulerFull instead of queueing past the limits.
+        """
+        ticket = RunTicket(user, notify)
+        # Waiters left in the queue are all blocked by their per-user cap, so only
+        # this user's own earlier waiter can be overtaken
+        if self._can_start(user) and not any(t.user == user for t in self.waiting):
+            self._start(ticket)
+            return ticket
+
+        if len(self.waiting) >= self.max_queue:
+            self.counters['rejected'] += 1
+            raise SchedulerFull('The server is busy, please try again in a moment', 'queue_full')
+        if sum(1 for t in self.waiting if t.user == user) >= self.max_per_user:
+            self.counters['rejected'] += 1
+            raise SchedulerFull('You already have a program waiting to run', 'user_queue_full')
+
+        self.waiting.append(ticket)
+        self.counters['queued'] += 1
+        self._renumber()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Admitted just as the waiter went away
+                self.release(ticket)
+            elif ticket in self.waiting:
+                self.waiting.remove(ticket)
+                self.counters['abandoned'] += 1
+                self._dispatch()
+            raise
+        return ticket
+
+    def release(self, ticket: RunTicket):
+        """Give the slot back (safe to call more than once)."""
+        if ticket.started_at is None:
+            return
+        ticket.started_at = None
+        self.running[ticket.user] -= 1
+        if self.running[ticket.user] <= 0:
+            del self.running[ticket.user]
+        self._dispatch()
+
+    def _can_start(self, user: str) -> bool:
+        return self.total_running < self.max_running and self.running[user] < self.max_per_user
+
+    def _start(self, ticket: RunTicket):
+        ticket.started_at = time.monotonic()
+        self.running[ticket.user] += 1
+        self.counters['started'] += 1
+        waited = ticket.started_at - ticket.queued_at
+        if waited > self.max_wait:
+            self.max_wait = waited
+
+    def _dispatch(self):
+        """Admit waiters in queue order while slots are free, then update positions."""
+        for ticket in list(self.waiting):
+            if ticket.future.done():
+                # Cancelled waiter whose task has not run its cleanup yet
+                self.waiting.remove(ticket)
+                continue
+            if self.total_running >= self.max_running:
+                break
+            if self.running[ticket.user] >= self.max_per_user:
+                continue
+            self.waiting.remove(ticket)
+            self._start(ticket)
+            ticket.future.set_result(None)
+        self._renumber()
+
+    def _renumber(self):
+        for position, ticket in enumerate(self.waiting, 1):
+            if ticket.position != position:
+                ticket.position = position
+                if ticket.notify is not None:
+                    asyncio.ensure_future(self._notify(ticket, position))
+
+    @staticmethod
+    async def _notify(ticket: RunTicket, position: int):
+        try:
+            await ticket.notify(position)
+        except Exception as e:
+            logger.debug(f"Queue position update failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'running': self.total_running,
+            'waiting': len(self.waiting),
+            'users_running': len(self.running),
+            'limits': {'max_running': self.max_running, 'max_per_user': self.max_per_user,
+                       'max_queue': self.max_queue},
+            'max_wait_seconds': round(self.max_wait, 3),
+            **self.counters,
+        }
+
+
+# Global scheduler instance
+run_scheduler = RunScheduler()
@@ -0,0 +1,204 @@
+"""
+AST-based safety analysis for user code.
+
+One walk over the syntax tree checks imports, references to dangerous
+builtins, and private/dunder attribute access against an allow/deny policy.
+Unlike substring matching this does not reject a variable called `opening` or
+a string containing "http", and it catches `().__class__.__bases__` style
+escapes and frame walks (gen.gi_frame.f_back.f_globals). Helpers that turn a
+string back into attribute access (operator.attrgetter,
+string.Formatter().get_field, ...) are denied, and so are string literals
+naming dunders. Verdicts are cached by a hash of the source.
+"""
+import ast
+import hashlib
+import logging
+import re
+from typing import Dict, Iterable, Optional
+
+from .caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Modules user code may import (the sandbox's __import__ enforces the same list)
+ALLOWED_MODULES = frozenset({
+    'math', 'cmath', 'random', 'string', 'itertools', 'collections', 'functools',
+    'statistics', 'datetime', 'time', 'decimal', 'fractions', 'heapq', 'bisect',
+    're', 'operator', 'copy', 'textwrap',
+})
+
+# Builtins that give access to the interpreter, the filesystem or arbitrary code
+DENIED_NAMES = frozenset({
+    'eval', 'exec', 'compile', 'open', '__import__', 'globals', 'locals', 'vars',
+    'getattr', 'setattr', 'delattr', 'breakpoint', 'exit', 'quit', 'help',
+    'memoryview', '__builtins__', '__loader__', '__spec__',
+})
+
+# Members of allowed modules that look attributes up by a string given at run
+# time (operator.attrgetter('__class__...'), Formatter().get_field('0.__class__'))
+DENIED_ATTRS = frozenset({'attrgetter', 'methodcaller', 'Formatter'})
+
+# Frame, code and traceback introspection: a generator's gi_frame.f_back walks
+# up to the executing (server) frames and their f_globals
+FRAME_ATTRS = frozenset({
+    'gi_frame', 'gi_code', 'gi_yieldfrom', 'cr_frame', 'cr_code', 'cr_await', 'ag_frame', 'ag_code',
+    'ag_await', 'f_back', 'f_globals', 'f_locals', 'f_builtins', 'f_code', 'f_trace', 'tb_frame', 'tb_next',
+})
+# Every code object attribute (co_consts, co_code, ...)
+FRAME_ATTR_PREFIXES = ('co_',)
+
+# Dunder attributes ordinary class code needs (super().__init__(), obj.__name__ ...)
+ALLOWED_DUNDER_ATTRS = frozenset({
+    '__init__', '__str__', '__repr__', '__len__', '__name__', '__doc__',
+    '__eq__', '__lt__', '__le__', '__gt__', '__ge__', '__add__', '__iter__', '__next__',
+})
+
+# str.format fields reaching for attributes/items like "{0.__class__}"
+_FORMAT_PRIVATE_RE = re.compile(r'\{[^{}]*(?:\.|\[)\s*_')
+
+# Dunder names inside string literals ('__class__', '0.__class__.__base__')
+_DUNDER_RE = re.compile(r'__[A-Za-z0-9]\w*__')
+
+
+class Verdict:
+    """Result of a safety check; falsy when the code must not run."""
+
+    __slots__ = ('safe', 'reason', 'lineno', 'col_offset', 'syntax_error')
+
+    def __init__(self, safe: bool, reason: str = '', lineno: Optional[int] = None,
+                 col_offset: Optional[int] = None, syntax_error: bool = False):
+        self.safe = safe
+        self.reason = reason
+        self.lineno = lineno
+        self.col_offset = col_offset
+        self.syntax_error = syntax_error
+
+    def __bool__(self):
+        return self.safe
+
+    def message(self) -> str:
+        if self.safe:
+            return ''
+        if self.lineno is None:
+            return self.reason
+        return f'{self.reason} (line {self.lineno}, column {self.col_offset + 1})'
+
+    def to_dict(self) -> Dict:
+        return {
+            'safe': self.safe,
+            'reason': self.reason,
+            'line': self.lineno,
+            'column': None if self.col_offset is None else self.col_offset + 1,
+        }
+
+
+SAFE = Verdict(True)
+
+
+class SafetyAnalyzer:
+    """
+    Checks code against the policy in a single pass over its AST.
+
+    Args:
+        allowed_modules: Top-level modules that may be imported
+        denied_names: Names that may not be referenced at all
+        denied_attrs: Attributes (and names imported from modules) that may not be used
+        allowed_dunder_attrs: Dunder attributes that may be accessed, and
+            named in string literals
+        cache_size (int): Verdicts remembered (keyed by source hash)
+    """
+
+    def __init__(self, allowed_modules: Iterable[str] = ALLOWED_MODULES,
+                 denied_names: Iterable[str] = DENIED_NAMES,
+                 denied_attrs: Iterable[str] = DENIED_ATTRS,
+                 allowed_dunder_attrs: Iterable[str] = ALLOWED_DUNDER_ATTRS,
+                 cache_size: int = 2048):
+        self.allowed_modules = frozenset(allowed_modules)
+        self.denied_names = frozenset(denied_names)
+        self.denied_attrs = frozenset(denied_attrs)
+        self.allowed_dunder_attrs = frozenset(allowed_dunder_attrs)
+        # `if __name__ == '__main__':` compares against a dunder string
+        self.allowed_dunder_strings = self.allowed_dunder_attrs | {'__main__'}
+        self.cache = LRUCache(maxsize=cache_size)
+
+    @staticmethod
+    def code_hash(code: str) -> str:
+        return hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def check(self, code: str, tree: Optional[ast.AST] = None, key: Optional[str] = None) -> Verdict:
+        """
+        Verdict for ``code``. Pass an already parsed ``tree`` (and its ``key``)
+        to avoid parsing the source again.
+        """
+        key = key or self.code_hash(code)
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            return verdict
+
+        if tree is None:
+            try:
+                tree = ast.parse(code)
+            except SyntaxError as e:
+                verdict = Verdict(False, f'Syntax error: {e.msg}', e.lineno, (e.offset or 1) - 1,
+                                  syntax_error=True)
+                self.cache.set(key, verdict)
+                return verdict
+
+        verdict = self.check_tree(tree)
+        if not verdict:
+            logger.warning(f"Unsafe code rejected: {verdict.message()}")
+        self.cache.set(key, verdict)
+        return verdict
+
+    def check_tree(self, tree: ast.AST) -> Verdict:
+        """Walk the tree once and return the first policy violation (or SAFE)."""
+        for node in ast.walk(tree):
+            reason = self._violation(node)
+            if reason:
+                return Verdict(False, reason, getattr(node, 'lineno', None), getattr(node, 'col_offset', None))
+        return SAFE
+
+    def _violation(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] not in self.allowed_modules:
+                    return f"Import of '{alias.name}' is not allowed"
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or '').split('.')[0] not in self.allowed_modules:
+                return f"Import from '{node.module or '.'}' is not allowed"
+            for alias in node.names:
+                if alias.name == '*':
+                    return f"Import of * from '{node.module}' is not allowed"
+                if alias.name in self.denied_attrs or alias.name.startswith('_'):
+                    return f"Import of '{alias.name}' from '{node.module}' is not allowed"
+        elif isinstance(node, ast.Name):
+            if node.id in self.denied_names:
+                return f"Use of '{node.id}' is not allowed"
+            if node.id.startswith('__') and node.id != '__name__':
+                return f"Use of '{node.id}' is not allowed"
+        elif isinstance(node, ast.Attribute):
+            attr = node.attr
+            if attr in self.denied_attrs:
+                return f"Use of '{attr}' is not allowed"
+            if attr in FRAME_ATTRS or attr.startswith(FRAME_ATTR_PREFIXES):
+                return f"Access to interpreter internals ('{attr}') is not allowed"
+            if attr.startswith('__') and attr.endswith('__'):
+                if attr not in self.allowed_dunder_attrs:
+                    return f"Access to attribute '{attr}' is not allowed"
+            elif attr.startswith('_'):
+                # Private members of one's own objects are fine, module internals
+                # (e.g. random._os) are not
+                if not (isinstance(node.value, ast.Name) and node.value.id in ('self', 'cls')):
+                    return f"Access to private attribute '{attr}' is not allowed"
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if '{' in node.value and _FORMAT_PRIVATE_RE.search(node.value):
+                return "Format strings may not access private attributes"
+            if '__' in node.value:
+                for name in _DUNDER_RE.findall(node.value):
+                    if name not in self.allowed_dunder_strings:
+                        return f"Strings may not name the attribute '{name}'"
+        return None
+
+
+# Global analyzer instance
+analyzer = SafetyAnalyzer()
@@ -0,0 +1,650 @@
+"""
+Pool of pre-started sandbox processes that run user code for CodeExecutor.
+
+Each worker is a long-lived interpreter (forked from a forkserver that has
+already imported this module) with CPU/memory/file-size rlimits applied. The
+parent sends {'code', 'inputs'} over a pipe and gets back the usual
+status/output/error/execution_time dict. A worker that does not answer within
+the wall-clock limit is killed and replaced; every worker is recycled after
+``max_runs`` executions so leaked state cannot pile up.
+
+User code runs on a JobThread: nothing of the server (worker loop,
+multiprocessing, this module) is on its stack, so even a frame walk that got
+past the safety policy finds no globals to escape through.
+
+Runaway code is stopped inside the worker first, so the output printed so far
+can still be returned with status 'timeout':
+- wall clock: SIGALRM after ``timeout`` seconds
+- CPU time:   RLIMIT_CPU soft limit (SIGXCPU)
+- lines:      a trace function counting executed lines of the user's code
+The parent's hard kill only fires if the worker ignores all of these (e.g.
+stuck inside one long C call).
+"""
+import _thread
+import ctypes
+import logging
+import marshal
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import types
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, the wall-clock kill still applies
+    resource = None
+
+from .accounting import ResourceMeter, usage
+from .output_sink import BoundedOutput, OutputLimitExceeded
+from .safety import ALLOWED_MODULES
+
+logger = logging.getLogger(__name__)
+
+# Extra time the parent waits on top of the timeout before killing a worker
+WALL_GRACE = 1.0
+
+# Filename user code is compiled under; only frames from it are traced
+SANDBOX_FILENAME = '<sandbox>'
+
+# Signal the kernel sends when RLIMIT_CPU is exceeded (not on Windows)
+_SIGXCPU = getattr(signal, 'SIGXCPU', None)
+
+# Limit signals; blocked on job threads so they reach the main thread's handlers
+_LIMIT_SIGNALS = {sig for sig in (getattr(signal, 'SIGALRM', None), _SIGXCPU) if sig is not None}
+
+class TimeoutException(BaseException):
+    """
+    Raised inside user code when a time or line limit is hit. Derives from
+    BaseException so `except Exception:` in student code cannot swallow it.
+    """
+    pass
+
+
+class _Budget:
+    """
+    Trace function enforcing a line budget and wall-clock deadline on user frames.
+
+    Lines are counted from 'line' events. The deadline is armed with a timer:
+    when it fires, opcode tracing is switched on for the user's frames, so even a
+    loop that never starts a new line (`while True: pass`) is interrupted.
+    """
+
+    def __init__(self, timeout: Optional[float], max_lines: Optional[int]):
+        self.timeout = timeout
+        self.max_lines = max_lines
+        self.lines = 0
+        self.reason = None
+        self._thread_id = None
+        self._timer = None
+        if timeout:
+            # Built here: a Thread created on a JobThread would register it as a dummy thread
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+
+    def start(self):
+        """Call on the thread that runs the user's code."""
+        self._thread_id = threading.get_ident()
+        if self._timer is not None:
+            self._timer.start()
+        sys.settrace(self.global_trace)
+
+    def stop(self):
+        sys.settrace(None)
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _expire(self):
+        self.reason = f'Execution exceeded {self.timeout} seconds'
+        frame = sys._current_frames().get(self._thread_id)
+        while frame is not None:
+            if frame.f_code.co_filename == SANDBOX_FILENAME:
+                frame.f_trace = self.local_trace
+                frame.f_trace_opcodes = True
+            frame = frame.f_back
+
+    def global_trace(self, frame, event, arg):
+        if frame.f_code.co_filename == SANDBOX_FILENAME:
+            return self.local_trace
+        return None
+
+    def local_trace(self, frame, event, arg):
+        if event == 'line':
+            self.lines += 1
+            if self.reason is None and self.max_lines and self.lines > self.max_lines:
+                self.reason = f'Execution exceeded the limit of {self.max_lines} executed lines'
+        if self.reason is not None and event in ('line', 'opcode'):
+            # Raised again on every line, so a bare `except:` cannot keep the loop alive
+            raise TimeoutException(self.reason)
+        return self.local_trace
+
+
+# The only frame below the user's module frame on a JobThread. Its globals are
+# the two queue methods, so walking f_back from user code ends here.
+_SERVE_SOURCE = '''
+def serve():
+    while True:
+        try:
+            job = get()
+            if job is None:
+                return
+            enter, run, leave = job
+            outcome = None
+            try:
+                enter()
+                try:
+                    run()
+                finally:
+                    leave()
+            except BaseException as e:
+                outcome = e
+            put(outcome)
+        except BaseException:
+            pass  # a limit forwarded just after the job ended
+'''
+_SERVE_CODE = compile(_SERVE_SOURCE, '<sandbox-bootstrap>', 'exec')
+
+
+def _noop():
+    pass
+
+
+class JobThread:
+    """
+    Thread that runs user code with a stack of its own.
+
+    Code run with exec() in a server thread sits on top of the server's frames,
+    whose f_globals hold os and sys. Here the thread is started with
+    _thread.start_new_thread on a bootstrap whose globals are only its job
+    queue, so there is nothing below the user's frames to reach.
+
+    Signals are delivered to the main thread: a TimeoutException raised there
+    by a limit handler while ``run`` waits is raised again in the job thread.
+    Start it before RLIMIT_NPROC is applied, which also counts threads.
+    """
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        self._results = queue.SimpleQueue()
+        namespace = {'__builtins__': {'BaseException': BaseException},
+                     'get': self._jobs.get, 'put': self._results.put}
+        exec(_SERVE_CODE, namespace)
+        # SIGXCPU goes to the thread using the CPU; the new thread inherits this mask
+        masked = hasattr(signal, 'pthread_sigmask') and _LIMIT_SIGNALS
+        if masked:
+            previous = signal.pthread_sigmask(signal.SIG_BLOCK, _LIMIT_SIGNALS)
+        try:
+            self.ident = _thread.start_new_thread(namespace['serve'], ())
+        finally:
+            if masked:
+                signal.pthread_sigmask(signal.SIG_SETMASK, previous)
+
+    def run(self, code: types.CodeType, namespace: Dict, enter: Callable[[], None] = _noop,
+            leave: Callable[[], None] = _noop) -> Optional[BaseException]:
+        """
+        Execute ``code`` in ``namespace`` on the job thread, with ``enter`` and
+        ``leave`` called there before and after. Returns the exception the code
+        raised (its traceback starts at the bootstrap frame), or None.
+        """
+        self._jobs.put((enter, types.FunctionType(code, namespace), leave))
+        while True:
+            try:
+                return self._results.get()
+            except TimeoutException as e:
+                _raise_in_thread(self.ident, e)
+
+    def close(self):
+        self._jobs.put(None)
+
+
+def _raise_in_thread(ident: int, exc: BaseException):
+    """Raise a copy of ``exc`` in another thread at its next bytecode."""
+    base, message = type(exc), str(exc)
+    # The C API takes an exception class, so the message goes into a subclass
+    copy = type(base.__name__, (base,), {'__init__': lambda self: base.__init__(self, message)})
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(ident), ctypes.py_object(copy))
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ for user code: only the modules of the safety policy."""
+    if level or name.split('.')[0] not in ALLOWED_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+SAFE_BUILTINS = {
+    'print': print,
+    'range': range,
+    'len': len,
+    'str': str,
+    'int': int,
+    'float': float,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'set': set,
+    'bool': bool,
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'sorted': sorted,
+    'enumerate': enumerate,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'abs': abs,
+    'round': round,
+    'pow': pow,
+    'divmod': divmod,
+    '__import__': _safe_import,
+}
+
+
+def run_code(code, inputs: Optional[List[str]] = None, max_output: int = 10000,
+             timeout: Optional[float] = None, max_lines: Optional[int] = None,
+             use_signals: bool = False, dedicated_process: bool = False,
+             on_output: Optional[Callable[[str, str], None]] = None,
+             stop_on_output_limit: bool = False, job_thread: Optional[JobThread] = None) -> Dict:
+    """
+    Execute code with the restricted builtins and capture stdout/stderr.
+    Swaps sys.stdout, so only call it where nothing else prints concurrently
+    (a sandbox worker, or the single-process fallback).
+
+    Args:
+        code: Source string, or a code object already compiled under SANDBOX_FILENAME
+        max_output (int): Bytes kept per stream; the rest is dropped as it is
+            written (see output_sink.BoundedOutput)
+        timeout (float): Wall-clock seconds before the run is stopped
+        max_lines (int): Executed-line budget of the user's code (0/None = unlimited)
+        use_signals (bool): Enforce the wall clock with SIGALRM instead of the trace
+            function (only possible in a process's main thread)
+        dedicated_process (bool): Running in a sandbox worker; resource accounting
+            covers the whole process (see accounting.ResourceMeter)
+        on_output (callable): Called with (stream, text) for every kept chunk
+        stop_on_output_limit (bool): End the run with an error once stdout is full
+            instead of letting it continue with its output discarded
+        job_thread (JobThread): Thread to run the code on; a new one is started
+            for this run if not given
+    """
+    stdout = BoundedOutput(max_output, raise_on_overflow=stop_on_output_limit,
+                           on_chunk=(lambda text: on_output('stdout', text)) if on_output else None)
+    stderr = BoundedOutput(max_output, on_chunk=(lambda text: on_output('stderr', text)) if on_output else None)
+    meter = ResourceMeter(dedicated_process)
+    meter.start()  # started again on the job thread; this covers a run that never gets there
+    own_thread = job_thread is None
+    if own_thread:
+        job_thread = JobThread()
+    try:
+        result = _exec_captured(code, stdout, stderr, inputs, max_output, timeout, max_lines, use_signals,
+                                meter, job_thread)
+    finally:
+        if own_thread:
+            job_thread.close()
+    result['output_truncated'] = stdout.truncated
+    if stdout.collector.overflowed and result['status'] == 'success':
+        # The program caught OutputLimitExceeded with a bare except and went on
+        result.update(status='error', error=f'Output limit of {max_output} bytes exceeded')
+    if stdout.truncated:
+        result['dropped_bytes'] = stdout.dropped_bytes
+    result['resources'] = meter.stop(stdout.total_bytes, stderr.total_bytes)
+    return result
+
+
+def _exec_captured(code, stdout: BoundedOutput, stderr: BoundedOutput, inputs: Optional[List[str]],
+                   max_output: int, timeout: Optional[float], max_lines: Optional[int],
+                   use_signals: bool, meter: ResourceMeter, job_thread: JobThread) -> Dict:
+    input_queue = list(inputs or [])
+
+    def safe_input(prompt: str = ''):
+        if input_queue:
+            return str(input_queue.pop(0))
+        # Fallback to empty string to avoid blocking
+        return ''
+
+    safe_globals = {'__builtins__': dict(SAFE_BUILTINS, input=safe_input)}
+
+    budget = None
+    if max_lines or (timeout and not use_signals):
+        budget = _Budget(None if use_signals else timeout, max_lines)
+
+    # On the job thread, so per-thread CPU and tracing cover the user's code
+    def enter():
+        meter.start()
+        if budget is not None:
+            budget.start()
+
+    def leave():
+        if budget is not None:
+            budget.stop()
+        meter.finish()
+
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout.stream, stderr.stream
+    start_time = time.time()
+    try:
+        compiled = code if isinstance(code, types.CodeType) else compile(code, SANDBOX_FILENAME, 'exec')
+        if use_signals and timeout:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            error = job_thread.run(compiled, safe_globals, enter, leave)
+            if error is not None:
+                raise error
+            # Output still buffered in the text layer may overflow the limit too
+            stdout.flush()
+            stderr.flush()
+        finally:
+            if use_signals and timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        error_text = stderr.getvalue()
+        return {
+            'status': 'success',
+            'output': stdout.getvalue()[:max_output].strip(),
+            'error': error_text[:max_output].strip() if error_text else '',
+            'execution_time': round(time.time() - start_time, 3)
+        }
+    except TimeoutException as e:
+        # Keep whatever the program printed before it was stopped
+        return {
+            'status': 'timeout',
+            'output': stdout.getvalue()[:max_output].strip(),
+            'error': str(e) or f'Execution exceeded {timeout} seconds',
+            'execution_time': round(time.time() - start_time, 3)
+        }
+    except OutputLimitExceeded as e:
+        return {
+            'status': 'error',
+            'output': stdout.getvalue().strip(),
+            'error': str(e),
+            'execution_time': round(time.time() - start_time, 3)
+        }
+    except SyntaxError as e:
+        return {
+            'status': 'error',
+            'output': '',
+            'error': f'Syntax error: {str(e)}',
+            'execution_time': time.time() - start_time
+        }
+    except MemoryError:
+        return {
+            'status': 'error',
+            'output': stdout.getvalue()[:max_output],
+            'error': 'MemoryError: memory limit exceeded',
+            'execution_time': time.time() - start_time
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'output': stdout.getvalue()[:max_output],
+            'error': f'{type(e).__name__}: {str(e)}',
+            'execution_time': time.time() - start_time
+        }
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+
+def _apply_limits(memory_limit_mb: int):
+    if resource is None:
+        return
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # No files may be written and no processes started from user code
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _set_cpu_budget(seconds: int):
+    """RLIMIT_CPU counts the whole process lifetime, so move the soft limit per run."""
+    if resource is None or not seconds:
+        return
+    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(rusage.ru_utime + rusage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _raise_timeout(reason: str):
+    def handler(signum, frame):
+        raise TimeoutException(reason)
+    return handler
+
+
+def _worker_main(conn, limits: Dict):
+    """Entry point of a sandbox process: apply limits, then serve jobs until the pipe closes."""
+    timeout = limits.get('timeout')
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, _raise_timeout(f'Execution exceeded {timeout} seconds'))
+    if _SIGXCPU is not None:
+        # Sent at the soft RLIMIT_CPU and then every further CPU second
+        signal.signal(_SIGXCPU, _raise_timeout(f'Execution exceeded {timeout} seconds of CPU time'))
+    job_thread = JobThread()
+    _apply_limits(limits.get('memory_limit_mb'))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        _set_cpu_budget(limits.get('cpu_seconds'))
+        code = marshal.loads(job['bytecode']) if job.get('bytecode') else job['code']
+        try:
+            result = run_code(code, job.get('inputs'), limits.get('max_output', 10000),
+                              timeout=timeout, max_lines=limits.get('max_lines'), use_signals=True,
+                              dedicated_process=True,
+                              stop_on_output_limit=limits.get('stop_on_output_limit', False),
+                              job_thread=job_thread)
+        except TimeoutException as e:
+            # A limit fired just as the run finished, outside run_code's handler
+            result = {'status': 'timeout', 'output': '', 'error': str(e), 'execution_time': timeout,
+                      'resources': usage(timeout)}
+        try:
+            conn.send(result)
+        except (OSError, ValueError):
+            break
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    if 'forkserver' in methods:
+        ctx = multiprocessing.get_context('forkserver')
+        # Workers fork from a server that already imported this module
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'runs')
+
+    def __init__(self, ctx, limits: Dict):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, limits),
+                                   name='sandbox-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+
+    def stop(self, kill: bool = False):
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of sandbox workers; ``run`` is safe to call from many threads.
+
+    Args:
+        size (int): Number of worker processes
+        timeout (float): Wall-clock and CPU seconds allowed per execution
+        max_output (int): Maximum output size in characters
+        max_runs (int): Executions after which a worker is replaced
+        memory_limit_mb (int): Address-space limit of each worker (0 = none)
+        max_lines (int): Executed-line budget per run (0 = unlimited)
+        stop_on_output_limit (bool): Stop programs whose output exceeds max_output
+    """
+
+    def __init__(self, size: int = 2, timeout: float = 10, max_output: int = 10000,
+                 max_runs: int = 100, memory_limit_mb: int = 256, max_lines: int = 0,
+                 stop_on_output_limit: bool = False):
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.max_runs = max(1, int(max_runs))
+        self.limits = {
+            'timeout': timeout,
+            'max_lines': int(max_lines),
+            'cpu_seconds': max(1, math.ceil(timeout)),
+            'memory_limit_mb': int(memory_limit_mb),
+            'max_output': max_output,
+            'stop_on_output_limit': stop_on_output_limit,
+        }
+        self._ctx = None
+        self._idle: 'queue.Queue[_Worker]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._pid = None
+        self.executions = 0
+        self.recycled = 0
+        self.killed = 0
+        self.respawned = 0
+
+    def start(self):
+        """Start the workers (idempotent); called lazily by ``run``."""
+        with self._lock:
+            if self._started and self._pid == os.getpid():
+                return
+            if self._started:
+                # Inherited across a fork (e.g. gunicorn --preload): those pipes belong
+                # to the parent, so this process needs workers of its own
+                self._idle = queue.Queue()
+            self._pid = os.getpid()
+            self._ctx = _context()
+            for _ in range(self.size):
+                self._idle.put(_Worker(self._ctx, self.limits))
+            self._started = True
+            logger.info(f"✓ Sandbox pool started with {self.size} worker(s)")
+
+    def shutdown(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().stop()
+                except queue.Empty:
+                    break
+            self._started = False
+
+    def run(self, code: str, inputs: Optional[List[str]] = None, bytecode: Optional[bytes] = None) -> Dict:
+        """
+        Execute in a worker. ``bytecode`` (a marshal'd code object, see code_cache)
+        is sent instead of the source so the worker does not parse it again.
+        """
+        self.start()
+        start_time = time.time()
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            return {
+                'status': 'error',
+                'output': '',
+                'error': 'All sandbox workers are busy, please try again',
+                'execution_time': 0
+            }
+
+        job = {
+            'code': None if bytecode else code,
+            'bytecode': bytecode,
+            'inputs': list(inputs or [])
+        }
+        try:
+            # A worker can die while idle (OOM killer, kill -9); the job has not
+            # reached it yet, so it goes to a fresh worker instead of failing
+            if not worker.process.is_alive():
+                worker = self._respawn(worker)
+            try:
+                worker.conn.send(job)
+            except OSError:
+                worker = self._respawn(worker)
+                worker.conn.send(job)
+            worker.runs += 1
+            if worker.conn.poll(self.timeout + WALL_GRACE):
+                return worker.conn.recv()
+
+            # Hard wall-clock limit: the worker is stuck, kill it
+            self.killed += 1
+            worker.stop(kill=True)
+            worker = None
+            return {
+                'status': 'timeout',
+                'output': '',
+                'error': f'Execution exceeded {self.timeout} seconds',
+                'execution_time': self.timeout,
+                'resources': usage(time.time() - start_time)
+            }
+        except (EOFError, OSError):
+            # The worker died mid-run: CPU limit (SIGXCPU) or a hard crash
+            worker.process.join(timeout=1)
+            exitcode = worker.process.exitcode
+            worker.stop(kill=True)
+            worker = None
+            if _SIGXCPU is not None and exitcode == -_SIGXCPU:
+                return {
+                    'status': 'timeout',
+                    'output': '',
+                    'error': f'Execution exceeded {self.timeout} seconds of CPU time',
+                    'execution_time': round(time.time() - start_time, 3),
+                    'resources': usage(time.time() - start_time, cpu_user=float(self.limits['cpu_seconds']))
+                }
+            return {
+                'status': 'error',
+                'output': '',
+                'error': f'Sandbox process crashed (exit code {exitcode})',
+                'execution_time': round(time.time() - start_time, 3),
+                'resources': usage(time.time() - start_time)
+            }
+        finally:
+            self.executions += 1
+            self._release(worker)
+
+    def _respawn(self, worker: _Worker) -> _Worker:
+        logger.warning(f"Sandbox worker {worker.process.pid} died while idle "
+                       f"(exit code {worker.process.exitcode}); starting a new one")
+        self.respawned += 1
+        worker.stop(kill=True)
+        return _Worker(self._ctx, self.limits)
+
+    def _release(self, worker: Optional[_Worker]):
+        if worker is not None and worker.runs >= self.max_runs:
+            self.recycled += 1
+            worker.stop()
+            worker = None
+        if worker is None or not worker.process.is_alive():
+            worker = _Worker(self._ctx, self.limits)
+        self._idle.put(worker)
+
+    def stats(self) -> Dict:
+        return {
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'executions': self.executions,
+            'recycled': self.recycled,
+            'killed_on_timeout': self.killed,
+            'respawned_dead': self.respawned,
+        }
@@ -109,9 +109,30 @@ const ConverterPage = ({ onBack, onNavigateToExecution, onAlgorithmTranslated })
       let code = '';
 
       try {
-        // Attempt real API calls
-        const response = await apiService.fullPipeline(kannadaInput, false);
-        const data = response.data || {};
+        let data;
+        try {
+          // Stream tokens into the editor as they are decoded
+          let streamed = '';
+          data = await apiService.streamPipeline(kannadaInput, {
+            onTranslation: (english) => {
+              setEnglishTranslation(english);
+              setProcessingSteps([
+                { step: 1, name: 'ಅನುವಾದ', status: 'complete' },
+                { step: 2, name: 'ಕೋಡ್ ರಚನೆ', status: 'processing' }
+              ]);
+              setCurrentStep('ಕೋಡ್ ರಚಿಸುತ್ತಿದೆ...');
+            },
+            onToken: (token) => {
+              streamed += token;
+              setPythonCode(streamed);
+            },
+          });
+        } catch (streamError) {
+          if (!streamError.connectionFailed) throw streamError;
+          // WebSocket unavailable: fall back to the REST pipeline
+          const response = await apiService.fullPipeline(kannadaInput, false);
+          data = response.data || {};
+        }
 
         if (data.status === 'error' || data.error || data.error_kannada) {
           throw new Error(data.error_kannada || data.error || "Processing failed");
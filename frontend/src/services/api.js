@@ -72,6 +72,50 @@ export const apiService = {
       inputs,
     }),
 
+  // Streaming pipeline over WebSocket (Kannada -> English -> code tokens as they are decoded).
+  // Resolves with the final {english_description, generated_code, source}; rejects with
+  // { connectionFailed: true } when the socket never opened so callers can use fullPipeline.
+  streamPipeline: (kannadaDescription, { onTranslation, onToken } = {}) =>
+    new Promise((resolve, reject) => {
+      const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000';
+      const ws = new WebSocket(`${WS_URL}/ws/generate/`);
+      let opened = false;
+      let settled = false;
+      const finish = (fn, value) => {
+        if (settled) return;
+        settled = true;
+        fn(value);
+        ws.close();
+      };
+
+      ws.onopen = () => {
+        opened = true;
+        ws.send(JSON.stringify({ type: 'generate', kannada_description: kannadaDescription }));
+      };
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'translation' && onTranslation) {
+          onTranslation(data.english_description);
+        } else if (data.type === 'token' && onToken) {
+          onToken(data.data);
+        } else if (data.type === 'complete') {
+          finish(resolve, data);
+        } else if (data.type === 'error') {
+          finish(reject, new Error(data.message_kannada || data.message || 'Processing failed'));
+        }
+      };
+      ws.onerror = () => {
+        const error = new Error('WebSocket connection error');
+        error.connectionFailed = !opened;
+        finish(reject, error);
+      };
+      ws.onclose = () => {
+        const error = new Error('ಸರ್ವರ್ ಸಂಪರ್ಕ ವಿಫಲವಾಗಿದೆ (Server connection failed)');
+        error.connectionFailed = !opened;
+        finish(reject, error);
+      };
+    }),
+
   // Generate Trinket embed
   generateTrinketEmbed: (code) => api.post('/trinket/embed/', { code }),
 